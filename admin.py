@@ -3,12 +3,27 @@ Flask-Admin配置文件
 定义管理界面的模型视图和自定义行为
 """
 
-from flask_admin import Admin, AdminIndexView, expose
+from flask_admin import Admin, AdminIndexView, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.filters import FilterConverter
+from flask_admin.contrib.sqla.form import AdminModelConverter
 from flask_admin.base import MenuLink
-from flask import redirect, url_for, request, abort, Response
+from flask_admin.form import SecureForm
+from flask_admin.model import filters
+from flask_admin.model.form import converts
+from flask import redirect, url_for, request, abort, flash, send_file, Response, stream_with_context
+import io
 import os
 from models import db, Team, TeamMember, Config
+from database import using_replica
+from exporter import EXPORT_BATCH_SIZE, EXPORT_FORMATS, generate_export
+from importer import IMPORT_FORMATS, detect_format, import_file, write_report
+from config_cache import config_cache
+from backup import backups, inspect, SnapshotError
+import stats
+import search
+from validators import TEAM_RULES, MEMBER_RULES, validate_team_info, validate_member, format_errors
+from wtforms.validators import ValidationError
 
 
 class AuthMixin:
@@ -37,6 +52,194 @@ class AuthMixin:
         )
 
 
+class ModelFormConverter(AdminModelConverter):
+    """表单转换：ShanghaiDateTime 字段使用日期时间输入框"""
+
+    @converts('ShanghaiDateTime')
+    def convert_shanghai_datetime(self, field_args, **extra):
+        return self.convert_datetime(field_args, **extra)
+
+
+class ModelFilterConverter(FilterConverter):
+    """过滤器转换：ShanghaiDateTime 字段使用日期时间过滤器"""
+
+    @filters.convert('shanghaidatetime')
+    def conv_shanghai_datetime(self, column, name, **kwargs):
+        return self.conv_datetime(column, name, **kwargs)
+
+
+class BaseModelView(ModelView):
+    """
+    模型视图基类：支持 ShanghaiDateTime 字段，列表查询（含总数）使用只读副本
+    """
+    model_form_converter = ModelFormConverter
+    filter_converter = ModelFilterConverter()
+
+    def get_list(self, *args, **kwargs):
+        if not kwargs.get('execute', True):
+            # 返回未执行的查询（导出），由调用方在主库上迭代
+            return super(BaseModelView, self).get_list(*args, **kwargs)
+        with using_replica(self.session):
+            return super(BaseModelView, self).get_list(*args, **kwargs)
+
+
+class StreamingExportMixin:
+    """
+    导出混入类，导出时使用 yield_per 分批读取记录，
+    避免 export_max_rows = 0 时一次性将整张表加载到内存
+    """
+    export_batch_size = EXPORT_BATCH_SIZE
+
+    def _export_data(self):
+        # 与 BaseModelView._export_data 相同：导出不支持宏形式的列格式化函数（宏的函数名为 inner），
+        # 在开始输出之前报错，而不是在流式输出中途失败
+        export_columns = {col for col, _ in self._export_columns}
+        for col, func in self.column_formatters_export.items():
+            if col in export_columns and func.__name__ == 'inner':
+                raise NotImplementedError(
+                    'Macros are not implemented in export. Exclude column in'
+                    ' column_formatters_export, column_export_list, or'
+                    f' column_export_exclude_list. Column: {col}')
+
+        view_args = self._get_list_extra_args()
+
+        sort_column = self._get_column_by_idx(view_args.sort)
+        if sort_column is not None:
+            sort_column = sort_column[0]
+
+        # execute=False 返回查询对象而不是结果列表，由导出过程逐批迭代
+        count, query = self.get_list(0, sort_column, view_args.sort_desc,
+                                     view_args.search, view_args.filters,
+                                     execute=False, page_size=self.export_max_rows)
+        return count, query.yield_per(self.export_batch_size)
+
+
+class ExportView(AuthMixin, BaseView):
+    """
+    团队与成员扁平化数据的流式导出（每个成员一行）
+    """
+
+    def is_visible(self):
+        # 通过菜单链接按格式访问，不单独显示菜单项
+        return False
+
+    @expose('/')
+    def index(self):
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            abort(400)
+        return Response(
+            stream_with_context(generate_export(export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=teams_members.{export_format}'}
+        )
+
+
+class ImportView(AuthMixin, BaseView):
+    """
+    上传 CSV / XLSX / NDJSON 文件批量导入团队和成员（见 importer.py），页面显示导入结果和错误明细
+    """
+
+    # 页面最多显示的错误条数，完整明细可下载
+    max_errors_shown = 200
+
+    @expose('/', methods=('GET', 'POST'))
+    def index(self):
+        if request.method == 'GET':
+            return self.render('admin/import.html', formats=IMPORT_FORMATS)
+
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return self.render('admin/import.html', formats=IMPORT_FORMATS, message='请选择要导入的文件'), 400
+        file_format = request.form.get('format') or detect_format(upload.filename)
+        if file_format not in IMPORT_FORMATS:
+            return self.render('admin/import.html', formats=IMPORT_FORMATS,
+                               message=f'无法识别的文件格式: {upload.filename}'), 400
+        dry_run = bool(request.form.get('dry_run'))
+        try:
+            result = import_file(db.session, upload.stream, file_format, dry_run=dry_run)
+        except ValueError as e:
+            return self.render('admin/import.html', formats=IMPORT_FORMATS, message=str(e)), 400
+
+        if request.form.get('report') and result.errors:
+            report = io.StringIO()
+            write_report(result, report)
+            return Response(report.getvalue(), mimetype='text/csv; charset=utf-8',
+                            headers={'Content-Disposition': 'attachment; filename=import_errors.csv'})
+        return self.render('admin/import.html', formats=IMPORT_FORMATS, result=result, dry_run=dry_run,
+                           errors=result.errors[:self.max_errors_shown])
+
+
+class BackupView(AuthMixin, BaseView):
+    """
+    数据库备份：列出、创建、下载、删除备份，以及从备份恢复（见 backup.py）
+
+    浏览器在跨站提交表单时也会附带 HTTP Basic 认证，备份、恢复、删除均校验会话中的 CSRF 令牌
+    """
+
+    def _csrf_failed(self):
+        if SecureForm(request.form).validate():
+            return False
+        flash('页面已过期或请求来源无效，请刷新页面后重试', 'error')
+        return True
+
+    @expose('/')
+    def index(self):
+        snapshots = []
+        for snapshot in backups.list():
+            try:
+                info = inspect(snapshot.path, check=False)
+            except SnapshotError as e:
+                info = {'error': str(e)}
+            snapshots.append((snapshot, info))
+        return self.render('admin/backup.html', backups=backups, snapshots=snapshots, form=SecureForm())
+
+    @expose('/create', methods=('POST',))
+    def create(self):
+        if self._csrf_failed():
+            return redirect(url_for('.index'))
+        try:
+            snapshot = backups.snapshot()
+            flash(f'备份完成: {snapshot.name}', 'success')
+        except SnapshotError as e:
+            flash(str(e), 'error')
+        return redirect(url_for('.index'))
+
+    @expose('/download/<filename>')
+    def download(self, filename):
+        try:
+            snapshot = backups.get(filename)
+        except SnapshotError:
+            abort(404)
+        return send_file(snapshot.path, mimetype='application/vnd.sqlite3', as_attachment=True,
+                         download_name=snapshot.name)
+
+    @expose('/restore/<filename>', methods=('POST',))
+    def restore(self, filename):
+        if self._csrf_failed():
+            return redirect(url_for('.index'))
+        if request.form.get('confirm') != filename:
+            flash('请输入备份文件名确认恢复', 'error')
+            return redirect(url_for('.index'))
+        try:
+            previous = backups.restore(backups.get(filename).path)
+            flash(f'已从 {filename} 恢复，恢复前的数据已备份为 {previous.name}', 'success')
+        except SnapshotError as e:
+            flash(str(e), 'error')
+        return redirect(url_for('.index'))
+
+    @expose('/delete/<filename>', methods=('POST',))
+    def delete(self, filename):
+        if self._csrf_failed():
+            return redirect(url_for('.index'))
+        try:
+            backups.delete(filename)
+            flash(f'已删除备份: {filename}', 'success')
+        except SnapshotError as e:
+            flash(str(e), 'error')
+        return redirect(url_for('.index'))
+
+
 class MyAdminIndexView(AuthMixin, AdminIndexView):
     """
     自定义管理界面首页视图，添加基本认证
@@ -44,8 +247,8 @@ class MyAdminIndexView(AuthMixin, AdminIndexView):
     
     @expose('/')
     def index(self):
-        # 这里可以添加自定义的首页逻辑
-        return super(MyAdminIndexView, self).index()
+        # 首页展示报名统计，只读取预先聚合的统计表
+        return self.render(self._template, stats=stats.summary(db.session))
     
     @expose('/logout')
     def logout(self):
@@ -53,7 +256,39 @@ class MyAdminIndexView(AuthMixin, AdminIndexView):
         return redirect('/')
 
 
-class TeamView(AuthMixin, ModelView):
+class StatsMixin:
+    """
+    统计混入类，在管理后台新建、修改、删除团队或成员时
+    于同一事务中更新 registration_stats 的计数
+    """
+
+    def on_model_change(self, form, model, is_created):
+        stats.apply(self.session, stats.model_deltas(model, is_created))
+        return super(StatsMixin, self).on_model_change(form, model, is_created)
+
+    def on_model_delete(self, model):
+        stats.apply(self.session, stats.delete_deltas(model))
+        return super(StatsMixin, self).on_model_delete(model)
+
+
+class FullTextSearchMixin:
+    """
+    搜索混入类，检索词可以使用全文索引时以 FTS5 匹配代替逐列 ILIKE '%词%'，
+    否则（非 SQLite、检索词不足 3 个字符）沿用 Flask-Admin 的默认搜索
+    """
+
+    def _apply_search(self, query, count_query, joins, count_joins, search_term):
+        condition = search.match_condition(self.session, self.model, search_term)
+        if condition is None:
+            return super(FullTextSearchMixin, self)._apply_search(
+                query, count_query, joins, count_joins, search_term)
+        query = query.filter(condition)
+        if count_query is not None:
+            count_query = count_query.filter(condition)
+        return query, count_query, joins, count_joins
+
+
+class TeamView(AuthMixin, StatsMixin, FullTextSearchMixin, StreamingExportMixin, BaseModelView):
     """
     团队模型的管理视图 - 简化配置，显示所有字段
     """
@@ -68,7 +303,10 @@ class TeamView(AuthMixin, ModelView):
     page_size = 20
     
     def on_model_change(self, form, model, is_created):
-        """在模型保存前调用，自动更新时间戳"""
+        """在模型保存前调用，校验字段并自动更新时间戳"""
+        _, errors = validate_team_info({rule.name: getattr(model, rule.name) for rule in TEAM_RULES})
+        if errors:
+            raise ValidationError(format_errors(errors))
         if not is_created:
             # 更新现有记录时，手动更新时间戳
             model.update_timestamps()
@@ -83,7 +321,7 @@ class TeamView(AuthMixin, ModelView):
                    'project_name', 'repo_url', 'costrict_uid', 'project_intro',
                    'tech_solution', 'goals_and_outlook')
     
-    # 定义搜索字段
+    # 定义搜索字段（检索词不少于 3 个字符时使用全文索引，见 search.py）
     column_searchable_list = ('team_name', 'project_name', 'competition_track')
     
     # 定义过滤器
@@ -105,7 +343,7 @@ class TeamView(AuthMixin, ModelView):
     }
 
 
-class TeamMemberView(AuthMixin, ModelView):
+class TeamMemberView(AuthMixin, StatsMixin, FullTextSearchMixin, StreamingExportMixin, BaseModelView):
     """
     团队成员模型的管理视图 - 简化配置，显示所有字段
     """
@@ -120,7 +358,10 @@ class TeamMemberView(AuthMixin, ModelView):
     page_size = 20
     
     def on_model_change(self, form, model, is_created):
-        """在模型保存前调用，自动更新时间戳"""
+        """在模型保存前调用，校验字段并自动更新时间戳"""
+        _, errors = validate_member({rule.name: getattr(model, rule.name) for rule in MEMBER_RULES})
+        if errors:
+            raise ValidationError(format_errors(errors))
         if not is_created:
             # 更新现有记录时，手动更新时间戳
             model.update_timestamps()
@@ -146,7 +387,7 @@ class TeamMemberView(AuthMixin, ModelView):
                           'department', 'major_grade', 'phone', 'email', 'student_id',
                           'role', 'tech_stack', 'desc', 'createdAt', 'updatedAt')
     
-    # 定义搜索字段
+    # 定义搜索字段（检索词不少于 3 个字符时使用全文索引，见 search.py）
     column_searchable_list = ('name', 'school', 'phone', 'email', 'team_name', 'tech_stack')
     
     # 定义过滤器
@@ -182,7 +423,7 @@ class TeamMemberView(AuthMixin, ModelView):
     }
 
 
-class ConfigView(AuthMixin, ModelView):
+class ConfigView(AuthMixin, BaseModelView):
     """
     配置模型的管理视图 - 用于管理系统配置
     """
@@ -202,6 +443,16 @@ class ConfigView(AuthMixin, ModelView):
             model.update_timestamps()
         return super(ConfigView, self).on_model_change(form, model, is_created)
     
+    def after_model_change(self, form, model, is_created):
+        """配置保存（已提交）后清空配置缓存，并通知其它 worker"""
+        config_cache.invalidate()
+        return super(ConfigView, self).after_model_change(form, model, is_created)
+    
+    def after_model_delete(self, model):
+        """配置删除（已提交）后清空配置缓存，并通知其它 worker"""
+        config_cache.invalidate()
+        return super(ConfigView, self).after_model_delete(model)
+    
     # 指定列表页面显示的字段
     column_list = ('id', 'config_key', 'config_value', 'config_type', 'description', 'createdAt', 'updatedAt')
     
@@ -253,6 +504,11 @@ def setup_admin(app):
     admin.add_view(TeamView(Team, db.session, name='团队管理', url='/admin/team'))
     admin.add_view(TeamMemberView(TeamMember, db.session, name='成员管理', url='/admin/member'))
     admin.add_view(ConfigView(Config, db.session, name='系统配置', url='/admin/config'))
+    admin.add_view(ExportView(name='数据导出', endpoint='export', url='/admin/export'))
+    admin.add_link(MenuLink(name='导出 CSV', url='/admin/export/?format=csv', category='数据导出'))
+    admin.add_link(MenuLink(name='导出 NDJSON', url='/admin/export/?format=ndjson', category='数据导出'))
+    admin.add_view(ImportView(name='数据导入', endpoint='import', url='/admin/import'))
+    admin.add_view(BackupView(name='数据备份', endpoint='backup', url='/admin/backup'))
     
     # 添加自定义模板目录，这样我们可以覆盖默认模板
     admin.add_link(MenuLink(name='退出登录', url='/admin/logout', category=None))
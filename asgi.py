@@ -0,0 +1,427 @@
+"""
+ASGI入口文件
+提交、团队列表、团队详情、配置四个接口使用异步处理函数和异步数据库驱动，
+等待慢客户端上传请求体或等待数据库时不占用 worker；
+其余路由（首页、静态文件、管理后台、检索、统计、指标等）转发给 Flask 应用，在线程中执行
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+
+数据库驱动根据 DATABASE_URL 自动替换为异步驱动：SQLite -> aiosqlite，PostgreSQL -> asyncpg，MySQL -> aiomysql；
+模型、查询语句、提交处理（截止检查、校验、受理、结果）、幂等键、缓存校验、统计和准入控制均与 server.py 共用
+"""
+
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import re
+import time
+import uuid
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from werkzeug.wrappers import Request
+
+import metrics
+import ratelimit
+import server
+from config_cache import config_cache
+from database import engine_options, setup_engine
+from http_cache import not_modified_response, set_validators
+from models import db, Team
+from serializers import team_to_dict
+from server import app
+
+logger = logging.getLogger('costrict.asgi')
+access_logger = logging.getLogger('costrict.access')
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+    'mariadb': 'aiomysql',
+}
+
+
+def async_url(db_url):
+    """将 DATABASE_URL 中的驱动替换为对应的异步驱动"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'不支持的数据库: {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def create_engine(db_url):
+    # 连接池参数与同步引擎相同；SQLite 连接同样设置 WAL、busy_timeout 等（见 database.py）
+    engine = create_async_engine(async_url(db_url), **engine_options(db_url))
+    setup_engine(engine.sync_engine)
+    return engine
+
+
+if not server.init_db():
+    logger.error('数据库初始化失败，应用无法启动')
+    exit(1)
+
+engine = create_engine(server.DB_URL)
+replica_url = os.getenv('DATABASE_REPLICA_URL')
+replica_engine = create_engine(replica_url) if replica_url else engine
+# 写入和配置读取使用主库，团队列表、详情使用只读副本（未配置时为主库）
+primary_session = async_sessionmaker(engine, expire_on_commit=False)
+replica_session = async_sessionmaker(replica_engine, expire_on_commit=False)
+# 幂等键存储与同步接口共用（在线程中通过同步引擎读写）
+with app.app_context():
+    sync_engine = db.engine
+# SQLite 同一时间只允许一个写事务，进程内先排队再写入，避免大量并发事务在 busy_timeout 中退避等待
+write_lock = asyncio.Lock() if engine.dialect.name == 'sqlite' else contextlib.nullcontext()
+
+# 提交接口的准入控制：请求体大小和限流与同步接口共用同一份设置和限流状态；
+# 异步处理时等待中的请求几乎不占资源，并发上限单独设置
+_concurrency = int(os.getenv('ASGI_SUBMIT_MAX_CONCURRENCY', '64'))
+submit_admission = ratelimit.AdmissionControl(
+    bucket=server.submit_admission.bucket,
+    concurrency=ratelimit.ConcurrencyLimit(_concurrency) if _concurrency > 0 else None,
+    max_body=server.submit_admission.max_body,
+    trusted_proxies=server.submit_admission.trusted_proxies,
+)
+
+
+# ===== 请求与响应 =====
+
+def json_response(data, status=200, headers=None):
+    """与 Flask jsonify 相同的 JSON 响应"""
+    response = app.json.response(data)
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def json_result(result):
+    """将共用处理函数返回的 (状态码, 响应数据, 响应头) 转换为 JSON 响应（与 server.json_result 相同）"""
+    status, data, headers = result
+    return json_response(data, status, headers)
+
+
+async def conditional_response(req, etag, last_modified, cache_control, build):
+    """http_cache.conditional_response 的异步版本，build 为返回完整响应的协程函数"""
+    response = not_modified_response(etag, last_modified, cache_control, req)
+    if response is None:
+        response = set_validators(await build(), etag, last_modified, cache_control)
+    return response
+
+
+def build_request(scope):
+    """由 ASGI scope 构造 werkzeug 请求对象（请求体在读取后写入 wsgi.input）"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_LENGTH', 'CONTENT_TYPE') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return Request(environ)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError('客户端已断开连接')
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, req, response):
+    headers = response.get_wsgi_headers(req.environ)
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+    })
+    body = b'' if req.method == 'HEAD' or response.status_code in (204, 304) else response.get_data()
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def get_config_entry(config_key):
+    """读取配置缓存项，未命中时从主库加载（与 server.get_config_by_key 共用同一个缓存，不使用副本的原因见 server._load_config）"""
+    found, entry, generation = config_cache.lookup(config_key)
+    if not found:
+        async with primary_session() as session:
+            entry = server.config_entry(await session.scalar(server.config_statement(config_key)))
+        config_cache.store(config_key, entry, generation)
+    return entry
+
+
+# ===== 接口 =====
+
+async def submit_team(req, receive):
+    """处理团队信息和成员提交（与 server.submit_team 相同）"""
+    rejected = await asyncio.to_thread(submit_admission.check, 'submit', req)
+    if not rejected:
+        # 先接收完请求体再占用并发名额，慢客户端上传期间不占名额
+        req.environ['wsgi.input'] = io.BytesIO(await read_body(receive))
+        rejected = submit_admission.enter('submit')
+    if rejected:
+        status, message, retry_after = rejected
+        return json_response({
+            'success': False,
+            'message': message
+        }, status, submit_admission.headers(retry_after))
+    try:
+        return await _idempotent_submit_team(req)
+    finally:
+        submit_admission.leave()
+
+
+async def _idempotent_submit_team(req):
+    """按 Idempotency-Key 返回首次的响应（与 idempotency.IdempotencyStore.idempotent 共用 open_request/close_request）"""
+    store = server.submit_idempotency
+    key, early = await asyncio.to_thread(store.open_request, sync_engine, 'submit', req)
+    if early is not None:
+        return json_result(early)
+    if key is None:
+        return await _submit_team(req)
+
+    response = None
+    try:
+        response = await _submit_team(req)
+        return response
+    finally:
+        await asyncio.to_thread(store.close_request, sync_engine, key, response)
+
+
+async def _submit_team(req):
+    """与 server.submit_team 共用检查、受理和结果处理，仅读取配置和保存团队使用异步数据库"""
+    try:
+        try:
+            deadline = await get_config_entry('DEADLINE')
+        except Exception as e:
+            logger.exception(f'查询配置错误: {e}')
+            deadline = None
+        early, team_data, members_data = server.check_submission(req, deadline[1] if deadline else None)
+        if early is not None:
+            return json_result(early)
+
+        if server.intake_queue is not None:
+            return json_result(await asyncio.to_thread(server.accept_submission, team_data, members_data))
+
+        # ===== 保存团队和成员信息 =====
+        success, result = await save_team(team_data, members_data)
+        return json_result(await asyncio.to_thread(
+            server.submission_result, team_data, members_data, success, result))
+
+    except Exception as e:
+        return json_result(server.submission_error(e))
+
+
+async def save_team(team_data, members_data):
+    """保存团队和成员数据（通过 run_sync 执行 server.save_team_in；约束之外的错误向上抛出）"""
+    async with write_lock, primary_session() as session:
+        return await session.run_sync(server.save_team_in, team_data, members_data)
+
+
+async def get_teams(req):
+    """分页获取团队信息（参数与 server.get_teams 相同）"""
+    try:
+        limit, fields = server.parse_teams_args(req.args)
+    except ValueError as e:
+        return json_response({
+            'success': False,
+            'message': str(e)
+        }, 400)
+
+    async with replica_session() as session:
+        async def build():
+            query = server.teams_statement(
+                limit=limit,
+                cursor=req.args.get('cursor'),
+                competition_track=req.args.get('competition_track'),
+                school=req.args.get('school'),
+                name_prefix=req.args.get('name_prefix'),
+                fields=fields)
+            teams, next_cursor = server.page_teams((await session.scalars(query)).all(), limit, fields)
+            return json_response({
+                'success': True,
+                'data': teams,
+                'count': len(teams),
+                'next_cursor': next_cursor
+            })
+
+        try:
+            fingerprint = (await session.execute(server.teams_fingerprint_statement())).one()
+            etag, last_modified = server.teams_etag(fingerprint, req.query_string)
+            return await conditional_response(req, etag, last_modified, app.config['CACHE_CONTROL_TEAMS'], build)
+        except ValueError as e:
+            return json_response({
+                'success': False,
+                'message': str(e)
+            }, 400)
+        except Exception as e:
+            logger.exception(f'查询团队列表错误: {e}')
+            return json_response({
+                'success': False,
+                'message': '服务器错误'
+            }, 500)
+
+
+async def get_team(req, team_id):
+    """获取特定团队信息（支持 If-None-Match / If-Modified-Since 条件请求）"""
+    not_found = {
+        'success': False,
+        'message': '团队不存在'
+    }
+    async with replica_session() as session:
+        async def build():
+            team = await session.get(Team, team_id, options=[selectinload(Team.members)])
+            if not team:
+                return json_response(not_found, 404)
+            return json_response({
+                'success': True,
+                'data': team_to_dict(team)
+            })
+
+        try:
+            fingerprint = (await session.execute(server.team_fingerprint_statement(team_id))).first()
+            if not fingerprint:
+                return json_response(not_found, 404)
+            etag, last_modified = server.team_etag(team_id, fingerprint)
+            return await conditional_response(req, etag, last_modified, app.config['CACHE_CONTROL_TEAM'], build)
+        except Exception as e:
+            logger.exception(f'获取团队信息错误: {e}', extra={'team_id': team_id})
+            return json_response({
+                'success': False,
+                'message': '服务器错误'
+            }, 500)
+
+
+async def get_config(req):
+    """根据config_key查询配置项 - 供前端使用"""
+    config_key = req.args.get('config_key')
+    if not config_key:
+        return json_response({
+            'success': False,
+            'message': '请提供配置键(key)参数'
+        }, 400)
+
+    try:
+        entry = await get_config_entry(config_key)
+    except Exception as e:
+        logger.exception(f'查询配置错误: {e}')
+        entry = None
+    if not entry:
+        return json_response({
+            'success': False,
+            'message': '配置项不存在'
+        }, 404)
+
+    async def build():
+        return json_response({
+            'success': True,
+            'data': entry[0]
+        })
+
+    etag, last_modified = server.config_etag(entry)
+    return await conditional_response(req, etag, last_modified, app.config['CACHE_CONTROL_CONFIG'], build)
+
+
+# (方法, 路径, 路由名称（与 Flask 路由规则相同，用于日志和指标）, 处理函数)
+ROUTES = [
+    ('POST', re.compile(r'/api/team/submit'), '/api/team/submit', submit_team),
+    ('GET', re.compile(r'/api/teams'), '/api/teams', get_teams),
+    ('GET', re.compile(r'/api/team/(\d+)'), '/api/team/<int:team_id>', get_team),
+    ('GET', re.compile(r'/api/config'), '/api/config', get_config),
+]
+
+
+def match_route(method, path):
+    for route_method, pattern, rule, handler in ROUTES:
+        if method == route_method:
+            match = pattern.fullmatch(path)
+            if match:
+                return rule, handler, match.groups()
+    return None
+
+
+# ===== ASGI 应用 =====
+
+flask_application = WsgiToAsgi(app)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            server.metrics_exporter.start_flusher()
+            # 后台线程在 Flask 中由 before_request 启动，只访问异步接口的请求不经过 Flask，在此启动：
+            # 确认邮件任务、定时备份，以及重启前受理但尚未写入的提交
+            server.start_job_runner()
+            server.start_backup_scheduler()
+            server.start_intake_writer()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            if replica_engine is not engine:
+                await replica_engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    matched = match_route(scope.get('method'), scope.get('path', '')) if scope['type'] == 'http' else None
+    if matched is None:
+        # 其余路由交给 Flask；每个请求使用独立的线程，互不阻塞
+        async with ThreadSensitiveContext():
+            return await flask_application(scope, receive, send)
+
+    rule, handler, args = matched
+    started = time.perf_counter()
+    req = build_request(scope)
+    request_id = req.headers.get('X-Request-ID') or uuid.uuid4().hex
+    try:
+        if handler is submit_team:
+            response = await handler(req, receive)
+        else:
+            response = await handler(req, *(int(arg) for arg in args))
+    except ConnectionError:
+        return
+    except Exception as e:
+        logger.exception(f'处理请求错误: {e}', extra={'route': rule, 'request_id': request_id})
+        response = json_response({
+            'success': False,
+            'message': '服务器错误'
+        }, 500)
+
+    response.headers['X-Request-ID'] = request_id
+    if 'Origin' in req.headers:
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    await send_response(send, req, response)
+
+    elapsed = time.perf_counter() - started
+    metrics.record_request(req.method, rule, response.status_code, elapsed)
+    access_logger.info('%s %s %s', req.method, req.path, response.status_code, extra={
+        'status': response.status_code,
+        'latency_ms': round(elapsed * 1000, 2),
+        'request_id': request_id,
+        'route': rule,
+        'method': req.method,
+    })
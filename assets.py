@@ -0,0 +1,478 @@
+"""
+静态资源构建与发布
+构建：压缩 web/static 下的 JS/CSS/SVG，文件名加入内容哈希，改写 index.html / notice.html 中的引用，
+并为文本资源生成 .gz / .br 预压缩文件，输出到 web/dist（python assets.py）
+发布：根据 Accept-Encoding 选择预压缩文件，带哈希的文件使用长期不可变缓存；未构建时直接发送 web/ 下的原文件；
+首页注入公开配置后整体缓存（见 PageCache）
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import threading
+
+from flask import Response, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 未安装 Brotli 时只生成 .gz
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT, 'web')
+DIST_DIR = os.path.join(SOURCE_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+# 需要生成预压缩文件的类型（图片等已压缩格式不再压缩）
+COMPRESSIBLE = ('.html', '.js', '.css', '.svg', '.json', '.txt')
+# 预压缩文件：(Accept-Encoding 中的名称, 扩展名)，按优先级排列
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# 带内容哈希的文件永不改变
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# HTML 等入口文件每次校验，保证发布后立即引用新的哈希文件
+REVALIDATE_CACHE = 'no-cache'
+# SVG 坐标保留的小数位数
+SVG_PRECISION = 3
+# 只对这些属性（坐标、尺寸、路径和变换）的数值保留 SVG_PRECISION 位小数，
+# 文本内容、id、version 等其它属性原样保留
+SVG_NUMERIC_ATTRIBUTES = (
+    'd', 'points', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'fx', 'fy', 'dx', 'dy',
+    'width', 'height', 'viewBox', 'transform', 'gradientTransform', 'patternTransform',
+    'stroke-width', 'stroke-dasharray', 'stroke-dashoffset',
+)
+
+
+# ===== 压缩 =====
+
+_JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new',
+                      'delete', 'void', 'throw', 'instanceof', 'yield', 'await'}
+_IDENT = re.compile(r'[A-Za-z0-9_$\u0080-￿]')
+
+
+def _scan_quoted(source, i):
+    # 返回字符串字面量 source[i:] 的结束位置（不含）
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _scan_template(source, i):
+    # 模板字符串，${...} 中可以嵌套字符串、模板字符串和花括号
+    i += 1
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif source.startswith('${', i):
+            i = _scan_braces(source, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _scan_braces(source, i):
+    depth = 1
+    while i < len(source) and depth:
+        ch = source[i]
+        if ch in '\'"':
+            i = _scan_quoted(source, i)
+            continue
+        if ch == '`':
+            i = _scan_template(source, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+        i += 1
+    return i
+
+
+def _scan_regex(source, i):
+    i += 1
+    in_class = False
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(source) and _IDENT.match(source[i]):
+                i += 1
+            return i
+        elif ch == '\n':
+            return i
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """
+    保守的 JS 压缩：删除注释和缩进、合并空白；保留换行以免改变自动分号插入的结果，
+    字符串、模板字符串和正则表达式原样保留
+    """
+    out = []
+    last_token = ''
+    pending_space = pending_newline = False
+    i = 0
+    n = len(source)
+
+    def emit(text):
+        nonlocal pending_space, pending_newline
+        if out and (pending_space or pending_newline):
+            prev = out[-1][-1]
+            if pending_newline and prev not in '{;,([':
+                out.append('\n')
+            elif (_IDENT.match(prev) and _IDENT.match(text[0])) or \
+                    (prev in '+-' and text[0] in '+-') or (prev == '/' and text[0] == '/'):
+                out.append(' ')
+        pending_space = pending_newline = False
+        out.append(text)
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r\n\f\v﻿':
+            if ch == '\n':
+                pending_newline = True
+            else:
+                pending_space = True
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            comment = source[i:n if end < 0 else end + 2]
+            i = n if end < 0 else end + 2
+            if '\n' in comment:
+                pending_newline = True
+            else:
+                pending_space = True
+        elif ch in '\'"':
+            end = _scan_quoted(source, i)
+            emit(source[i:end])
+            last_token, i = source[i:end], end
+        elif ch == '`':
+            end = _scan_template(source, i)
+            emit(source[i:end])
+            last_token, i = source[i:end], end
+        elif ch == '/' and (not last_token or last_token in _JS_REGEX_PRECEDERS
+                            or last_token in _JS_REGEX_KEYWORDS):
+            end = _scan_regex(source, i)
+            emit(source[i:end])
+            last_token, i = source[i:end], end
+        elif _IDENT.match(ch):
+            end = i + 1
+            while end < n and _IDENT.match(source[end]):
+                end += 1
+            emit(source[i:end])
+            last_token, i = source[i:end], end
+        else:
+            emit(ch)
+            last_token, i = ch, i + 1
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """删除注释，合并空白，去掉 { } ; , > 周围及 : 之后的空格"""
+    parts = []
+    i = 0
+    while i < len(source):
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end < 0 else end + 2
+            parts.append(' ')
+        elif source[i] in '\'"':
+            end = _scan_quoted(source, i)
+            parts.append(('s', source[i:end]))
+            i = end
+        else:
+            match = re.compile(r'[^\'"/]+|/').match(source, i)
+            parts.append(match.group(0))
+            i = match.end()
+
+    out = []
+    for part in parts:
+        if isinstance(part, tuple):
+            out.append(part[1])
+            continue
+        text = re.sub(r'\s+', ' ', part)
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        out.append(text)
+    css = ''.join(out)
+    css = css.replace(';}', '}')
+    return css.strip() + '\n'
+
+
+def _round_number(match):
+    text = ('%.*f' % (SVG_PRECISION, float(match.group(0)))).rstrip('0').rstrip('.')
+    return '0' if text in ('-0', '') else text
+
+
+_SVG_TAG = re.compile(r'<[A-Za-z][^>]*>')
+_SVG_NUMERIC_ATTRIBUTE = re.compile(
+    r'(\s(?:%s)\s*=\s*)(["\'])(.*?)\2' % '|'.join(map(re.escape, SVG_NUMERIC_ATTRIBUTES)), re.S)
+_SVG_LONG_DECIMAL = re.compile(r'-?\d*\.\d{%d,}' % (SVG_PRECISION + 1))
+
+
+def _round_attribute(match):
+    prefix, quote, value = match.groups()
+    return f'{prefix}{quote}{_SVG_LONG_DECIMAL.sub(_round_number, value)}{quote}'
+
+
+def minify_svg(source):
+    """删除注释和标签之间的空白，SVG_NUMERIC_ATTRIBUTES 中属性的数值保留 SVG_PRECISION 位小数"""
+    svg = re.sub(r'<!--.*?-->', '', source, flags=re.S)
+    svg = re.sub(r'>\s+<', '><', svg)
+    svg = _SVG_TAG.sub(lambda tag: _SVG_NUMERIC_ATTRIBUTE.sub(_round_attribute, tag.group(0)), svg)
+    return svg.strip()
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css, '.svg': minify_svg}
+
+
+# ===== 构建 =====
+
+def _hashed_name(relpath, content):
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    base, ext = os.path.splitext(relpath)
+    return f'{base}.{digest}{ext}'
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def compress(content):
+    """
+    返回 {编码名称: 压缩后的内容}，按 ENCODINGS 的优先级排列
+
+    压缩后没有明显变小的编码不返回
+    """
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=11)
+    variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+    return {name: data for name, data in variants.items() if len(data) < len(content) * 0.9}
+
+
+def _write_compressed(path, content):
+    suffixes = dict(ENCODINGS)
+    for name, data in compress(content).items():
+        _write(path + suffixes[name], data)
+
+
+def _rewrite_references(html, manifest):
+    # 将 HTML 中 "static/xxx" 形式的引用（含 srcset）替换为带哈希的文件名
+    def replace(match):
+        return match.group(1) + manifest.get(match.group(2), match.group(2))
+    return re.sub(r'([\s"\',=])(static/[\w./-]+)', replace, html)
+
+
+def _rewrite_css_urls(css, manifest):
+    # CSS 中的 url(xxx) 相对于 static/ 目录
+    def replace(match):
+        quote, name = match.group(1), match.group(2)
+        hashed = manifest.get(f'static/{name}')
+        return f'url({quote}{hashed[len("static/"):]}{quote})' if hashed else match.group(0)
+    return re.sub(r'url\(\s*([\'"]?)([\w./-]+)\1\s*\)', replace, css)
+
+
+def build(source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """
+    构建 dist 目录，返回 manifest：{原路径: 带哈希的路径}
+
+    先在临时目录中完成构建再替换 dist，避免运行中的服务读到不完整的文件
+    """
+    tmp_dir = dist_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    manifest = {}
+    stats = []
+
+    static_dir = os.path.join(source_dir, 'static')
+    names = sorted(os.listdir(static_dir)) if os.path.isdir(static_dir) else []
+    # CSS 中的 url() 引用同目录下的资源，放在最后处理以便改写为带哈希的文件名
+    names.sort(key=lambda name: name.endswith('.css'))
+    for name in names:
+        path = os.path.join(static_dir, name)
+        if not os.path.isfile(path):
+            continue
+        relpath = f'static/{name}'
+        with open(path, 'rb') as f:
+            content = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        minified = content
+        if ext in MINIFIERS:
+            text = MINIFIERS[ext](content.decode('utf-8'))
+            if ext == '.css':
+                text = _rewrite_css_urls(text, manifest)
+            minified = text.encode('utf-8')
+        hashed = _hashed_name(relpath, minified)
+        manifest[relpath] = hashed
+        _write(os.path.join(tmp_dir, hashed), minified)
+        if ext in COMPRESSIBLE:
+            _write_compressed(os.path.join(tmp_dir, hashed), minified)
+        stats.append((relpath, len(content), len(minified)))
+
+    for name in sorted(os.listdir(source_dir)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(source_dir, name), encoding='utf-8') as f:
+            html = _rewrite_references(f.read(), manifest).encode('utf-8')
+        _write(os.path.join(tmp_dir, name), html)
+        _write_compressed(os.path.join(tmp_dir, name), html)
+        stats.append((name, len(html), len(html)))
+
+    _write(os.path.join(tmp_dir, MANIFEST_NAME),
+           json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.replace(tmp_dir, dist_dir)
+    return manifest, stats
+
+
+# ===== 发布 =====
+
+def is_built(dist_dir=DIST_DIR):
+    return os.path.isfile(os.path.join(dist_dir, MANIFEST_NAME))
+
+
+def _is_hashed(path):
+    return re.search(r'\.[0-9a-f]{10}\.[A-Za-z0-9]+$', path) is not None
+
+
+def send_static(path, source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """
+    发送静态文件：优先使用 dist 中的构建结果并按 Accept-Encoding 选择预压缩文件，
+    未构建或 dist 中不存在时发送 source_dir 下的原文件
+    """
+    filename = safe_join(dist_dir, path) if is_built(dist_dir) else None
+    if not filename or not os.path.isfile(filename):
+        return send_from_directory(source_dir, path)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    encoding, suffix = None, ''
+    for name, ext in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(filename + ext):
+            encoding, suffix = name, ext
+            break
+
+    response = send_from_directory(dist_dir, path + suffix, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if any(os.path.isfile(filename + ext) for _, ext in ENCODINGS):
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE if _is_hashed(path) else REVALIDATE_CACHE
+    return response
+
+
+def _script_json(value):
+    # 嵌入 <script> 的 JSON：转义 < > & 以免提前结束标签
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    return text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+
+
+class PageCache:
+    """
+    注入公开配置后的入口页面
+
+    在第一个 <script> 之前插入 window.__PUBLIC_CONFIG__，前端无需再请求 /api/config；
+    生成的响应体（含预压缩版本）缓存在进程内，只有注入的配置或页面文件变化时才重新生成
+
+    Args:
+        name (str): 页面文件名（相对于 dist 或 web 目录）
+        source_dir (str): 未构建时读取页面的目录
+    """
+
+    def __init__(self, name, source_dir=SOURCE_DIR):
+        self.name = name
+        self.source_dir = source_dir
+        self._lock = threading.Lock()
+        self._key = None
+        self._page = None
+
+    def _path(self, dist_dir):
+        built = os.path.join(dist_dir, self.name)
+        if is_built(dist_dir) and os.path.isfile(built):
+            return built
+        return os.path.join(self.source_dir, self.name)
+
+    def _render(self, path, public_config):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        index = html.find('<script')
+        if index < 0:
+            index = html.rfind('</body>')
+        if index >= 0:
+            indent = html[html.rfind('\n', 0, index) + 1:index]
+            script = f'<script>window.__PUBLIC_CONFIG__={_script_json(public_config)};</script>\n{indent}'
+            html = html[:index] + script + html[index:]
+        body = html.encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()[:32]
+        return body, compress(body), etag
+
+    def get(self, public_config, dist_dir=DIST_DIR):
+        """返回页面响应（支持 If-None-Match 和 Accept-Encoding）"""
+        path = self._path(dist_dir)
+        key = (path, os.stat(path).st_mtime_ns, _script_json(public_config))
+        page = self._page
+        if self._key != key:
+            with self._lock:
+                if self._key != key:
+                    self._page = self._render(path, public_config)
+                    self._key = key
+                page = self._page
+        body, variants, etag = page
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            encoding = next((name for name, _ in ENCODINGS
+                             if name in variants and request.accept_encodings[name]), None)
+            response = Response(variants[encoding] if encoding else body, mimetype='text/html')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = REVALIDATE_CACHE
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description='构建 web/ 静态资源')
+    parser.add_argument('--source', default=SOURCE_DIR, help='源目录')
+    parser.add_argument('--dist', default=DIST_DIR, help='输出目录')
+    args = parser.parse_args()
+
+    _, stats = build(args.source, args.dist)
+    for relpath, original, minified in stats:
+        print(f'{relpath:<28} {original:>9,} -> {minified:>9,} 字节')
+    if brotli is None:
+        print('未安装 Brotli，只生成了 .gz 文件')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+"""
+SQLite 数据库在线备份与恢复
+使用 sqlite3 的在线备份接口（Connection.backup）分页复制数据库，服务不停机、不会得到不完整的文件：
+- 备份期间源连接保持一个读事务，复制的是开始时刻的一致快照；WAL 模式下写入不受影响，
+  也不会因为其它连接写入而导致备份反复重新开始（代价是备份期间 WAL 文件无法检查点回收）
+- 每复制一批页面暂停一段时间，避免备份占满磁盘 IO 影响请求处理
+- 备份文件先写入临时文件，校验通过后再改名，目录中只会出现完整的备份
+- 定时备份由各 worker 的后台线程检查，通过文件锁保证同一时刻只有一个进程在备份；超出保留份数的定时备份自动删除
+- 恢复前校验备份文件的完整性和数据库结构版本，并先备份当前数据库（pre-restore），
+  再通过备份接口写回正在使用的数据库文件，其它连接看到的始终是恢复前或恢复后的完整数据
+
+仅支持文件形式的 SQLite 数据库，其它数据库请使用数据库自身的备份工具
+"""
+
+import errno
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows：不支持文件锁，多个进程可能同时执行定时备份
+    fcntl = None
+
+from sqlalchemy.engine import make_url
+
+import metrics
+from database import is_memory_sqlite, is_sqlite
+from models import TZ, Config, Team, TeamMember, get_current_time
+
+logger = logging.getLogger('costrict.backup')
+
+# 备份类型：定时备份按保留份数自动删除，手动备份和恢复前的备份需手动删除
+SCHEDULED = 'scheduled'
+MANUAL = 'manual'
+PRE_RESTORE = 'pre-restore'
+LABELS = (SCHEDULED, MANUAL, PRE_RESTORE)
+
+# 恢复时备份文件中必须存在的表
+# 文件系统不支持硬链接（部分 Docker Desktop 绑定挂载、SMB、vfat 等）时 os.link 返回的错误
+NO_HARD_LINK_ERRNOS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS, errno.EXDEV}
+
+REQUIRED_TABLES = (Team.__tablename__, TeamMember.__tablename__, Config.__tablename__)
+
+Snapshot = namedtuple('Snapshot', 'name path label created_at size')
+
+
+class SnapshotError(Exception):
+    """备份文件无效，或备份/恢复无法执行"""
+
+
+def database_path(db_url, instance_path):
+    """
+    文件形式的 SQLite 数据库返回文件的绝对路径，其它数据库（及内存数据库）返回 None
+
+    与 Flask-SQLAlchemy 相同，相对路径按 instance 目录解析
+    """
+    if not is_sqlite(db_url) or is_memory_sqlite(db_url):
+        return None
+    return os.path.abspath(os.path.join(instance_path, make_url(db_url).database))
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        # 部分平台不支持对目录 fsync
+        pass
+    finally:
+        os.close(fd)
+
+
+def copy_database(source_path, dest_path, pages=256, sleep=0.02):
+    """
+    将 source_path 数据库的一致快照复制到 dest_path（新文件，日志模式为 DELETE，可独立使用）
+
+    Args:
+        pages (int): 每批复制的页面数，-1 表示一次复制全部
+        sleep (float): 每批之间暂停的秒数
+    """
+    source = sqlite3.connect(source_path, timeout=30, isolation_level=None)
+    try:
+        # 开启读事务并读取一次，固定整个备份过程看到的数据
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        dest = sqlite3.connect(dest_path)
+        try:
+            def _throttle(status, remaining, total):
+                if remaining and sleep > 0:
+                    time.sleep(sleep)
+
+            source.backup(dest, pages=pages, progress=_throttle)
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+
+def inspect(path, check=True):
+    """
+    读取备份文件的数据库结构版本和团队数
+
+    Args:
+        check (bool): 是否执行完整性检查（PRAGMA quick_check，需读取整个文件）
+
+    Returns:
+        dict: {'version': 结构版本, 'teams': 团队数}
+
+    Raises:
+        SnapshotError: 不是 SQLite 数据库、完整性检查失败或缺少必需的表
+    """
+    if not os.path.isfile(path):
+        raise SnapshotError(f'备份文件不存在: {path}')
+    # 备份文件写入后不再修改，以只读、不加锁的方式打开
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro&immutable=1', uri=True)
+    try:
+        if check:
+            result = conn.execute('PRAGMA quick_check').fetchone()[0]
+            if result != 'ok':
+                raise SnapshotError(f'备份文件完整性检查失败: {result}')
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in REQUIRED_TABLES if table not in tables]
+        if missing:
+            raise SnapshotError(f'备份文件缺少数据表: {", ".join(missing)}')
+        version = 0
+        if 'schema_version' in tables:
+            version = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+        teams = conn.execute(f'SELECT COUNT(*) FROM {Team.__tablename__}').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise SnapshotError(f'不是有效的 SQLite 数据库: {e}') from e
+    finally:
+        conn.close()
+    return {'version': version, 'teams': teams}
+
+
+class BackupManager:
+    """
+    备份目录管理：创建、列出、删除、恢复备份，以及定时备份
+
+    由 server.py 调用 configure() 设置参数；未设置数据库路径（非 SQLite 数据库）时不可用
+
+    Args:
+        database_path (str): 数据库文件路径
+        directory (str): 备份目录
+        keep (int): 保留的定时备份份数
+        interval (float): 定时备份间隔（秒），0 表示不定时备份
+        pages (int): 每批复制的页面数
+        sleep (float): 每批之间暂停的秒数
+        schema_version (int): 当前代码的数据库结构版本，高于该版本的备份不能恢复
+        on_restore (callable): 恢复完成后调用（执行迁移、重建缓存等）
+    """
+
+    def __init__(self):
+        self.database_path = None
+        self.directory = None
+        self.keep = 24
+        self.interval = 0
+        self.pages = 256
+        self.sleep = 0.02
+        self.schema_version = 0
+        self.on_restore = None
+        self._pattern = None
+        self._hard_links = True
+
+    def configure(self, database_path, directory, keep=24, interval=0, pages=256, sleep=0.02,
+                  schema_version=0, on_restore=None):
+        self.database_path = database_path
+        self.directory = directory
+        self.keep = keep
+        self.interval = interval
+        self.pages = pages
+        self.sleep = sleep
+        self.schema_version = schema_version
+        self.on_restore = on_restore
+        self._pattern = None
+        self._hard_links = True
+        if database_path:
+            stem = os.path.splitext(os.path.basename(database_path))[0]
+            self._pattern = re.compile(
+                rf'^{re.escape(stem)}-\d{{8}}-\d{{6}}(?:-\d{{3}})?-({"|".join(map(re.escape, LABELS))})\.db$')
+
+    @property
+    def enabled(self):
+        return self.database_path is not None
+
+    def _require_enabled(self):
+        if not self.enabled:
+            raise SnapshotError('当前数据库不是 SQLite 文件，请使用数据库自身的备份工具')
+
+    def snapshot(self, label=MANUAL):
+        """创建一个备份，返回 Snapshot；定时备份完成后删除超出保留份数的定时备份"""
+        self._require_enabled()
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.database_path))[0]
+        tmp_path = os.path.join(self.directory, f'.{stem}-{label}.{os.getpid()}.{threading.get_ident()}.tmp')
+        started = time.monotonic()
+        try:
+            copy_database(self.database_path, tmp_path, pages=self.pages, sleep=self.sleep)
+            inspect(tmp_path)
+            _fsync(tmp_path)
+            name = self._place(tmp_path, stem, label)
+            _fsync(self.directory)
+        except (sqlite3.Error, OSError, SnapshotError) as e:
+            metrics.record_backup(label, 'failed', time.monotonic() - started)
+            for suffix in ('', '-journal'):
+                if os.path.exists(tmp_path + suffix):
+                    os.remove(tmp_path + suffix)
+            raise SnapshotError(f'备份失败: {e}') from e
+        elapsed = time.monotonic() - started
+        metrics.record_backup(label, 'succeeded', elapsed)
+        snapshot = self._snapshot(name)
+        logger.info(f'数据库备份完成: {name}',
+                    extra={'label': label, 'size': snapshot.size, 'elapsed_ms': round(elapsed * 1000, 2)})
+        if label == SCHEDULED:
+            self.prune()
+        return snapshot
+
+    def _place(self, tmp_path, stem, label):
+        """
+        将临时文件以带毫秒的时间戳命名放入备份目录，返回文件名
+
+        同一时刻的两个备份（重复点击、管理后台与命令行同时备份）不会互相覆盖：
+        os.link 在目标已存在时失败，此时换一个时间戳重试。文件系统不支持硬链接时
+        改为以 O_CREAT | O_EXCL 创建空文件占用文件名，再用 os.replace 覆盖
+        （覆盖前的一瞬间目录中是一个空文件，校验不通过，不会被恢复）
+        """
+        while True:
+            now = get_current_time()
+            name = f'{stem}-{now.strftime("%Y%m%d-%H%M%S")}-{now.microsecond // 1000:03d}-{label}.db'
+            path = os.path.join(self.directory, name)
+            try:
+                if self._hard_links:
+                    os.link(tmp_path, path)
+                    os.remove(tmp_path)
+                else:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                    try:
+                        os.replace(tmp_path, path)
+                    except OSError:
+                        os.remove(path)
+                        raise
+            except FileExistsError:
+                time.sleep(0.001)
+                continue
+            except OSError as e:
+                if not self._hard_links or e.errno not in NO_HARD_LINK_ERRNOS:
+                    raise
+                logger.info(f'备份目录不支持硬链接，改为占用文件名后改名: {e}')
+                self._hard_links = False
+                continue
+            return name
+
+    def _snapshot(self, name):
+        path = os.path.join(self.directory, name)
+        stat = os.stat(path)
+        return Snapshot(name, path, self._pattern.match(name).group(1),
+                        datetime.fromtimestamp(stat.st_mtime, TZ), stat.st_size)
+
+    def list(self):
+        """目录中的备份，按创建时间从新到旧排列"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if self._pattern.match(name):
+                try:
+                    snapshots.append(self._snapshot(name))
+                except FileNotFoundError:
+                    # 列出期间被删除
+                    continue
+        return sorted(snapshots, key=lambda snapshot: (snapshot.created_at, snapshot.name), reverse=True)
+
+    def get(self, name):
+        """按文件名查找备份目录中的备份（只接受目录中的备份文件名）"""
+        for snapshot in self.list():
+            if snapshot.name == name:
+                return snapshot
+        raise SnapshotError(f'备份不存在: {name}')
+
+    def delete(self, name):
+        os.remove(self.get(name).path)
+        logger.info(f'已删除数据库备份: {name}')
+
+    def prune(self):
+        """删除超出保留份数的定时备份，返回删除的备份"""
+        scheduled = [snapshot for snapshot in self.list() if snapshot.label == SCHEDULED]
+        removed = scheduled[self.keep:] if self.keep > 0 else []
+        for snapshot in removed:
+            try:
+                os.remove(snapshot.path)
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def restore(self, path):
+        """
+        用备份文件替换当前数据库
+
+        先校验备份文件（完整性、必需的表、结构版本不高于当前代码），再备份当前数据库，
+        最后在一个写事务中将备份内容写回数据库文件。版本较低的备份恢复后由 on_restore 执行迁移
+
+        Returns:
+            Snapshot: 恢复前创建的当前数据库备份
+        """
+        self._require_enabled()
+        info = inspect(path)
+        if info['version'] > self.schema_version:
+            raise SnapshotError(f'备份的数据库结构版本 {info["version"]} 高于当前程序支持的版本 '
+                                f'{self.schema_version}，请使用对应版本的程序恢复')
+        previous = self.snapshot(PRE_RESTORE)
+        source = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro&immutable=1', uri=True)
+        try:
+            dest = sqlite3.connect(self.database_path, timeout=30)
+            try:
+                source.backup(dest)
+            finally:
+                dest.close()
+        except sqlite3.Error as e:
+            raise SnapshotError(f'恢复失败，当前数据库未改变: {e}') from e
+        finally:
+            source.close()
+        logger.warning(f'已从备份恢复数据库: {os.path.basename(path)}',
+                       extra={'teams': info['teams'], 'version': info['version'], 'previous': previous.name})
+        if self.on_restore is not None:
+            self.on_restore()
+        return previous
+
+    def run_pending(self):
+        """距上一次定时备份已超过间隔时创建定时备份；其它进程正在备份时跳过，返回创建的 Snapshot 或 None"""
+        if not self.enabled or self.interval <= 0:
+            return None
+        if not self._due():
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.backup.lock'), 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+            # 取得锁之后再检查一次：其它进程可能刚完成备份
+            if not self._due():
+                return None
+            return self.snapshot(SCHEDULED)
+
+    def _due(self):
+        for snapshot in self.list():
+            if snapshot.label == SCHEDULED:
+                return time.time() - snapshot.created_at.timestamp() >= self.interval
+        return True
+
+
+class BackupScheduler(threading.Thread):
+    """
+    定时备份线程：每个进程启动一个，定期检查是否需要备份（实际备份由取得文件锁的进程执行）
+
+    Args:
+        manager (BackupManager): 备份管理
+        check_interval (float): 检查间隔（秒）
+    """
+
+    def __init__(self, manager, check_interval=60):
+        super().__init__(name='backup-scheduler', daemon=True)
+        self.manager = manager
+        self.check_interval = check_interval
+
+    def run(self):
+        while True:
+            try:
+                self.manager.run_pending()
+            except Exception as e:
+                logger.exception(f'定时备份失败: {e}')
+            time.sleep(self.check_interval)
+
+
+backups = BackupManager()
@@ -0,0 +1,89 @@
+"""
+批量导入基准测试
+生成 N 个团队（每队 M 名成员，每个成员一行）的 CSV 或 NDJSON 文件，导入临时 SQLite 数据库，
+报告耗时及每秒导入的成员数；导入后核对成员数、统计数据和全文索引
+
+用法：python benchmarks/bench_import.py [--teams 20000] [--members 5] [--format csv] [--batch-size 2000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLUMNS = ('team_name', 'competition_track', 'project_name', 'costrict_uid', 'project_intro',
+           'member_name', 'member_type', 'member_school', 'member_department', 'member_major_grade',
+           'member_phone', 'member_email', 'member_role')
+
+
+def make_rows(team_count, member_count):
+    """每个成员一行；与导出文件相同，团队信息在每一行重复"""
+    for index in range(team_count):
+        team = (f'导入团队-{index}', '技术挑战赛', '基准作品', f'uid-{index}', '项' * 300)
+        for i in range(member_count):
+            yield team + (f'成员{i}', '队长' if i == 0 else '队员', f'大学{index % 50}', '计算机学院', '大三',
+                          '13800138000', f'm{index}_{i}@example.com', '开发')
+
+
+def write_file(path, file_format, team_count, member_count):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if file_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(make_rows(team_count, member_count))
+        else:
+            for row in make_rows(team_count, member_count):
+                f.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量导入基准测试')
+    parser.add_argument('--teams', type=int, default=20000, help='团队数')
+    parser.add_argument('--members', type=int, default=5, help='每个团队的成员数')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), default='csv', help='文件格式')
+    parser.add_argument('--batch-size', type=int, default=None, help='每个事务插入的成员数上限')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_import_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir, 'users.db')
+    os.environ.setdefault('METRICS_DIR', os.path.join(tmpdir, 'metrics'))
+
+    import server
+    import importer
+    import search
+    import stats
+    from models import db, TeamMember
+
+    if not server.init_db():
+        sys.exit(1)
+    path = os.path.join(tmpdir, f'teams.{args.format}')
+    write_file(path, args.format, args.teams, args.members)
+    size = os.path.getsize(path) / 1024 / 1024
+
+    with server.app.app_context(), open(path, 'rb') as f:
+        result = importer.import_file(db.session, f, args.format,
+                                      batch_size=args.batch_size or importer.IMPORT_BATCH_SIZE)
+        members = db.session.scalar(db.select(db.func.count(TeamMember.id)))
+        summary = stats.summary(db.session)
+        found, _ = search.search_teams(db.session, f'导入团队-{args.teams - 1}', limit=1)
+
+    print(f'{args.format.upper()} 文件 {size:.1f} MiB，{args.teams} 个团队，{args.teams * args.members} 名成员')
+    print(result.summary())
+    print(f'吞吐: {result.imported_members / result.elapsed:.0f} 成员/秒')
+    expected = args.teams * args.members
+    if result.errors or members != expected or summary['members'] != expected or summary['teams'] != args.teams:
+        print(f'核对失败: 成员表 {members}，统计 {summary["teams"]}/{summary["members"]}，'
+              f'首个错误 {result.errors[:1]}')
+        sys.exit(1)
+    if not found:
+        print('核对失败: 全文索引中找不到最后导入的团队')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+团队列表序列化的微基准测试
+在内存中构造 N 个团队（每队 M 名成员），分别统计：
+- 原实现：逐字段构造字典、strftime 格式化时间、Flask 默认 JSON 编码（标准库 json，键排序、中文转义）
+- serializers.py + 标准库 json
+- serializers.py + orjson（已安装时）
+
+用法：python benchmarks/bench_serialize.py [--teams 10000] [--members 5] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz  # noqa: E402
+from flask import Flask  # noqa: E402
+
+import serializers  # noqa: E402
+from models import Team, TeamMember  # noqa: E402
+
+
+def legacy_team_to_dict(team):
+    """改用 serializers.py 之前 get_team() 中的实现，作为对比基准"""
+    return {
+        'id': team.id,
+        'createdAt': (team.createdAt.strftime('%Y-%m-%d %H:%M:%S') if team.createdAt else ''),
+        'updatedAt': (team.updatedAt.strftime('%Y-%m-%d %H:%M:%S') if team.updatedAt else ''),
+        'team_name': team.team_name,
+        'competition_track': team.competition_track,
+        'project_name': team.project_name,
+        'repo_url': team.repo_url or '',
+        'costrict_uid': team.costrict_uid,
+        'project_intro': team.project_intro or '',
+        'tech_solution': team.tech_solution or '',
+        'goals_and_outlook': team.goals_and_outlook or '',
+        'members': [{
+            'id': member.id,
+            'name': member.name,
+            'member_type': member.member_type,
+            'school': member.school,
+            'department': member.department,
+            'major_grade': member.major_grade,
+            'phone': member.phone,
+            'email': member.email,
+            'student_id': member.student_id or '',
+            'role': member.role,
+            'tech_stack': member.tech_stack or '',
+            'desc': member.desc or ''
+        } for member in team.members]
+    }
+
+
+def make_teams(team_count, member_count):
+    """构造与数据库读出的实例结构相同的团队（新提交的团队 createdAt 与 updatedAt 相同）"""
+    base = pytz.timezone('Asia/Shanghai').localize(datetime(2025, 3, 1, 9, 0, 0))
+    teams = []
+    for i in range(team_count):
+        created_at = base + timedelta(seconds=37 * i)
+        team = Team(id=i + 1, team_name=f'基准测试团队{i}', competition_track='技术挑战赛',
+                    project_name=f'作品{i}', repo_url=None if i % 3 else f'https://github.com/example/{i}',
+                    costrict_uid=f'uid-{i}', project_intro='项' * 300, tech_solution='技' * 200,
+                    goals_and_outlook=None, createdAt=created_at, updatedAt=created_at)
+        team.members = [TeamMember(
+            id=i * member_count + j + 1, team_id=i + 1, team_name=team.team_name, name=f'成员{j}',
+            member_type='队长' if j == 0 else '队员', school='某某大学', department='计算机学院',
+            major_grade='计算机科学 大三', phone='1380013%04d' % j, email=f'member{i}_{j}@example.com',
+            student_id=None if j % 2 else f'2023{j:04d}', role='后端开发', tech_stack='Python, Flask',
+            desc=None, createdAt=created_at, updatedAt=created_at,
+        ) for j in range(member_count)]
+        teams.append(team)
+    return teams
+
+
+def measure(repeat, run):
+    """返回 repeat 次中最快一次的 (耗时, 结果)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='团队列表序列化微基准测试')
+    parser.add_argument('--teams', type=int, default=10000, help='团队数')
+    parser.add_argument('--members', type=int, default=5, help='每队成员数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    teams = make_teams(args.teams, args.members)
+    payload = lambda data: {'success': True, 'data': data, 'count': len(data), 'next_cursor': None}  # noqa: E731
+    assert [legacy_team_to_dict(team) for team in teams[:100]] == \
+        [serializers.team_to_dict(team) for team in teams[:100]], '序列化结果与原实现不一致'
+
+    app = Flask(__name__)
+    stdlib_provider = serializers.JSONProvider(app)
+    stdlib_provider.use_orjson = False
+    cases = [
+        ('原实现 + 标准库 json', legacy_team_to_dict,
+         lambda data: json.dumps(data, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')),
+        ('serializers + 标准库 json', serializers.team_to_dict,
+         lambda data: stdlib_provider.dumps(data, separators=(',', ':')).encode('utf-8')),
+    ]
+    if serializers.orjson is not None:
+        orjson_provider = serializers.JSONProvider(app)
+        cases.append(('serializers + orjson', serializers.team_to_dict, orjson_provider._orjson_dumps))
+    else:
+        print('未安装 orjson，跳过 orjson 对比')
+
+    print(f'{args.teams} 个团队，每队 {args.members} 名成员')
+    for name, to_dict, encode in cases:
+        serializers._format_datetime.cache_clear()
+        to_dict_time, data = measure(args.repeat, lambda: [to_dict(team) for team in teams])
+        encode_time, body = measure(args.repeat, lambda: encode(payload(data)))
+        print(f'{name:<28} 转字典 {to_dict_time * 1000:8.1f} ms  编码 {encode_time * 1000:8.1f} ms  '
+              f'合计 {(to_dict_time + encode_time) * 1000:8.1f} ms  {len(body) / 1024 / 1024:6.2f} MiB')
+
+
+if __name__ == '__main__':
+    main()
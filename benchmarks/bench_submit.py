@@ -0,0 +1,93 @@
+"""
+团队提交吞吐基准测试
+在临时 SQLite 文件上通过 Flask 测试客户端连续调用 POST /api/team/submit，
+报告每秒处理的提交数（含校验与写库），可用于对比 save_team 修改前后的性能
+
+用法：python benchmarks/bench_submit.py [--count 2000] [--members 5] [--threads 1]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_payload(index, member_count):
+    return {
+        'team_info': {
+            'team_name': f'基准团队-{index}',
+            'competition_track': '技术挑战赛',
+            'project_name': '基准作品',
+            'costrict_uid': f'uid-{index}',
+            'project_intro': '项' * 300,
+        },
+        'members': [{
+            'name': f'成员{i}',
+            'member_type': '队长' if i == 0 else '队员',
+            'school': '某某大学',
+            'department': '计算机学院',
+            'major_grade': '大三',
+            'phone': '13800138000',
+            'email': f'm{index}_{i}@example.com',
+            'role': '开发',
+        } for i in range(member_count)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='团队提交吞吐基准测试')
+    parser.add_argument('--count', type=int, default=2000, help='提交总数')
+    parser.add_argument('--members', type=int, default=5, help='每个团队的成员数')
+    parser.add_argument('--threads', type=int, default=1, help='并发线程数')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_submit_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir, 'users.db')
+    # 所有请求来自同一 IP，关闭提交限流和并发上限
+    os.environ.setdefault('SUBMIT_RATE_PER_MINUTE', '0')
+    os.environ.setdefault('SUBMIT_MAX_CONCURRENCY', '0')
+
+    import server
+
+    if not server.init_db():
+        sys.exit(1)
+    payloads = [make_payload(i, args.members) for i in range(args.count)]
+    failures = []
+
+    def worker(chunk):
+        client = server.app.test_client()
+        for payload in chunk:
+            response = client.post('/api/team/submit', json=payload)
+            if response.status_code != 200:
+                failures.append(response.get_json())
+
+    # 提交日志会干扰计时，基准期间丢弃标准输出
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        threads = [threading.Thread(target=worker, args=(payloads[i::args.threads],))
+                   for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f'提交数: {args.count}，成员数: {args.members}，线程数: {args.threads}')
+    print(f'耗时: {elapsed:.2f}s，吞吐: {args.count / elapsed:.1f} 次/秒，失败: {len(failures)}')
+    if failures:
+        print(f'首个失败响应: {failures[0]}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
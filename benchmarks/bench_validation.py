@@ -0,0 +1,61 @@
+"""
+报名数据校验的微基准测试
+统计 validate_submission 在 1、5、10 名成员时单次提交的校验耗时
+
+用法：python benchmarks/bench_validation.py [--number 20000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validators import validate_submission  # noqa: E402
+
+
+def make_submission(member_count):
+    """构造一份合法的报名数据，第一名成员为队长"""
+    return {
+        'team_info': {
+            'team_name': '基准测试团队',
+            'competition_track': '技术挑战赛',
+            'project_name': '基准测试作品',
+            'repo_url': 'https://github.com/example/repo',
+            'costrict_uid': 'uid-benchmark',
+            'project_intro': '项' * 300,
+            'tech_solution': '技' * 300,
+            'goals_and_outlook': '目' * 300,
+        },
+        'members': [{
+            'name': f'成员{i}',
+            'member_type': '队长' if i == 0 else '队员',
+            'school': '某某大学',
+            'department': '计算机学院',
+            'major_grade': '计算机科学 大三',
+            'phone': '1380013%04d' % i,
+            'email': f'member{i}@example.com',
+            'student_id': f'2023{i:04d}',
+            'role': '后端开发',
+            'tech_stack': 'Python, Flask',
+        } for i in range(member_count)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报名数据校验微基准测试')
+    parser.add_argument('--number', type=int, default=20000, help='每组重复次数')
+    args = parser.parse_args()
+
+    for member_count in (1, 5, 10):
+        submission = make_submission(member_count)
+        _, _, errors = validate_submission(submission)
+        assert not errors, errors
+        best = min(timeit.repeat(lambda: validate_submission(submission),
+                                 number=args.number, repeat=5))
+        print(f'{member_count:>2} 名成员: {best / args.number * 1e6:8.2f} µs/次')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+团队读取接口的 SQL 查询数回归检查
+分别在 5 个和 40 个团队（成员数不同）的临时 SQLite 数据库上统计 read_teams()、/api/teams、/api/team/<id>
+执行的 SQL 条数，团队或成员增多时查询数发生变化（N+1 查询）即以非零状态码退出
+
+用法：python benchmarks/check_query_count.py
+"""
+
+import base64
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# read_teams() 为 teams + team_members（selectinload）共 2 条查询
+READ_TEAMS_QUERIES = 2
+
+
+def make_team(index, member_count):
+    team_data = {
+        'team_name': f'查询数团队-{index}',
+        'competition_track': '技术挑战赛',
+        'project_name': '查询数作品',
+        'costrict_uid': f'uid-{index}',
+    }
+    members_data = [{
+        'name': f'成员{i}',
+        'member_type': '队长' if i == 0 else '队员',
+        'school': '某某大学',
+        'phone': '13800138000',
+        'email': f'q{index}_{i}@example.com',
+    } for i in range(member_count)]
+    return team_data, members_data
+
+
+def main():
+    tmpdir = tempfile.mkdtemp(prefix='check_query_count_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir, 'users.db')
+    for name, filename in (('METRICS_DIR', 'metrics'), ('CONFIG_CACHE_SIGNAL_FILE', 'config.version'),
+                           ('RATE_LIMIT_DB_PATH', 'ratelimit.db'), ('JOBS_DB_PATH', 'jobs.db'),
+                           ('MAIL_FILE_DIR', 'mail'), ('BACKUP_DIR', 'backups')):
+        os.environ.setdefault(name, os.path.join(tmpdir, filename))
+    os.environ.setdefault('BACKUP_INTERVAL_MINUTES', '0')
+
+    import server
+    from sqlalchemy import event
+    from models import db
+
+    if not server.init_db():
+        sys.exit(1)
+    client = server.app.test_client()
+    credentials = f'{os.getenv("ADMIN_USERNAME", "admin")}:{os.getenv("ADMIN_PASSWORD", "admin")}'
+    auth = {'Authorization': 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')}
+    with server.app.app_context():
+        engine = db.engine
+
+    def count(run):
+        statements = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', _count)
+        try:
+            result = run()
+        finally:
+            event.remove(engine, 'before_cursor_execute', _count)
+        return len(statements), result
+
+    def read_teams():
+        with server.app.app_context():
+            return server.read_teams()
+
+    def measure(team_count, detail_index):
+        # 第 i 个团队有 1-5 名成员，团队越多成员总数也越多
+        with server.app.app_context():
+            team_ids = []
+            existing = db.session.scalar(db.select(db.func.count(server.Team.id)))
+            for index in range(existing, team_count):
+                success, team_id = server.save_team(*make_team(index, index % 5 + 1))
+                if not success:
+                    print(f'创建团队失败: {team_id}')
+                    sys.exit(1)
+                team_ids.append(team_id)
+        # 先请求一次，排除配置缓存等首次加载的查询
+        client.get('/api/teams?limit=500', headers=auth)
+        counts = {}
+        counts['read_teams()'], teams = count(read_teams)
+        if len(teams) != team_count:
+            print(f'read_teams() 返回 {len(teams)} 个团队，应为 {team_count}')
+            sys.exit(1)
+        counts['/api/teams'], response = count(lambda: client.get('/api/teams?limit=500', headers=auth))
+        if response.status_code != 200 or len(response.get_json()['data']) != team_count:
+            print(f'/api/teams 返回 {response.status_code}')
+            sys.exit(1)
+        team_id = team_ids[detail_index]
+        counts['/api/team/<id>'], response = count(lambda: client.get(f'/api/team/{team_id}', headers=auth))
+        if response.status_code != 200:
+            print(f'/api/team/{team_id} 返回 {response.status_code}')
+            sys.exit(1)
+        return counts
+
+    # 详情分别读取 1 名成员和 5 名成员的团队
+    small = measure(5, 0)
+    large = measure(40, -1)
+    failures = []
+    for name in small:
+        changed = small[name] != large[name]
+        print(f'[{"FAIL" if changed else "OK"}] {name}: 5 个团队 {small[name]} 条，40 个团队 {large[name]} 条')
+        if changed:
+            failures.append(name)
+    if large['read_teams()'] != READ_TEAMS_QUERIES:
+        print(f'[FAIL] read_teams() 应为 {READ_TEAMS_QUERIES} 条查询')
+        failures.append('read_teams()')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
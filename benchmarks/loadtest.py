@@ -0,0 +1,362 @@
+"""
+报名接口负载测试
+在临时 SQLite 文件上启动 gunicorn（或 uvicorn、werkzeug 开发服务器），按接口依次施加并发负载，
+统计每个接口的 p50/p95/p99 延迟和每秒请求数，结果保存为 JSON 以便跨提交对比
+
+用法：
+    python benchmarks/loadtest.py --workers 1,2,4 --concurrency 16 --duration 10
+    python benchmarks/loadtest.py --compare benchmarks/results/a.json benchmarks/results/b.json
+
+对比 WSGI 与 ASGI 在慢客户端下的吞吐（每个提交请求在发送请求头后等待 200ms 再发送请求体）：
+    python benchmarks/loadtest.py --server gunicorn --endpoints submit --concurrency 64 --slow-client-ms 200
+    python benchmarks/loadtest.py --server uvicorn --endpoints submit --concurrency 64 --slow-client-ms 200
+
+完全离线运行，不依赖任何外部服务
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+ENDPOINTS = ('submit', 'teams', 'team', 'config')
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂'
+SCHOOLS = ('清华大学', '北京大学', '浙江大学', '复旦大学', '上海交通大学', '南京大学',
+           '中山大学', '武汉大学', '华中科技大学', '深圳大学')
+DEPARTMENTS = ('计算机学院', '软件学院', '电子信息学院', '人工智能学院', '数学学院')
+ROLES = ('前端开发', '后端开发', '算法', 'UI/UX设计', '产品经理', '测试')
+TECH_STACKS = ('Python, Flask', 'React, TypeScript', 'Go, Kubernetes', 'PyTorch, CUDA', 'Java, Spring')
+FILLER = '本项目基于大模型辅助编程能力构建面向校园场景的智能开发工具，覆盖需求分析、代码生成、测试与部署全流程。'
+
+
+def _text(rng, min_len=200, max_len=500):
+    length = rng.randint(min_len, max_len)
+    return (FILLER * (length // len(FILLER) + 1))[:length]
+
+
+def make_member(rng, member_type, serial):
+    return {
+        'name': rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2))),
+        'member_type': member_type,
+        'school': rng.choice(SCHOOLS),
+        'department': rng.choice(DEPARTMENTS),
+        'major_grade': f'计算机科学 大{"一二三四"[rng.randint(0, 3)]}',
+        'phone': '1' + rng.choice('3456789') + ''.join(rng.choice('0123456789') for _ in range(9)),
+        'email': f'user{serial}_{rng.randint(0, 10 ** 6)}@example.com',
+        'student_id': str(rng.randint(10 ** 9, 10 ** 10 - 1)),
+        'role': rng.choice(ROLES),
+        'tech_stack': rng.choice(TECH_STACKS),
+    }
+
+
+def make_submission(rng, serial):
+    """生成一份合法的报名数据：1 名队长、0-4 名队员、可选 1 名指导老师"""
+    members = [make_member(rng, '队长', serial)]
+    members += [make_member(rng, '队员', serial) for _ in range(rng.randint(0, 4))]
+    if rng.random() < 0.5:
+        members.append(make_member(rng, '指导老师', serial))
+    return {
+        'team_info': {
+            'team_name': f'团队{serial}-{rng.randint(0, 10 ** 9)}'[:50],
+            'competition_track': rng.choice(('技术挑战赛', '创新应用赛')),
+            'project_name': f'作品{serial}',
+            'repo_url': f'https://github.com/example/project-{serial}',
+            'costrict_uid': f'uid-{serial}',
+            'project_intro': _text(rng),
+            'tech_solution': _text(rng),
+            'goals_and_outlook': _text(rng),
+        },
+        'members': members,
+    }
+
+
+class Client:
+    """
+    保持长连接的 HTTP 客户端，服务器关闭连接时自动重连
+
+    slow_ms 大于 0 时模拟慢客户端：发送请求头后等待 slow_ms 毫秒再发送请求体
+    """
+
+    def __init__(self, host, port, slow_ms=0):
+        self.host = host
+        self.port = port
+        self.slow_ms = slow_ms
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                if body is not None and self.slow_ms > 0:
+                    self.conn.putrequest(method, path)
+                    for name, value in headers.items():
+                        self.conn.putheader(name, value)
+                    self.conn.putheader('Content-Length', str(len(body)))
+                    self.conn.endheaders()
+                    time.sleep(self.slow_ms / 1000)
+                    self.conn.send(body)
+                else:
+                    self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.conn.close()
+                    self.conn = None
+                return response.status, data
+            except (ConnectionError, http.client.HTTPException, socket.timeout):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def run_endpoint(endpoint, host, port, concurrency, duration, team_ids, seed, slow_ms=0):
+    """对单个接口施加 duration 秒的并发负载"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+    serial = [0]
+
+    def next_request(rng):
+        if endpoint == 'submit':
+            with lock:
+                serial[0] += 1
+                current = serial[0]
+            return 'POST', '/api/team/submit', make_submission(rng, f'{seed}-{current}')
+        if endpoint == 'teams':
+            return 'GET', '/api/teams?limit=50&fields=id,team_name,competition_track,members', None
+        if endpoint == 'team':
+            return 'GET', f'/api/team/{rng.choice(team_ids)}', None
+        return 'GET', '/api/config?config_key=DEADLINE', None
+
+    def worker(index):
+        rng = random.Random(f'{seed}-{endpoint}-{index}')
+        client = Client(host, port, slow_ms)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            method, path, body = next_request(rng)
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body)
+                ok = status < 400 or (endpoint == 'config' and status == 404)
+            except Exception:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - started)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server, workers, port, db_path, extra_env):
+    env = dict(os.environ)
+    # 所有请求来自同一 IP，默认关闭提交限流和并发上限（可通过 --env 开启）
+    env.setdefault('SUBMIT_RATE_PER_MINUTE', '0')
+    env.setdefault('SUBMIT_MAX_CONCURRENCY', '0')
+    env.setdefault('ASGI_SUBMIT_MAX_CONCURRENCY', '0')
+    # 数据库以外的本地状态（指标快照、配置缓存信号、限流、受理队列、任务队列、邮件、备份）
+    # 同样放在临时目录中，压测不读取也不修改仓库 instance/ 下的文件（可通过 --env 覆盖）
+    tmpdir = os.path.dirname(db_path)
+    for name, filename in (('METRICS_DIR', 'metrics'), ('CONFIG_CACHE_SIGNAL_FILE', 'config.version'),
+                           ('RATE_LIMIT_DB_PATH', 'ratelimit.db'), ('INTAKE_DB_PATH', 'intake.db'),
+                           ('JOBS_DB_PATH', 'jobs.db'), ('MAIL_FILE_DIR', 'mail'), ('BACKUP_DIR', 'backups')):
+        env[name] = os.path.join(tmpdir, filename)
+    env.setdefault('MAIL_BACKEND', 'file')
+    env.update(extra_env)
+    env['DATABASE_URL'] = 'sqlite:///' + db_path
+    env['PYTHONUNBUFFERED'] = '1'
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--timeout', '120', '--log-level', 'warning',
+               'wsgi:application']
+    elif server == 'uvicorn':
+        cmd = [sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+               'asgi:application']
+    else:
+        cmd = [sys.executable, '-c',
+               'from wsgi import application; '
+               f'application.run(host="127.0.0.1", port={port}, threaded=True)']
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = Client('127.0.0.1', port)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'服务器启动失败（退出码 {process.returncode}）')
+        try:
+            client.request('GET', '/api/config?config_key=DEADLINE')
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('等待服务器启动超时')
+
+
+def seed_teams(port, count, seed):
+    """预先写入 count 个团队，返回团队 ID 列表"""
+    client = Client('127.0.0.1', port)
+    rng = random.Random(f'seed-{seed}')
+    team_ids = []
+    for i in range(count):
+        status, data = client.request('POST', '/api/team/submit', make_submission(rng, f'seed-{i}'))
+        if status == 200:
+            team_ids.append(json.loads(data)['team_id'])
+    if not team_ids:
+        raise RuntimeError('预置团队数据失败')
+    return team_ids
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    worker_counts = [int(value) for value in args.workers.split(',')]
+    endpoints = [value for value in args.endpoints.split(',') if value]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f'未知的接口: {", ".join(sorted(unknown))}')
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'server': args.server,
+            'concurrency': args.concurrency,
+            'slow_client_ms': args.slow_client_ms,
+            'duration': args.duration,
+            'seed_teams': args.seed_teams,
+            'env': extra_env,
+        },
+        'results': {},
+    }
+    for workers in worker_counts:
+        tmpdir = tempfile.mkdtemp(prefix='loadtest_')
+        port = free_port()
+        process = start_server(args.server, workers, port, os.path.join(tmpdir, 'users.db'), extra_env)
+        try:
+            team_ids = seed_teams(port, args.seed_teams, args.seed)
+            results = {}
+            for endpoint in endpoints:
+                results[endpoint] = run_endpoint(endpoint, '127.0.0.1', port, args.concurrency,
+                                                 args.duration, team_ids, args.seed, args.slow_client_ms)
+                stats = results[endpoint]
+                print(f'workers={workers:<2} {endpoint:<7} {stats["rps"]:>9} req/s  '
+                      f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms p99={stats["p99_ms"]}ms '
+                      f'errors={stats["errors"]}')
+            report['results'][str(workers)] = results
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now().strftime("%Y%m%d-%H%M%S")}-{report["commit"]}.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'结果已保存: {output}')
+
+
+def compare(baseline_path, current_path):
+    """对比两次测试结果，输出吞吐和 p95 延迟的变化"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)
+    print(f'{baseline["commit"]} -> {current["commit"]}')
+    for workers, results in current['results'].items():
+        for endpoint, stats in results.items():
+            old = baseline['results'].get(workers, {}).get(endpoint)
+            if not old:
+                continue
+            rps_change = (stats['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0
+            print(f'workers={workers:<2} {endpoint:<7} req/s {old["rps"]:>9} -> {stats["rps"]:<9} '
+                  f'({rps_change:+.1f}%)  p95 {old["p95_ms"]}ms -> {stats["p95_ms"]}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报名接口负载测试')
+    parser.add_argument('--workers', default='2', help='逗号分隔的 worker 数量，例如 1,2,4')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--duration', type=float, default=10, help='每个接口的测试时长（秒）')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='逗号分隔的接口：' + ','.join(ENDPOINTS))
+    parser.add_argument('--seed-teams', type=int, default=200, help='测试前预置的团队数')
+    parser.add_argument('--seed', type=int, default=1, help='随机数种子')
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--slow-client-ms', type=float, default=0,
+                        help='模拟慢客户端：提交请求发送请求头后等待的毫秒数')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='传递给服务器的环境变量，可重复，例如 --env SUBMIT_INTAKE_MODE=queue')
+    parser.add_argument('--output', help='结果文件路径，默认保存到 benchmarks/results/')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='对比两个结果文件')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+本地 SMTP 收信服务（测试用）
+接收所有邮件并保存为目录下的 .eml 文件，不做认证、不转发，用于在没有邮件服务器时验证 MAIL_BACKEND=smtp
+
+用法：python benchmarks/smtp_sink.py [--port 8025] [--dir mail_sink] [--reject 坏地址@example.com]
+      SMTP_HOST=127.0.0.1 SMTP_PORT=8025 gunicorn ...
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+
+class SMTPSink:
+    """
+    最小的 SMTP 服务端：支持 HELO/EHLO、MAIL、RCPT、DATA、RSET、NOOP、QUIT
+
+    Args:
+        directory (str): 保存邮件的目录
+        reject (set): 拒收的收件地址（返回 550，用于验证不重试的失败）
+    """
+
+    def __init__(self, directory, reject=()):
+        self.directory = directory
+        self.reject = {address.lower() for address in reject}
+        self.received = 0
+        os.makedirs(directory, exist_ok=True)
+
+    async def handle(self, reader, writer):
+        async def reply(line):
+            writer.write(f'{line}\r\n'.encode('ascii'))
+            await writer.drain()
+
+        await reply('220 smtp-sink ready')
+        recipients = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                await reply('250 smtp-sink')
+            elif verb == 'MAIL':
+                recipients = []
+                await reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.partition(':')[2].strip().strip('<>').lower()
+                if address in self.reject:
+                    await reply('550 mailbox unavailable')
+                else:
+                    recipients.append(address)
+                    await reply('250 OK')
+            elif verb == 'DATA':
+                await reply('354 end data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = await reader.readline()
+                    if data in (b'.\r\n', b'.\n', b''):
+                        break
+                    # 去掉点转义
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                self.save(b''.join(lines))
+                await reply('250 OK')
+            elif verb == 'QUIT':
+                await reply('221 bye')
+                break
+            elif verb in ('RSET', 'NOOP'):
+                await reply('250 OK')
+            else:
+                await reply('502 command not implemented')
+        writer.close()
+
+    def save(self, message):
+        self.received += 1
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.eml')
+        with open(path, 'wb') as f:
+            f.write(message)
+        print(f'已收到第 {self.received} 封邮件: {path}', flush=True)
+
+
+async def serve(host, port, sink):
+    server = await asyncio.start_server(sink.handle, host, port)
+    print(f'SMTP 收信服务已启动 {host}:{port}，邮件保存到 {sink.directory}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 SMTP 收信服务（测试用）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--dir', default='mail_sink', help='保存邮件的目录')
+    parser.add_argument('--reject', action='append', default=[], help='拒收的收件地址，可重复指定')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, SMTPSink(args.dir, args.reject)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+save_team 并发写入压力测试
+在临时 SQLite 文件上由多个线程同时调用 save_team，统计成功数、失败数
+以及 "database is locked" 错误数；存在锁错误时以非零状态码退出
+
+用法：python benchmarks/stress_save_team.py [--threads 32] [--per-thread 50] [--members 5]
+对比未调优的 SQLite：SQLITE_JOURNAL_MODE=DELETE SQLITE_BUSY_TIMEOUT=0 python benchmarks/stress_save_team.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_team(thread_index, index, member_count):
+    team_data = {
+        'team_name': f'压测团队-{thread_index}-{index}',
+        'competition_track': '技术挑战赛',
+        'project_name': '压测作品',
+        'costrict_uid': f'uid-{thread_index}-{index}',
+    }
+    members_data = [{
+        'name': f'成员{i}',
+        'member_type': '队长' if i == 0 else '队员',
+        'school': '某某大学',
+        'department': '计算机学院',
+        'major_grade': '大三',
+        'phone': '13800138000',
+        'email': f'm{thread_index}_{index}_{i}@example.com',
+        'role': '开发',
+    } for i in range(member_count)]
+    return team_data, members_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='save_team 并发写入压力测试')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--per-thread', type=int, default=50)
+    parser.add_argument('--members', type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='stress_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmpdir, 'users.db')
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+
+    from server import app, init_db, save_team
+
+    if not init_db():
+        sys.exit(1)
+
+    results = {'ok': 0, 'failed': 0, 'locked': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+
+    def worker(thread_index):
+        barrier.wait()
+        for index in range(args.per_thread):
+            team_data, members_data = make_team(thread_index, index, args.members)
+            with app.app_context():
+                try:
+                    success, result = save_team(team_data, members_data)
+                except Exception as e:
+                    # 约束之外的数据库错误（如 database is locked）由 save_team 抛出
+                    success, result = False, e
+            with lock:
+                if success:
+                    results['ok'] += 1
+                else:
+                    results['failed'] += 1
+                    if 'locked' in str(result):
+                        results['locked'] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = args.threads * args.per_thread
+    print(f'线程数: {args.threads}，提交总数: {total}，耗时: {elapsed:.2f}s，'
+          f'吞吐: {total / elapsed:.1f} 次/秒')
+    print(f'成功: {results["ok"]}，失败: {results["failed"]}，database is locked: {results["locked"]}')
+    sys.exit(1 if results['locked'] or results['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+系统配置的进程内缓存
+每个 gunicorn worker 持有一份带 TTL 和容量上限的缓存；
+管理后台修改配置后通过更新信号文件的 mtime 通知其它 worker 清空缓存
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger('costrict.config')
+
+# 缓存未命中时使用的占位对象（用于区分“配置不存在”与“未缓存”）
+_MISSING = object()
+
+
+class ConfigCache:
+    """
+    带 TTL、容量上限和跨进程失效信号的配置缓存
+
+    Args:
+        ttl (float): 缓存项的存活时间（秒），也是跨主机部署时数据过期的上限
+        maxsize (int): 最多缓存的配置键数量，超出时淘汰最久未使用的项
+        check_interval (float): 检查信号文件的最小间隔（秒），
+            同一主机上其它 worker 的修改最多延迟该时间生效
+        signal_path (str): 信号文件路径，为空时仅在本进程内失效
+    """
+
+    def __init__(self, ttl=60, maxsize=128, check_interval=1.0, signal_path=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self.signal_path = signal_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signal_mtime = None
+        self._next_check = 0.0
+        # 每次清空缓存时加一；加载开始后缓存被清空的，加载结果不再写入（见 store）
+        self._generation = 0
+
+    def configure(self, ttl=None, maxsize=None, check_interval=None, signal_path=None):
+        """更新缓存参数并清空已有缓存"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if check_interval is not None:
+                self.check_interval = check_interval
+            if signal_path is not None:
+                self.signal_path = signal_path
+            self._clear()
+            self._signal_mtime = self._read_signal()
+            self._next_check = time.monotonic() + self.check_interval
+
+    def get(self, key, loader):
+        """
+        返回缓存的值，未命中或已过期时调用 loader(key) 加载并缓存
+
+        loader 返回 None 时同样会被缓存（配置不存在），
+        loader 抛出的异常不会被缓存，直接向上传递
+        """
+        found, value, generation = self.lookup(key)
+        if found:
+            return value
+        value = loader(key)
+        self.store(key, value, generation)
+        return value
+
+    def lookup(self, key):
+        """
+        查找缓存项（不加载），供无法同步调用 loader 的调用方（如 asgi.py 的异步接口）使用
+
+        未命中时调用方自行加载，并将返回的 generation 原样传给 store()
+
+        Returns:
+            tuple: (是否命中, 缓存的值, 缓存代数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_signal(now)
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                return True, entry[1], self._generation
+            return False, None, self._generation
+
+    def store(self, key, value, generation):
+        """
+        写入缓存项；generation 为加载前 lookup() 返回的缓存代数
+
+        加载期间缓存被清空（配置已修改）时放弃写入，
+        否则修改前读到的旧值会在 ttl 内覆盖新配置
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """清空本进程缓存，并更新信号文件通知其它 worker"""
+        with self._lock:
+            self._clear()
+            if self.signal_path:
+                try:
+                    with open(self.signal_path, 'a'):
+                        os.utime(self.signal_path)
+                except OSError as e:
+                    logger.warning(f'更新配置缓存信号文件失败: {e}')
+                self._signal_mtime = self._read_signal()
+
+    def _read_signal(self):
+        if not self.signal_path:
+            return None
+        try:
+            return os.stat(self.signal_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _check_signal(self, now):
+        # 调用方需持有 self._lock
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        mtime = self._read_signal()
+        if mtime != self._signal_mtime:
+            self._signal_mtime = mtime
+            self._clear()
+
+    def _clear(self):
+        # 调用方需持有 self._lock
+        self._entries.clear()
+        self._generation += 1
+
+
+# 全局缓存实例，由 server.py 根据环境变量完成配置
+config_cache = ConfigCache()
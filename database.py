@@ -0,0 +1,182 @@
+"""
+数据库引擎配置
+为 SQLite 设置 WAL、synchronous、busy_timeout、mmap 和页缓存等连接参数，
+通过环境变量暴露连接池设置，并提供将只读查询路由到只读副本的会话类
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# SQLite 连接参数（每个新连接建立时通过 PRAGMA 设置）
+SQLITE_PRAGMAS = {
+    # WAL 模式下读写互不阻塞，写事务只需追加日志
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    # WAL 模式下 NORMAL 仍可保证数据库一致性，只在检查点时 fsync
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # 遇到其它进程的写锁时最多等待的毫秒数，避免直接抛出 database is locked
+    # （同一进程内的写事务先在 _WriterQueue 中排队，见 setup_engine）
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+    # 内存映射读取的字节数
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    # 每个连接的页缓存大小，负数表示 KiB
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-20000')),
+}
+
+# 连接池设置：环境变量名 -> (create_engine 参数名, 类型)
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: value.lower() in ('1', 'true', 'yes')),
+}
+
+
+def is_sqlite(db_url):
+    return make_url(db_url).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(db_url):
+    url = make_url(db_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(db_url):
+    """
+    根据数据库地址和环境变量生成 SQLALCHEMY_ENGINE_OPTIONS
+
+    内存 SQLite 使用单连接池，不接受连接池参数
+    """
+    options = {}
+    if is_memory_sqlite(db_url):
+        return options
+    backend = make_url(db_url).get_backend_name()
+    if backend != 'sqlite':
+        # 网络数据库的连接可能被服务端或中间网络断开，取用前先检查
+        options['pool_pre_ping'] = True
+    if backend in ('mysql', 'mariadb'):
+        # MySQL 默认 8 小时（wait_timeout）关闭空闲连接
+        options['pool_recycle'] = 3600
+    for env_name, (option, convert) in POOL_SETTINGS.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = convert(value)
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+    # pysqlite 在第一条 INSERT/UPDATE/DELETE 之前才开始事务，之前的查询不在事务中；
+    # 使用 BEGIN IMMEDIATE 在事务开始时即取得写锁（按 busy_timeout 等待），
+    # 不会出现读事务升级为写事务时直接返回 database is locked
+    dbapi_connection.isolation_level = 'IMMEDIATE'
+
+
+class _WriterQueue:
+    """
+    同一进程内的 SQLite 写事务排队
+
+    SQLite 的 busy_timeout 通过轮询重试等待写锁，并不公平：大量线程同时写入时，
+    个别线程可能一直抢不到锁直到超时。写事务执行第一条写语句前先取得此锁，提交或回滚后释放，
+    进程内的写入按顺序执行，busy_timeout 只需覆盖其它进程（多个 worker）的写事务
+    """
+
+    _HELD = 'sqlite_writer_lock'
+
+    def __init__(self, timeout):
+        self.lock = threading.Lock()
+        self.timeout = timeout
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+            return
+        if conn.info.get(self._HELD) is None:
+            # 超时（例如同一线程在另一个连接上持有写事务）时不再排队，交给 busy_timeout 处理
+            conn.info[self._HELD] = self.lock.acquire(timeout=self.timeout)
+
+    def release(self, info):
+        if info.pop(self._HELD, None):
+            self.lock.release()
+
+    def on_end(self, conn):
+        self.release(conn.info)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        # 未经 commit/rollback 归还的连接（如 AUTOCOMMIT）
+        if connection_record is not None:
+            self.release(connection_record.info)
+
+
+def setup_engine(engine):
+    """
+    为引擎注册连接事件（可重复调用）
+
+    文件 SQLite 的同步引擎额外注册进程内写事务排队（见 _WriterQueue）；
+    异步引擎的写入在 asgi.py 中由 asyncio 锁排队。
+    已经建立的连接不会应用新的设置，因此注册后会释放连接池
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    if not event.contains(engine, 'connect', _apply_sqlite_pragmas):
+        event.listen(engine, 'connect', _apply_sqlite_pragmas)
+        if not engine.dialect.is_async and not is_memory_sqlite(engine.url):
+            queue = _WriterQueue(SQLITE_PRAGMAS['busy_timeout'] / 1000)
+            event.listen(engine, 'before_cursor_execute', queue.before_execute)
+            event.listen(engine, 'commit', queue.on_end)
+            event.listen(engine, 'rollback', queue.on_end)
+            event.listen(engine, 'checkin', queue.on_checkin)
+        engine.dispose()
+
+
+# ===== 只读副本路由 =====
+
+# SQLALCHEMY_BINDS 中只读副本的 bind key
+REPLICA_BIND_KEY = 'replica'
+_REPLICA_FLAG = 'use_replica'
+
+
+class RoutingSession(Session):
+    """
+    在 using_replica() 范围内把 SELECT 发送到只读副本，其余语句（包括 flush）始终使用主库；
+    未配置只读副本（DATABASE_REPLICA_URL）时与默认会话相同
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and self.info.get(_REPLICA_FLAG) and not self._flushing
+                and getattr(clause, 'is_select', False)):
+            engine = self._db.engines.get(REPLICA_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def using_replica(session):
+    """
+    在此范围内的读取查询使用只读副本，也可以作为装饰器：@using_replica(db.session)
+
+    副本可能落后于主库，刚写入的数据需要立即读取时（例如保存后的重名检查）不要使用
+    """
+    previous = session.info.get(_REPLICA_FLAG, False)
+    session.info[_REPLICA_FLAG] = True
+    try:
+        yield session
+    finally:
+        session.info[_REPLICA_FLAG] = previous
+
+
+def replica_binds(replica_url):
+    """根据只读副本地址生成 SQLALCHEMY_BINDS，未配置时返回空字典"""
+    if not replica_url:
+        return {}
+    return {REPLICA_BIND_KEY: {'url': replica_url, **engine_options(replica_url)}}
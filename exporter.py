@@ -0,0 +1,136 @@
+"""
+团队与成员数据的流式导出
+按批次从数据库游标读取（yield_per），逐行生成 NDJSON 或 CSV，
+导出大量数据时内存占用保持恒定，并且可以立即开始发送响应
+"""
+
+import csv
+import io
+import json
+
+from models import db, Team, TeamMember
+from serializers import format_datetime
+
+# 每批从数据库游标读取的行数
+EXPORT_BATCH_SIZE = 500
+# 响应分块大小：累积到该字节数再发送，避免逐行写 socket
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# 导出列：团队字段在前，成员字段以 member_ 为前缀
+TEAM_EXPORT_COLUMNS = (
+    ('team_id', Team.id),
+    ('team_createdAt', Team.createdAt),
+    ('team_updatedAt', Team.updatedAt),
+    ('team_name', Team.team_name),
+    ('competition_track', Team.competition_track),
+    ('project_name', Team.project_name),
+    ('repo_url', Team.repo_url),
+    ('costrict_uid', Team.costrict_uid),
+    ('project_intro', Team.project_intro),
+    ('tech_solution', Team.tech_solution),
+    ('goals_and_outlook', Team.goals_and_outlook),
+)
+MEMBER_EXPORT_COLUMNS = (
+    ('member_id', TeamMember.id),
+    ('member_name', TeamMember.name),
+    ('member_type', TeamMember.member_type),
+    ('member_school', TeamMember.school),
+    ('member_department', TeamMember.department),
+    ('member_major_grade', TeamMember.major_grade),
+    ('member_phone', TeamMember.phone),
+    ('member_email', TeamMember.email),
+    ('member_student_id', TeamMember.student_id),
+    ('member_role', TeamMember.role),
+    ('member_tech_stack', TeamMember.tech_stack),
+    ('member_desc', TeamMember.desc),
+    ('member_createdAt', TeamMember.createdAt),
+)
+EXPORT_COLUMNS = tuple(name for name, _ in TEAM_EXPORT_COLUMNS + MEMBER_EXPORT_COLUMNS)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        # 同一团队的每个成员行时间相同，格式化结果有缓存
+        return format_datetime(value)
+    return value
+
+
+def iter_export_rows(batch_size=EXPORT_BATCH_SIZE):
+    """
+    逐行返回团队与成员的扁平化数据（每个成员一行，无成员的团队单独一行）
+
+    使用 Core 查询并设置 yield_per，结果按批次从游标中读取，不会一次性载入内存
+    """
+    columns = [column for _, column in TEAM_EXPORT_COLUMNS + MEMBER_EXPORT_COLUMNS]
+    stmt = (db.select(*columns)
+            .select_from(Team)
+            .outerjoin(TeamMember, TeamMember.team_id == Team.id)
+            .order_by(Team.id, TeamMember.id)
+            .execution_options(yield_per=batch_size))
+    for row in db.session.execute(stmt):
+        yield tuple(_format_value(value) for value in row)
+
+
+def _chunked(pieces, chunk_size=EXPORT_CHUNK_SIZE):
+    """将小的文本片段合并为约 chunk_size 大小的块"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def generate_ndjson(rows):
+    """将行数据编码为 NDJSON，每行一个 JSON 对象"""
+    return _chunked(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+                    for row in rows)
+
+
+def generate_csv(rows):
+    """将行数据编码为 CSV，首行为列名（带 BOM，便于 Excel 正确识别中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def lines():
+        buffer.write('\ufeff')
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+def generate_export(export_format, batch_size=EXPORT_BATCH_SIZE):
+    """
+    根据导出格式返回生成器
+
+    Args:
+        export_format (str): ndjson 或 csv
+        batch_size (int): 每批读取的行数
+
+    Returns:
+        generator: 逐块产生文本内容
+    """
+    rows = iter_export_rows(batch_size)
+    if export_format == 'ndjson':
+        return generate_ndjson(rows)
+    if export_format == 'csv':
+        return generate_csv(rows)
+    raise ValueError(f'不支持的导出格式: {export_format}')
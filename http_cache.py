@@ -0,0 +1,80 @@
+"""
+HTTP 条件请求支持（ETag / Last-Modified）
+在序列化响应之前根据数据指纹判断客户端缓存是否仍然有效，有效时直接返回 304
+"""
+
+import hashlib
+
+import pytz
+from flask import request, make_response
+from werkzeug.wrappers import Response
+
+# 数据库中的时间为上海时间（无时区信息）
+TZ = pytz.timezone('Asia/Shanghai')
+
+
+def make_etag(*parts):
+    """根据数据指纹（更新时间、数量、查询参数等）生成强 ETag"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def to_http_datetime(value):
+    """将数据库中的上海时间转换为 UTC 时间，用于 Last-Modified"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = TZ.localize(value)
+    return value.astimezone(pytz.utc).replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None, req=None):
+    """
+    判断客户端缓存是否仍然有效
+
+    存在 If-None-Match 时只比较 ETag，否则比较 If-Modified-Since；
+    req 为 werkzeug 请求对象，默认使用当前 Flask 请求
+    """
+    req = request if req is None else req
+    if req.if_none_match:
+        return req.if_none_match.contains(etag)
+    if last_modified is not None and req.if_modified_since is not None:
+        return last_modified <= req.if_modified_since
+    return False
+
+
+def not_modified_response(etag, last_modified, cache_control, req=None):
+    """客户端缓存仍然有效时返回带缓存校验头的 304 空响应，否则返回None（req 同 is_not_modified）"""
+    if not is_not_modified(etag, last_modified, req):
+        return None
+    return set_validators(Response(status=304), etag, last_modified, cache_control)
+
+
+def set_validators(response, etag, last_modified, cache_control):
+    """为 200/304 响应设置 ETag、Last-Modified 和 Cache-Control，其它状态码的响应原样返回"""
+    if response.status_code not in (200, 304):
+        return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def conditional_response(etag, last_modified, cache_control, build):
+    """
+    构造带缓存校验头的响应
+
+    Args:
+        etag (str): 由 make_etag 生成的 ETag
+        last_modified (datetime): UTC 时间，可为 None
+        cache_control (str): Cache-Control 头的值
+        build (callable): 缓存失效时调用，返回完整响应（或 (响应, 状态码)）
+
+    Returns:
+        Response: 304 空响应或 build() 生成的完整响应
+    """
+    response = not_modified_response(etag, last_modified, cache_control)
+    if response is None:
+        response = set_validators(make_response(build()), etag, last_modified, cache_control)
+    return response
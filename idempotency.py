@@ -0,0 +1,222 @@
+"""
+提交接口的幂等键
+客户端在请求头 Idempotency-Key 中携带唯一的键（同一份报名内容重试时使用同一个键），
+首次处理的响应保存在 idempotency_keys 表中，有效期内相同的键直接返回该响应，不再校验和保存：
+- 相同的键、相同的请求体、已处理完成：返回首次的响应（响应头 Idempotent-Replayed: true）
+- 相同的键、首次请求仍在处理：返回 409，客户端稍后重试
+- 相同的键、不同的请求体：返回 422
+- 5xx 响应不保存，客户端可以用同一个键重试
+
+处理中的记录有占用期限（lease），进程异常退出后遗留的记录到期后可被重新占用；
+过期记录在处理请求时定期删除。未携带请求头的请求不受影响
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import time
+
+from flask import current_app, jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+import metrics
+from models import db, IdempotencyKey
+
+logger = logging.getLogger('costrict.idempotency')
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# begin() 的结果
+NEW = 'new'
+REPLAYED = 'replayed'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+# 重复请求的拒绝信息：(状态码, 提示信息, Retry-After 秒数或None)
+REJECTIONS = {
+    IN_PROGRESS: (409, '相同的提交正在处理中，请稍后重试', 1),
+    MISMATCH: (422, 'Idempotency-Key 已用于内容不同的提交', None),
+}
+
+_table = IdempotencyKey.__table__
+
+
+def _sha256(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def request_key(req=None):
+    """
+    读取请求头中的幂等键，未携带时返回None
+
+    Raises:
+        ValueError: 键为空、过长或含有非可见 ASCII 字符
+    """
+    req = request if req is None else req
+    key = req.headers.get(HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not all('!' <= char <= '~' for char in key):
+        raise ValueError(f'无效的 {HEADER}（1-{MAX_KEY_LENGTH} 个可见 ASCII 字符）')
+    return key
+
+
+class IdempotencyStore:
+    """
+    幂等键存储，使用主库中的 idempotency_keys 表，所有 worker 共享
+
+    各方法接收同步 Engine，在独立的短事务中执行，与保存团队的事务互不影响
+
+    Args:
+        ttl (float): 处理完成的响应保留的秒数
+        lease (float): 处理中的记录的占用期限（秒），应大于单次请求的最长处理时间
+        cleanup_interval (float): 删除过期记录的间隔（秒）
+    """
+
+    def __init__(self, ttl, lease=60.0, cleanup_interval=60.0):
+        self.ttl = ttl
+        self.lease = lease
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+
+    def begin(self, engine, key, body):
+        """
+        占用幂等键
+
+        Returns:
+            tuple: (结果, 状态码, 响应体)；结果为 NEW 时调用方处理请求后须调用 finish()，
+                   为 REPLAYED 时返回首次的状态码和响应体，其它结果见 REJECTIONS
+        """
+        key_hash, request_hash = _sha256(key), _sha256(body)
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            self.cleanup(engine, now)
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(_table).values(
+                    key_hash=key_hash, request_hash=request_hash, expires_at=now + self.lease))
+            return NEW, None, None
+        except IntegrityError:
+            pass
+
+        with engine.begin() as conn:
+            # 已过期（保留期满或处理中的进程已退出）的记录可以重新占用
+            taken = conn.execute(
+                update(_table)
+                .where(_table.c.key_hash == key_hash, _table.c.expires_at <= now)
+                .values(request_hash=request_hash, status_code=None, response_body=None,
+                        expires_at=now + self.lease)).rowcount
+            if taken:
+                return NEW, None, None
+            row = conn.execute(
+                select(_table.c.request_hash, _table.c.status_code, _table.c.response_body)
+                .where(_table.c.key_hash == key_hash)).first()
+        if row is None:
+            # 记录恰好被删除，重新占用
+            return self.begin(engine, key, body)
+        if row.request_hash != request_hash:
+            return MISMATCH, None, None
+        if row.status_code is None:
+            return IN_PROGRESS, None, None
+        return REPLAYED, row.status_code, row.response_body
+
+    def finish(self, engine, key, status, body):
+        """保存处理结果；5xx 响应不保存，释放占用以便客户端重试"""
+        key_hash = _sha256(key)
+        with engine.begin() as conn:
+            if status >= 500:
+                conn.execute(delete(_table).where(_table.c.key_hash == key_hash))
+            else:
+                conn.execute(update(_table).where(_table.c.key_hash == key_hash).values(
+                    status_code=status, response_body=body, expires_at=time.time() + self.ttl))
+
+    def cleanup(self, engine, now=None):
+        """删除过期的记录，返回删除的数量"""
+        now = time.time() if now is None else now
+        with engine.begin() as conn:
+            return conn.execute(delete(_table).where(_table.c.expires_at < now)).rowcount
+
+    def open_request(self, engine, endpoint, req):
+        """
+        按请求头中的幂等键占用请求（Flask 视图与 asgi.py 共用，可在线程中调用）
+
+        Args:
+            engine: 同步 Engine
+            endpoint (str): 指标中的接口名称
+            req: werkzeug 请求对象（请求体已读取）
+
+        Returns:
+            tuple: (key, early)：early 不为 None 时直接返回该 (状态码, 响应数据, 响应头)，
+                   不再处理请求；key 不为 None 时处理请求后须调用 close_request()
+        """
+        try:
+            key = request_key(req)
+        except ValueError as e:
+            metrics.inc_idempotency(endpoint, 'invalid')
+            return None, (400, {
+                'success': False,
+                'message': str(e)
+            }, {})
+        if key is None:
+            return None, None
+
+        try:
+            outcome, status, body = self.begin(engine, key, req.get_data())
+        except SQLAlchemyError as e:
+            # 幂等键存储不可用时照常处理，不影响正常报名
+            logger.warning(f'幂等键读写失败，本次请求不检查重复: {e}')
+            metrics.inc_idempotency(endpoint, 'store_error')
+            return None, None
+        metrics.inc_idempotency(endpoint, outcome)
+        if outcome == REPLAYED:
+            return None, (status, json.loads(body), {'Idempotent-Replayed': 'true'})
+        if outcome != NEW:
+            status, message, retry_after = REJECTIONS[outcome]
+            return None, (status, {
+                'success': False,
+                'message': message
+            }, {'Retry-After': str(retry_after)} if retry_after else {})
+        return key, None
+
+    def close_request(self, engine, key, response):
+        """保存 open_request() 占用的请求的响应；response 为None（处理时抛出异常）时按 500 处理（释放占用）"""
+        try:
+            self.finish(engine, key, response.status_code if response else 500,
+                        response.get_data(as_text=True) if response else None)
+        except SQLAlchemyError as e:
+            logger.warning(f'保存幂等键结果失败: {e}')
+
+    def idempotent(self, endpoint):
+        """
+        视图装饰器：按 Idempotency-Key 请求头返回首次的响应
+
+            @store.idempotent('submit')
+            def submit_team(): ...
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                engine = db.engine
+                key, early = self.open_request(engine, endpoint, request)
+                if early is not None:
+                    status, data, headers = early
+                    return jsonify(data), status, headers
+                if key is None:
+                    return view(*args, **kwargs)
+
+                response = None
+                try:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    return response
+                finally:
+                    self.close_request(engine, key, response)
+            return wrapper
+        return decorator
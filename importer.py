@@ -0,0 +1,359 @@
+"""
+团队与成员的批量导入
+从 CSV / XLSX / NDJSON 文件逐行读取，按团队分组后使用与 submit_team 相同的校验规则（validators.py），
+校验通过的团队按批次在一个事务中插入（团队、成员各一次 executemany），统计计数在同一事务中更新，
+全文索引在每个批次末尾统一建立（见 search.bulk_insert）；每个出错的行记录行号、字段和原因
+
+文件格式：
+- CSV / XLSX：首行为列名，每个成员一行。列名可以是导出文件的列名（team_name、member_name、
+  member_phone 等，见 exporter.py）、字段名（name、phone 等）或中文名称（团队名称、姓名、联系电话等）；
+  同一团队的成员行需连续，团队名称为空的行属于上一个团队（团队信息只需填写在第一行）
+- NDJSON：每行一个 JSON 对象，可以是上述扁平格式的一行，也可以是与提交接口相同的
+  {"team_info": {...}, "members": [...]}
+
+用法：flask --app wsgi import-teams teams.csv [--dry-run] [--report errors.csv]
+管理后台：数据导入 -> 上传文件
+"""
+
+import csv
+import functools
+import io
+import json
+import logging
+import os
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, get_current_time, Team, TeamMember
+from validators import DUPLICATE_TEAM_MESSAGE, TEAM_RULES, MEMBER_RULES, validate_submission
+from exporter import TEAM_EXPORT_COLUMNS, MEMBER_EXPORT_COLUMNS
+import search
+import stats
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+logger = logging.getLogger('costrict.importer')
+
+IMPORT_FORMATS = ('csv', 'xlsx', 'ndjson')
+# 每个事务插入的成员数上限（团队数随成员数变化）；SQLite 下每个批次持有写锁约 0.5 秒，期间的报名提交需等待
+IMPORT_BATCH_SIZE = 5000
+
+
+def _column_aliases():
+    """列名 -> (team/member, 字段名)：字段名、导出列名、中文名称"""
+    aliases = {}
+    for kind, rules in (('team', TEAM_RULES), ('member', MEMBER_RULES)):
+        for rule in rules:
+            aliases[rule.name] = aliases[rule.label] = (kind, rule.name)
+    for export_columns, kind, rules in ((TEAM_EXPORT_COLUMNS, 'team', TEAM_RULES),
+                                        (MEMBER_EXPORT_COLUMNS, 'member', MEMBER_RULES)):
+        names = {rule.name for rule in rules}
+        for column_name, column in export_columns:
+            if column.key in names:
+                aliases[column_name] = (kind, column.key)
+    return aliases
+
+
+COLUMN_ALIASES = _column_aliases()
+
+
+def detect_format(filename):
+    """根据文件扩展名判断格式（.jsonl 视为 NDJSON），无法识别时返回None"""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    extension = 'ndjson' if extension == 'jsonl' else extension
+    return extension if extension in IMPORT_FORMATS else None
+
+
+# ===== 读取 =====
+
+def _read_csv(stream):
+    # 导出的 CSV 带 BOM（见 exporter.py）
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row_number, row in enumerate(csv.DictReader(text), start=2):
+        yield row_number, row
+
+
+def _read_xlsx(stream):
+    if openpyxl is None:
+        raise ValueError('导入 XLSX 文件需要安装 openpyxl')
+    # read_only 模式逐行读取，不会将整个工作表载入内存
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def _read_ndjson(stream):
+    for row_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+        if line.strip():
+            try:
+                yield row_number, json.loads(line)
+            except ValueError:
+                yield row_number, None
+
+
+READERS = {
+    'csv': _read_csv,
+    'xlsx': _read_xlsx,
+    'ndjson': _read_ndjson,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _column_plan(columns):
+    """列名元组 -> [(列名, 是否团队字段, 字段名), ...]，只包含可识别的列（同一文件的各行共用）"""
+    plan = []
+    for column in columns:
+        target = COLUMN_ALIASES.get(column.strip() if isinstance(column, str) else column)
+        if target is not None:
+            plan.append((column, target[0] == 'team', target[1]))
+    return plan
+
+
+def _split_row(row):
+    """将扁平的一行拆分为 (团队字段, 成员字段)，无法识别的列忽略"""
+    team_info, member = {}, {}
+    for column, is_team, field in _column_plan(tuple(row)):
+        value = row[column]
+        if value is not None and value != '':
+            (team_info if is_team else member)[field] = value
+    return team_info, member
+
+
+def iter_submissions(rows):
+    """
+    将逐行读取的数据按团队分组
+
+    Yields:
+        tuple: (各成员所在行号列表, {'team_info': ..., 'members': [...]}, 问题说明或None)；
+               无法解析的行、文件中重复的团队给出问题说明
+    """
+    seen = set()
+
+    def checked(row_numbers, submission):
+        team_info = submission.get('team_info')
+        team_name = str(team_info.get('team_name') or '').strip() if isinstance(team_info, dict) else ''
+        if team_name and team_name in seen:
+            return row_numbers, submission, '文件中团队名称重复（同一团队的成员行需连续）'
+        seen.add(team_name)
+        return row_numbers, submission, None
+
+    current = None
+    for row_number, row in rows:
+        if not isinstance(row, dict):
+            yield [row_number], None, '无法解析该行'
+            continue
+        if 'team_info' in row or 'members' in row:
+            # NDJSON 中与提交接口相同格式的完整提交
+            if current is not None:
+                yield checked(*current)
+                current = None
+            members = row.get('members')
+            yield checked([row_number] * max(1, len(members) if isinstance(members, list) else 0), row)
+            continue
+
+        team_info, member = _split_row(row)
+        team_name = str(team_info.get('team_name', '')).strip()
+        if current is not None and (not team_name or team_name == current[1]['team_info'].get('team_name')):
+            current[0].append(row_number)
+            current[1]['members'].append(member)
+            continue
+        if current is not None:
+            yield checked(*current)
+        if team_name:
+            team_info['team_name'] = team_name
+        current = ([row_number], {'team_info': team_info, 'members': [member]})
+    if current is not None:
+        yield checked(*current)
+
+
+# ===== 导入 =====
+
+class ImportResult:
+    """导入结果：计数与逐行错误（{'row', 'team_name', 'field', 'message'}）"""
+
+    def __init__(self):
+        self.teams = 0
+        self.members = 0
+        self.imported_teams = 0
+        self.imported_members = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def add_error(self, row, team_name, field, message):
+        self.errors.append({'row': row, 'team_name': team_name, 'field': field, 'message': message})
+
+    def summary(self):
+        return (f'共 {self.teams} 个团队、{self.members} 名成员，'
+                f'导入 {self.imported_teams} 个团队、{self.imported_members} 名成员，'
+                f'{len(self.errors)} 条错误，耗时 {self.elapsed:.2f} 秒')
+
+
+def _error_row(field, row_numbers):
+    """将 validate_submission 的字段路径对应到源文件的行号"""
+    if field.startswith('members['):
+        index = int(field[len('members['):field.index(']')])
+        if index < len(row_numbers):
+            return row_numbers[index]
+    return row_numbers[0]
+
+
+def _insert_batch(session, batch):
+    """
+    在一个事务中插入一批团队及成员并更新统计，全文索引在批次末尾统一建立（见 search.bulk_insert）
+
+    名称检查只是预先过滤：查询时还没有开始写事务（pysqlite 在第一条写语句前才开始事务），
+    也不持有写锁，检查与插入之间可能有同名团队通过提交接口写入。此时插入违反 team_name 的唯一约束，
+    抛出 IntegrityError，由调用方回滚后逐个团队重试
+
+    Args:
+        batch (list): [(行号列表, 团队字典, 成员字典列表), ...]，团队名称互不相同
+
+    Returns:
+        list: 因团队名称已存在而未插入的批次元素
+    """
+    with search.bulk_insert(session):
+        names = [team_data['team_name'] for _, team_data, _ in batch]
+        taken = set(session.scalars(db.select(Team.team_name).where(Team.team_name.in_(names))))
+        rejected = [item for item in batch if item[1]['team_name'] in taken]
+        batch = [item for item in batch if item[1]['team_name'] not in taken]
+        if batch:
+            _insert_rows(session, batch)
+    session.commit()
+    return rejected
+
+
+def _insert_rows(session, batch):
+    """插入团队及成员（每个表一次 executemany）并写入统计增量"""
+    # 已是上海时间（不含时区信息），写入时不必逐行转换时区（见 models.ShanghaiDateTime）
+    now_dt = get_current_time().replace(tzinfo=None)
+    team_rows = [dict(team_data, createdAt=now_dt, updatedAt=now_dt) for _, team_data, _ in batch]
+    # 直接对表执行 executemany，不经过 ORM 的批量插入
+    session.execute(Team.__table__.insert(), team_rows)
+    # 团队名称唯一，插入后按名称取回自增 ID（各数据库通用，不依赖 RETURNING）
+    team_ids = dict(session.execute(
+        db.select(Team.team_name, Team.id).where(Team.team_name.in_([row['team_name'] for row in team_rows]))).all())
+    member_rows = []
+    deltas = []
+    for team_row, (_, team_data, members_data) in zip(team_rows, batch):
+        rows = [dict(member_data, team_id=team_ids[team_data['team_name']], team_name=team_data['team_name'],
+                     createdAt=now_dt, updatedAt=now_dt) for member_data in members_data]
+        member_rows.extend(rows)
+        deltas.extend(stats.submission_deltas(team_row, rows))
+    if member_rows:
+        session.execute(TeamMember.__table__.insert(), member_rows)
+    stats.apply(session, deltas)
+
+
+def _save_batch(session, batch, result):
+    try:
+        rejected = _insert_batch(session, batch)
+    except IntegrityError:
+        # 导入期间有同名团队通过提交接口写入：回退为逐个团队插入
+        session.rollback()
+        rejected = []
+        for item in batch:
+            try:
+                rejected.extend(_insert_batch(session, [item]))
+            except IntegrityError:
+                session.rollback()
+                rejected.append(item)
+    rejected_names = {team_data['team_name'] for _, team_data, _ in rejected}
+    for row_numbers, team_data, members_data in batch:
+        if team_data['team_name'] in rejected_names:
+            result.add_error(row_numbers[0], team_data['team_name'], 'team_info.team_name', DUPLICATE_TEAM_MESSAGE)
+        else:
+            result.imported_teams += 1
+            result.imported_members += len(members_data)
+
+
+def import_rows(session, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    校验并导入逐行读取的数据
+
+    Args:
+        session: 数据库会话（每个批次单独提交）
+        rows: [(行号, 行数据字典), ...]
+        batch_size (int): 每个事务插入的成员数上限
+        dry_run (bool): 只校验（包括团队名称是否已存在），不写入
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    batch = []
+    batch_members = 0
+
+    def flush():
+        nonlocal batch, batch_members
+        if batch:
+            if dry_run:
+                names = [team_data['team_name'] for _, team_data, _ in batch]
+                taken = set(session.scalars(db.select(Team.team_name).where(Team.team_name.in_(names))))
+                for row_numbers, team_data, _ in batch:
+                    if team_data['team_name'] in taken:
+                        result.add_error(row_numbers[0], team_data['team_name'], 'team_info.team_name',
+                                         DUPLICATE_TEAM_MESSAGE)
+                session.rollback()
+            else:
+                _save_batch(session, batch, result)
+        batch = []
+        batch_members = 0
+
+    for row_numbers, submission, problem in iter_submissions(rows):
+        if submission is None:
+            result.add_error(row_numbers[0], '', '', problem)
+            continue
+        members = submission.get('members')
+        result.teams += 1
+        result.members += len(members) if isinstance(members, list) else 0
+        team_data, members_data, errors = validate_submission(submission)
+        team_name = team_data.get('team_name', '')
+        if problem:
+            errors.append({'field': 'team_info.team_name', 'message': problem})
+        for error in errors:
+            result.add_error(_error_row(error['field'], row_numbers), team_name, error['field'], error['message'])
+        if errors:
+            continue
+        batch.append((row_numbers, team_data, members_data))
+        batch_members += len(members_data)
+        if batch_members >= batch_size:
+            flush()
+    flush()
+
+    # 名称已存在的错误在批次提交时才得出，按行号排列便于对照源文件
+    result.errors.sort(key=lambda error: error['row'])
+    result.elapsed = time.perf_counter() - started
+    logger.info(f'批量导入完成: {result.summary()}', extra={'dry_run': dry_run})
+    return result
+
+
+def import_file(session, stream, file_format, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    从二进制文件流导入
+
+    Raises:
+        ValueError: 不支持的格式（或 XLSX 缺少 openpyxl）
+    """
+    if file_format not in READERS:
+        raise ValueError(f'不支持的文件格式: {file_format}（支持 {", ".join(IMPORT_FORMATS)}）')
+    return import_rows(session, READERS[file_format](stream), batch_size=batch_size, dry_run=dry_run)
+
+
+def write_report(result, stream):
+    """将错误明细写为 CSV（带 BOM，便于 Excel 打开）"""
+    writer = csv.writer(stream)
+    stream.write('\ufeff')
+    writer.writerow(('row', 'team_name', 'field', 'message'))
+    for error in result.errors:
+        writer.writerow((error['row'], error['team_name'], error['field'], error['message']))
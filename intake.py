@@ -0,0 +1,233 @@
+"""
+团队提交的异步接收队列
+校验通过的提交先写入本地 SQLite 队列文件并返回受理编号（ticket），
+再由后台写入线程按批次合并到一个事务中保存到主数据库；
+多个 gunicorn worker 共享同一个队列文件，通过 BEGIN IMMEDIATE 保证每条提交只被领取一次
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger('costrict.intake')
+
+# 队列状态
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+REJECTED = 'rejected'
+
+# 多次保存失败后放弃的提示信息
+GIVE_UP_MESSAGE = '保存团队数据失败，请稍后重新提交'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS submissions (
+    ticket TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    team_id INTEGER,
+    message TEXT,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    available_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_submissions_status_created ON submissions (status, created_at);
+'''
+
+
+class IntakeQueue:
+    """
+    基于 SQLite 文件的持久化提交队列
+
+    Args:
+        path (str): 队列数据库文件路径
+        synchronous (str): SQLite synchronous 级别，默认 FULL，保证受理后的提交不会因断电丢失
+    """
+
+    def __init__(self, path, synchronous='FULL'):
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(submissions)')}
+            if 'available_at' not in columns:
+                # 旧版本创建的队列文件：补充重试时间列
+                conn.execute('ALTER TABLE submissions ADD COLUMN available_at REAL')
+
+    def _connect(self):
+        # 每个线程使用独立连接；isolation_level=None 以便手动控制事务
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, team_data, members_data):
+        """写入一条待处理的提交，返回受理编号"""
+        ticket = uuid.uuid4().hex
+        payload = json.dumps({'team': team_data, 'members': members_data}, ensure_ascii=False)
+        self._connect().execute(
+            'INSERT INTO submissions (ticket, payload, status, created_at) VALUES (?, ?, ?, ?)',
+            (ticket, payload, PENDING, time.time()))
+        return ticket
+
+    def claim(self, limit, claim_timeout):
+        """
+        领取最多 limit 条待处理提交（包括领取后超时未完成的提交；等待重试的提交到期后才领取）
+
+        Returns:
+            list: [(ticket, team_data, members_data, attempts), ...]
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT ticket, payload, attempts FROM submissions '
+                'WHERE (status = ? AND (available_at IS NULL OR available_at <= ?)) '
+                'OR (status = ? AND claimed_at < ?) '
+                'ORDER BY created_at LIMIT ?',
+                (PENDING, now, PROCESSING, now - claim_timeout, limit)).fetchall()
+            conn.executemany(
+                'UPDATE submissions SET status = ?, claimed_at = ?, attempts = attempts + 1 '
+                'WHERE ticket = ?',
+                [(PROCESSING, now, row[0]) for row in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        claimed = []
+        for ticket, payload, attempts in rows:
+            data = json.loads(payload)
+            claimed.append((ticket, data['team'], data['members'], attempts + 1))
+        return claimed
+
+    def complete(self, results):
+        """
+        记录处理结果
+
+        Args:
+            results (list): [(ticket, status, team_id, message), ...]
+        """
+        now = time.time()
+        self._connect().executemany(
+            'UPDATE submissions SET status = ?, team_id = ?, message = ?, finished_at = ? '
+            'WHERE ticket = ?',
+            [(status, team_id, message, now, ticket) for ticket, status, team_id, message in results])
+
+    def release(self, tickets, delay):
+        """保存失败（数据库繁忙等）的提交放回队列，delay 秒后重新领取"""
+        self._connect().executemany(
+            'UPDATE submissions SET status = ?, available_at = ? WHERE ticket = ?',
+            [(PENDING, time.time() + delay, ticket) for ticket in tickets])
+
+    def status(self, ticket):
+        """查询提交状态，不存在时返回None"""
+        row = self._connect().execute(
+            'SELECT status, team_id, message FROM submissions WHERE ticket = ?',
+            (ticket,)).fetchone()
+        if not row:
+            return None
+        return {'ticket': ticket, 'status': row[0], 'team_id': row[1], 'message': row[2]}
+
+    def purge(self, older_than):
+        """删除 older_than 秒之前已处理完成的记录"""
+        self._connect().execute(
+            'DELETE FROM submissions WHERE status IN (?, ?) AND finished_at < ?',
+            (DONE, REJECTED, time.time() - older_than))
+
+
+class BatchWriter(threading.Thread):
+    """
+    后台写入线程：领取一批提交并调用 write_batch 在一个事务中保存
+
+    Args:
+        queue (IntakeQueue): 提交队列
+        write_batch (callable): write_batch(claimed) -> [(ticket, status, team_id, message), ...]
+        batch_size (int): 单个事务最多保存的团队数
+        linger (float): 收到新提交后等待更多提交合并的时间（秒）
+        poll_interval (float): 空闲时轮询队列的间隔（秒），用于领取其它 worker 受理的提交
+        claim_timeout (float): 领取后超过该时间未完成的提交会被重新领取
+        retention (float): 已完成记录的保留时间（秒），供前端查询状态
+        max_attempts (int): 每条提交最多保存的次数，达到后标记为 rejected
+        backoff (float): 保存失败后首次重试前等待的秒数，之后每次翻倍
+
+    write_batch 抛出异常（数据库繁忙、连接断开等）时，本批提交放回队列按退避时间重试；
+    重试的提交逐条保存，单条无法保存的提交不会连累同一批次的其它提交
+    """
+
+    def __init__(self, queue, write_batch, batch_size=100, linger=0.05, poll_interval=0.5,
+                 claim_timeout=60, retention=24 * 3600, max_attempts=5, backoff=2.0):
+        super().__init__(name='intake-writer', daemon=True)
+        self.queue = queue
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._wakeup = threading.Event()
+        self._next_purge = 0.0
+
+    def notify(self):
+        """本进程受理了新提交，唤醒写入线程"""
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            woke = self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if woke and self.linger:
+                time.sleep(self.linger)
+            try:
+                self.drain()
+            except Exception as e:
+                logger.exception(f'提交队列写入失败: {e}')
+                time.sleep(self.poll_interval)
+
+    def drain(self):
+        """处理队列中的所有待处理提交"""
+        while True:
+            claimed = self.queue.claim(self.batch_size, self.claim_timeout)
+            if not claimed:
+                break
+            # 超时后被重新领取（例如保存时进程退出）且已达到次数上限的提交不再尝试
+            exhausted = [item for item in claimed if item[3] > self.max_attempts]
+            if exhausted:
+                self.queue.complete([(item[0], REJECTED, None, GIVE_UP_MESSAGE) for item in exhausted])
+            fresh = [item for item in claimed if item[3] == 1]
+            retried = [item for item in claimed if 1 < item[3] <= self.max_attempts]
+            for batch in ([fresh] if fresh else []) + [[item] for item in retried]:
+                self._write(batch)
+            if len(claimed) < self.batch_size:
+                break
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + 3600
+            self.queue.purge(self.retention)
+
+    def _write(self, batch):
+        try:
+            results = self.write_batch(batch)
+        except Exception as e:
+            logger.exception(f'提交保存失败，稍后重试: {e}', extra={'count': len(batch)})
+            rejected = [item[0] for item in batch if item[3] >= self.max_attempts]
+            if rejected:
+                self.queue.complete([(ticket, REJECTED, None, GIVE_UP_MESSAGE) for ticket in rejected])
+            retry = [item for item in batch if item[3] < self.max_attempts]
+            if retry:
+                attempts = max(item[3] for item in retry)
+                self.queue.release([item[0] for item in retry], self.backoff * 2 ** (attempts - 1))
+            return
+        self.queue.complete(results)
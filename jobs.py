@@ -0,0 +1,269 @@
+"""
+后台任务队列
+报名保存成功（事务已提交）之后的附带操作（发送确认邮件等）写入本地 SQLite 任务表，由后台线程执行，
+不占用请求处理时间：
+- 任务持久化在队列文件中，进程重启后继续执行；多个 gunicorn worker 共享同一个文件，
+  通过 BEGIN IMMEDIATE 保证每个任务只被领取一次
+- 失败的任务按指数退避重试，超过最大次数后标记为 failed，保留供排查（可通过 flask retry-failed-jobs 重新执行）
+- 每个进程同时执行的任务数有上限；也可以不在 Web 进程中执行，改由单独的进程执行（flask run-jobs）
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger('costrict.jobs')
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at);
+'''
+
+Job = namedtuple('Job', 'id kind payload attempts created_at')
+
+
+class PermanentJobError(Exception):
+    """任务处理函数抛出此异常时不再重试（例如收件地址被拒收）"""
+
+
+class JobQueue:
+    """
+    基于 SQLite 文件的持久化任务队列
+
+    Args:
+        path (str): 队列数据库文件路径
+        synchronous (str): SQLite synchronous 级别
+    """
+
+    def __init__(self, path, synchronous='NORMAL'):
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # 每个线程使用独立连接；isolation_level=None 以便手动控制事务
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, kind, payload, delay=0):
+        """写入一个任务，delay 秒后可执行，返回任务 ID"""
+        now = time.time()
+        return self._connect().execute(
+            'INSERT INTO jobs (kind, payload, status, run_at, created_at) VALUES (?, ?, ?, ?, ?)',
+            (kind, json.dumps(payload, ensure_ascii=False), PENDING, now + delay, now)).lastrowid
+
+    def enqueue_many(self, jobs):
+        """在一个事务中写入多个任务 [(kind, payload), ...]"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                'INSERT INTO jobs (kind, payload, status, run_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(kind, json.dumps(payload, ensure_ascii=False), PENDING, now, now) for kind, payload in jobs])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, limit, claim_timeout):
+        """
+        领取最多 limit 个已到执行时间的任务（包括领取后超时未完成的任务，例如执行进程已退出）
+
+        Returns:
+            list: [Job, ...]，attempts 为包括本次在内的执行次数
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT id, kind, payload, attempts, created_at FROM jobs '
+                'WHERE (status = ? AND run_at <= ?) OR (status = ? AND claimed_at < ?) '
+                'ORDER BY run_at LIMIT ?',
+                (PENDING, now, RUNNING, now - claim_timeout, limit)).fetchall()
+            conn.executemany(
+                'UPDATE jobs SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                [(RUNNING, now, row[0]) for row in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [Job(job_id, kind, json.loads(payload), attempts + 1, created_at)
+                for job_id, kind, payload, attempts, created_at in rows]
+
+    def complete(self, job_id):
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, last_error = NULL WHERE id = ?',
+            (DONE, time.time(), job_id))
+
+    def retry(self, job_id, error, run_at):
+        """执行失败，run_at 时刻之后重新执行"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, run_at = ?, last_error = ? WHERE id = ?',
+            (PENDING, run_at, error, job_id))
+
+    def fail(self, job_id, error):
+        """执行失败且不再重试"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, last_error = ? WHERE id = ?',
+            (FAILED, time.time(), error, job_id))
+
+    def requeue_failed(self):
+        """将失败的任务重新放回队列（执行次数清零），返回任务数"""
+        return self._connect().execute(
+            'UPDATE jobs SET status = ?, run_at = ?, attempts = 0, finished_at = NULL WHERE status = ?',
+            (PENDING, time.time(), FAILED)).rowcount
+
+    def depth(self):
+        """未完成任务数 {pending/running/failed: 数量}"""
+        counts = {PENDING: 0, RUNNING: 0, FAILED: 0}
+        counts.update(self._connect().execute(
+            'SELECT status, COUNT(*) FROM jobs WHERE status != ? GROUP BY status', (DONE,)).fetchall())
+        return counts
+
+    def purge(self, older_than):
+        """删除 older_than 秒之前已完成的任务（失败的任务保留）"""
+        self._connect().execute(
+            'DELETE FROM jobs WHERE status = ? AND finished_at < ?', (DONE, time.time() - older_than))
+
+
+class JobRunner(threading.Thread):
+    """
+    后台执行线程：领取到期的任务并在线程池中执行
+
+    Args:
+        queue (JobQueue): 任务队列
+        handlers (dict): {任务类型: handler(payload)}；handler 抛出异常时按退避时间重试
+        concurrency (int): 本进程同时执行的任务数上限
+        poll_interval (float): 空闲时轮询队列的间隔（秒），用于领取其它进程写入的任务和到期的重试
+        claim_timeout (float): 领取后超过该时间未完成的任务会被重新领取，应大于单个任务的最长执行时间
+        max_attempts (int): 最多执行次数，超过后标记为 failed
+        backoff (float): 首次重试前等待的秒数，之后每次翻倍
+        max_backoff (float): 重试等待时间的上限（秒）
+        retention (float): 已完成任务的保留时间（秒）
+    """
+
+    def __init__(self, queue, handlers, concurrency=2, poll_interval=1.0, claim_timeout=300,
+                 max_attempts=5, backoff=30, max_backoff=3600, retention=7 * 24 * 3600):
+        super().__init__(name='job-runner', daemon=True)
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+        self._running = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._next_purge = 0.0
+
+    def notify(self):
+        """本进程写入了新任务，唤醒执行线程"""
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.exception(f'任务队列读取失败: {e}')
+                time.sleep(self.poll_interval)
+
+    def drain(self):
+        """按空闲的执行槽位领取到期的任务"""
+        while True:
+            with self._lock:
+                free = self.concurrency - self._running
+            if free <= 0:
+                # 任务完成时会唤醒执行线程
+                break
+            claimed = self.queue.claim(free, self.claim_timeout)
+            for job in claimed:
+                with self._lock:
+                    self._running += 1
+                self._executor.submit(self._execute, job)
+            if len(claimed) < free:
+                break
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + 3600
+            self.queue.purge(self.retention)
+
+    def retry_delay(self, attempts):
+        """第 attempts 次执行失败后的等待时间：指数退避，上下浮动 20% 避免同时重试"""
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _execute(self, job):
+        started = time.time()
+        try:
+            handler = self.handlers.get(job.kind)
+            if handler is None:
+                raise PermanentJobError(f'未知的任务类型: {job.kind}')
+            handler(job.payload)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            if isinstance(e, PermanentJobError) or job.attempts >= self.max_attempts:
+                logger.error(f'任务执行失败，不再重试: {error}',
+                             extra={'job_id': job.id, 'kind': job.kind, 'attempts': job.attempts})
+                self._record(self.queue.fail, job, 'failed', started, job.id, error)
+            else:
+                delay = self.retry_delay(job.attempts)
+                logger.warning(f'任务执行失败，{delay:.0f} 秒后重试: {error}',
+                               extra={'job_id': job.id, 'kind': job.kind, 'attempts': job.attempts})
+                self._record(self.queue.retry, job, 'retried', started, job.id, error, time.time() + delay)
+        else:
+            self._record(self.queue.complete, job, 'succeeded', started, job.id)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._wakeup.set()
+
+    def _record(self, update, job, outcome, started, *args):
+        try:
+            update(*args)
+        except sqlite3.Error as e:
+            # 未能记录结果的任务在 claim_timeout 后会被重新领取
+            logger.warning(f'记录任务结果失败: {e}', extra={'job_id': job.id})
+        finished = time.time()
+        metrics.record_job(job.kind, outcome, finished - started,
+                           finished - job.created_at if outcome == 'succeeded' else None)
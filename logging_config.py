@@ -0,0 +1,209 @@
+"""
+日志配置
+所有日志先写入内存队列（QueueHandler），由后台线程（QueueListener）格式化为 JSON 行并输出，
+请求线程不会因写 stdout 而阻塞；日志中的手机号、邮箱、学号会被脱敏，
+访问日志等高频日志可按 logger 设置采样率
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# 需要脱敏的字段名
+PII_FIELDS = frozenset(('phone', 'email', 'student_id'))
+# 文本中的手机号、邮箱，以及形如 'phone': '...' 的键值对
+PHONE_RE = re.compile(r'(?<!\d)1[3-9]\d{9}(?!\d)')
+EMAIL_RE = re.compile(r'[^\s@\'"<>(),;:]+@[^\s@\'"<>(),;:]+\.[A-Za-z]{2,}')
+PII_PAIR_RE = re.compile(r'''(['"]?(?:phone|email|student_id)['"]?\s*[:=]\s*)(['"])(.*?)\2''')
+
+# LogRecord 的标准属性，其余属性视为 extra 字段输出
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def mask(value):
+    """保留首尾字符，其余替换为 *"""
+    value = str(value)
+    if len(value) <= 2:
+        return '*' * len(value)
+    return value[0] + '*' * (len(value) - 2) + value[-1]
+
+
+def redact_text(text):
+    text = PII_PAIR_RE.sub(lambda m: f'{m.group(1)}{m.group(2)}{mask(m.group(3))}{m.group(2)}', text)
+    text = EMAIL_RE.sub(lambda m: mask(m.group(0)), text)
+    return PHONE_RE.sub(lambda m: mask(m.group(0)), text)
+
+
+def redact(value, key=None):
+    """递归脱敏：PII 字段整体打码，其它字符串中的手机号、邮箱打码"""
+    if key in PII_FIELDS and value not in (None, ''):
+        return mask(value)
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """在记录日志的线程中附加请求上下文（请求 ID、路由、方法）"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.route = request.url_rule.rule if request.url_rule else request.path
+            record.method = request.method
+        return True
+
+
+class RedactFilter(logging.Filter):
+    """在进入队列前完成消息格式化与脱敏，避免原始个人信息离开请求线程"""
+
+    def filter(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message = f'{message}\n{logging.Formatter().formatException(record.exc_info)}'
+            record.exc_info = None
+        record.msg = redact_text(message)
+        record.args = None
+        for key in set(vars(record)) - _RECORD_ATTRS:
+            setattr(record, key, redact(getattr(record, key), key))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按 logger 名称前缀采样，WARNING 及以上级别的日志始终保留
+
+    Args:
+        rates (dict): {logger 名称前缀: 采样率(0-1)}
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        # 按前缀长度倒序，优先匹配最具体的 logger
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in sorted(set(vars(record)) - _RECORD_ATTRS):
+            value = getattr(record, key)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def parse_sample_rates(value):
+    """解析 "costrict.access=0.1,costrict.submit=1" 形式的采样率配置"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, rate = item.split('=', 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(level='INFO', sample_rates=None, queue_size=10000):
+    """
+    配置根 logger：QueueHandler -> 队列 -> QueueListener(JSON -> stdout)
+
+    队列满时丢弃新日志而不是阻塞请求线程
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(RedactFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # RedactFilter 已完成格式化，这里只需复制记录
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def init_app(app):
+    """为每个请求分配请求 ID，并记录访问日志（logger: costrict.access）"""
+    access_logger = logging.getLogger('costrict.access')
+
+    @app.before_request
+    def _assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        started = g.get('log_started')
+        if started is not None:
+            access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'status': response.status_code,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            })
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        return response
+
+
+def configure_from_env(app):
+    """根据环境变量（LOG_LEVEL、LOG_SAMPLE_RATES、LOG_QUEUE_SIZE）完成日志配置"""
+    setup_logging(
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        sample_rates=parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', 'costrict.access=1')),
+        queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+    )
+    init_app(app)
@@ -0,0 +1,172 @@
+"""
+报名确认邮件
+由后台任务（见 jobs.py）逐个成员发送，发送方式由 MAIL_BACKEND 决定：
+- smtp：通过 SMTP_HOST 等环境变量指定的 SMTP 服务器发送
+- file：写入 MAIL_FILE_DIR 目录下的 .eml 文件，本地开发和测试使用，不需要邮件服务器
+- none：不发送确认邮件
+未设置 MAIL_BACKEND 时，设置了 SMTP_HOST 则使用 smtp，否则使用 file
+"""
+
+import logging
+import os
+import smtplib
+import ssl
+import time
+import uuid
+from email import policy
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
+
+from jobs import PermanentJobError
+
+logger = logging.getLogger('costrict.mailer')
+
+CONTEST_NAME = '码上AI·2025深信服CoStrict校园挑战赛'
+
+# 后台任务类型
+CONFIRMATION_JOB = 'confirmation_email'
+
+CONFIRMATION_SUBJECT = '报名成功：{team_name}'
+CONFIRMATION_BODY = '''{name}，您好：
+
+您所在的团队已成功报名参加"{contest}"，报名信息如下：
+
+团队名称：{team_name}
+参赛赛道：{competition_track}
+作品名称：{project_name}
+您的身份：{member_type}
+
+如需修改报名信息，请联系赛事组委会。此邮件由系统自动发送，请勿直接回复。
+'''
+
+
+def confirmation_jobs(team_id, team_data, members_data):
+    """
+    一次报名需要发送的确认邮件任务，每个成员一封（同一邮箱只发一封）
+
+    Returns:
+        list: [(任务类型, payload), ...]
+    """
+    pending, seen = [], set()
+    for member in members_data:
+        email = (member.get('email') or '').strip()
+        if not email or email.lower() in seen:
+            continue
+        seen.add(email.lower())
+        pending.append((CONFIRMATION_JOB, {
+            'team_id': team_id,
+            'to': email,
+            'name': member.get('name', ''),
+            'member_type': member.get('member_type', ''),
+            'team_name': team_data.get('team_name', ''),
+            'competition_track': team_data.get('competition_track', ''),
+            'project_name': team_data.get('project_name', ''),
+        }))
+    return pending
+
+
+def _mailbox(name, address):
+    # email.utils.formataddr 和 headerregistry.Address 不接受非 ASCII 的本地部分，这里直接拼接（显示名加引号）
+    name = name.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{name}" <{address}>' if name else address
+
+
+def confirmation_message(payload, sender):
+    # 收件地址含非 ASCII 字符时需要 SMTPUTF8（smtplib 会据此向服务器声明）；
+    # 其余邮件仍按 RFC 2047 编码中文标题，兼容不支持 SMTPUTF8 的服务器
+    message = EmailMessage(policy=policy.default if payload['to'].isascii() else policy.SMTPUTF8)
+    message['Subject'] = CONFIRMATION_SUBJECT.format(**payload)
+    message['From'] = sender
+    message['To'] = _mailbox(payload['name'], payload['to'])
+    message['Date'] = formatdate(localtime=True)
+    message['Message-ID'] = make_msgid(domain=parseaddr(sender)[1].rpartition('@')[2] or None)
+    message.set_content(CONFIRMATION_BODY.format(contest=CONTEST_NAME, **payload))
+    return message
+
+
+class SMTPBackend:
+    """
+    通过 SMTP 服务器发送
+
+    Args:
+        security (str): none / starttls / ssl
+    """
+
+    def __init__(self, host, port=25, username=None, password=None, security='none', timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.timeout = timeout
+
+    def send(self, message):
+        if self.security == 'ssl':
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.security == 'starttls':
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password or '')
+            smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as e:
+            # 收件地址被拒收，重试也不会成功
+            raise PermanentJobError(f'收件地址被拒收: {e.recipients}') from e
+        except smtplib.SMTPNotSupportedError as e:
+            # 收件地址含非 ASCII 字符而服务器不支持 SMTPUTF8
+            raise PermanentJobError(f'SMTP 服务器不支持: {e}') from e
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code >= 500:
+                raise PermanentJobError(f'SMTP 永久错误 {e.smtp_code}: {e.smtp_error!r}') from e
+            raise
+        finally:
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                smtp.close()
+
+
+class FileBackend:
+    """将邮件写入目录下的 .eml 文件（本地开发和测试使用）"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, message):
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.eml')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(message.as_bytes())
+        os.replace(tmp_path, path)
+
+
+def backend_from_env(instance_path):
+    """
+    根据环境变量创建发送方式，MAIL_BACKEND=none 时返回None
+
+    未设置 MAIL_BACKEND 时，设置了 SMTP_HOST 则使用 smtp，否则不发送；
+    file 会把报名者的姓名和邮箱写入本地文件，需要显式开启（本地开发和测试使用）
+    """
+    name = os.getenv('MAIL_BACKEND') or ('smtp' if os.getenv('SMTP_HOST') else None)
+    if name is None:
+        logger.warning('未设置 SMTP_HOST 或 MAIL_BACKEND，不发送确认邮件')
+        return None
+    if name == 'none':
+        return None
+    if name == 'smtp':
+        return SMTPBackend(
+            os.getenv('SMTP_HOST', 'localhost'),
+            int(os.getenv('SMTP_PORT', '25')),
+            username=os.getenv('SMTP_USERNAME') or None,
+            password=os.getenv('SMTP_PASSWORD') or None,
+            security=os.getenv('SMTP_SECURITY', 'none'),
+            timeout=float(os.getenv('SMTP_TIMEOUT', '30')))
+    if name == 'file':
+        directory = os.getenv('MAIL_FILE_DIR', os.path.join(instance_path, 'mail'))
+        logger.warning(f'MAIL_BACKEND=file：确认邮件（含报名者姓名和邮箱）写入 {directory}，不会自动清理，仅用于本地开发和测试')
+        return FileBackend(directory)
+    raise ValueError(f'不支持的 MAIL_BACKEND: {name}（支持 smtp / file / none）')
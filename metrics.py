@@ -0,0 +1,420 @@
+"""
+请求耗时与 SQL 指标
+记录每个路由的延迟直方图、每个请求的 SQL 语句数和耗时、连接池状态及提交结果计数，
+以 Prometheus 文本格式输出
+
+gunicorn 的每个 worker 各自计数，并定期将快照写入共享目录（METRICS_DIR）；
+抓取时合并所有 worker 的快照：计数器和直方图求和，连接池等瞬时值按 pid 分别输出
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('costrict.metrics')
+
+# 直方图分桶
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+# 后台任务从写入到完成的时间（包括重试等待）
+JOB_LATENCY_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+BACKUP_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# 指标说明与类型
+METRIC_HELP = {
+    'http_requests_total': ('counter', '请求总数'),
+    'http_request_duration_seconds': ('histogram', '请求耗时'),
+    'db_statements_per_request': ('histogram', '每个请求执行的 SQL 语句数'),
+    'db_request_time_seconds_total': ('counter', '请求内 SQL 执行总耗时'),
+    'db_statements_total': ('counter', 'SQL 语句总数'),
+    'db_statement_duration_seconds': ('histogram', '单条 SQL 语句耗时'),
+    'db_pool_connections': ('gauge', '连接池状态'),
+    'submissions_total': ('counter', '团队提交结果'),
+    'admission_total': ('counter', '接口准入控制结果'),
+    'idempotency_total': ('counter', '幂等键处理结果'),
+    'jobs_total': ('counter', '后台任务执行结果'),
+    'job_duration_seconds': ('histogram', '后台任务单次执行耗时'),
+    'job_latency_seconds': ('histogram', '后台任务从写入到执行成功的时间'),
+    'jobs_queue_depth': ('gauge', '后台任务队列中未完成的任务数'),
+    'backups_total': ('counter', '数据库备份结果'),
+    'backup_duration_seconds': ('histogram', '数据库备份耗时'),
+    'backup_snapshots': ('gauge', '备份目录中的备份数'),
+    'backup_last_timestamp_seconds': ('gauge', '最近一次备份的时间（Unix 时间戳）'),
+}
+
+
+class Registry:
+    """进程内的指标存储：计数器和直方图"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        key = (name, tuple(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                # [各分桶计数..., +Inf 计数, 总和]
+                hist = self.histograms[key] = {'buckets': list(buckets),
+                                               'counts': [0] * (len(buckets) + 1),
+                                               'sum': 0.0}
+            hist['counts'][bisect_left(hist['buckets'], value)] += 1
+            hist['sum'] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value]
+                             for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), hist['buckets'], list(hist['counts']), hist['sum']]
+                               for (name, labels), hist in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+def inc_submission(outcome):
+    """记录一次提交结果（accepted/queued/invalid/duplicate/closed/error）"""
+    registry.inc('submissions_total', (('outcome', outcome),))
+
+
+def inc_admission(endpoint, outcome):
+    """记录一次准入控制结果（admitted/rate_limited/overloaded/too_large/length_required/limiter_error）"""
+    registry.inc('admission_total', (('endpoint', endpoint), ('outcome', outcome)))
+
+
+def inc_idempotency(endpoint, outcome):
+    """记录一次幂等键处理结果（new/replayed/in_progress/mismatch/invalid/store_error）"""
+    registry.inc('idempotency_total', (('endpoint', endpoint), ('outcome', outcome)))
+
+
+def record_job(kind, outcome, duration, latency=None):
+    """记录一次后台任务执行（succeeded/retried/failed）；latency 为写入到执行成功的时间"""
+    registry.inc('jobs_total', (('kind', kind), ('outcome', outcome)))
+    registry.observe('job_duration_seconds', duration, (('kind', kind),))
+    if latency is not None:
+        registry.observe('job_latency_seconds', latency, (('kind', kind),), buckets=JOB_LATENCY_BUCKETS)
+
+
+def job_gauges(depth):
+    """任务队列深度（队列文件由所有 worker 共享，不按 pid 区分）"""
+    return [['jobs_queue_depth', [['status', status]], count] for status, count in sorted(depth.items())]
+
+
+def record_backup(label, outcome, duration):
+    """记录一次数据库备份（succeeded/failed）"""
+    registry.inc('backups_total', (('label', label), ('outcome', outcome)))
+    registry.observe('backup_duration_seconds', duration, (('label', label),), buckets=BACKUP_BUCKETS)
+
+
+def backup_gauges(snapshots):
+    """备份目录中每种备份的数量及最近一次的时间（备份目录由所有 worker 共享，不按 pid 区分）"""
+    gauges, latest = [], {}
+    for snapshot in snapshots:
+        latest.setdefault(snapshot.label, snapshot)
+    for label in sorted(latest):
+        gauges.append(['backup_snapshots', [['label', label]],
+                       sum(1 for snapshot in snapshots if snapshot.label == label)])
+        gauges.append(['backup_last_timestamp_seconds', [['label', label]], latest[label].created_at.timestamp()])
+    return gauges
+
+
+# ===== SQLAlchemy 事件：统计 SQL 数量与耗时 =====
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    registry.inc('db_statements_total')
+    registry.observe('db_statement_duration_seconds', elapsed)
+    try:
+        g.sql_count = g.get('sql_count', 0) + 1
+        g.sql_time = g.get('sql_time', 0.0) + elapsed
+    except RuntimeError:
+        # 后台线程中没有应用上下文
+        pass
+
+
+# ===== 多 worker 快照文件 =====
+
+class MetricsExporter:
+    """
+    负责将本进程的快照写入共享目录，并在抓取时合并所有 worker 的快照
+
+    Args:
+        directory (str): 快照目录，所有 worker 必须相同
+        flush_interval (float): 请求结束时写快照的最小间隔（秒）
+        get_gauges (callable): 后台线程写快照时获取瞬时值（连接池状态等）
+    """
+
+    def __init__(self, directory, flush_interval=1.0, get_gauges=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.get_gauges = get_gauges or (lambda: [])
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._flusher_pid = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics_{pid}.json')
+
+    def flush(self, gauges=None, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_flush:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = now + self.flush_interval
+            data = registry.snapshot()
+            data['gauges'] = gauges or []
+            path = self._path(os.getpid())
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        finally:
+            self._flush_lock.release()
+
+    def start_flusher(self):
+        """
+        在当前进程中启动定期写快照的线程（每个进程只启动一次）
+
+        空闲的 worker 也要定期写快照，保证最后一批请求能被其它 worker 合并；
+        gunicorn fork 之后每个 worker 各自启动
+        """
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush(self.get_gauges())
+            except Exception as e:
+                logger.warning(f'写入指标快照失败: {e}')
+
+    def collect(self):
+        """合并所有 worker 的快照；已退出 worker 的计数归档到 metrics_archive.json"""
+        counters = {}
+        histograms = {}
+        gauges = []
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, 'metrics_archive.json')
+            archive = _load_json(archive_path) or {'counters': [], 'histograms': []}
+            dead = []
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                    continue
+                if filename == 'metrics_archive.json':
+                    continue
+                pid = int(filename[len('metrics_'):-len('.json')])
+                data = _load_json(os.path.join(self.directory, filename))
+                if data is None:
+                    continue
+                if _pid_alive(pid):
+                    _merge(counters, histograms, data)
+                    gauges.extend((name, labels + [['pid', str(pid)]], value)
+                                  for name, labels, value in data.get('gauges', []))
+                else:
+                    dead.append((filename, data))
+            if dead:
+                archived_counters, archived_histograms = {}, {}
+                _merge(archived_counters, archived_histograms, archive)
+                for _, data in dead:
+                    _merge(archived_counters, archived_histograms, data)
+                archive = _dump(archived_counters, archived_histograms)
+                tmp_path = f'{archive_path}.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(archive, f)
+                os.replace(tmp_path, archive_path)
+                for filename, _ in dead:
+                    os.remove(os.path.join(self.directory, filename))
+            _merge(counters, histograms, archive)
+        return counters, histograms, gauges
+
+
+def _load_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, buckets, counts, total in data.get('histograms', []):
+        key = (name, tuple(tuple(label) for label in labels))
+        hist = histograms.get(key)
+        if hist is None:
+            histograms[key] = {'buckets': list(buckets), 'counts': list(counts), 'sum': total}
+        else:
+            hist['counts'] = [a + b for a, b in zip(hist['counts'], counts)]
+            hist['sum'] += total
+
+
+def _dump(counters, histograms):
+    return {
+        'counters': [[name, [list(label) for label in labels], value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, [list(label) for label in labels], hist['buckets'], hist['counts'], hist['sum']]
+                       for (name, labels), hist in histograms.items()],
+    }
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in items)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + '}'
+
+
+def render_prometheus(counters, histograms, gauges):
+    """输出 Prometheus 文本格式"""
+    lines = []
+    names = sorted({name for name, _ in counters} | {name for name, _ in histograms}
+                   | {name for name, _, _ in gauges})
+    for name in names:
+        metric_type, help_text = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (metric, labels), hist in sorted(histograms.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(hist['buckets'], hist['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            cumulative += hist['counts'][-1]
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {hist["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        for metric, labels, value in gauges:
+            if metric == name:
+                lines.append(f'{name}{_format_labels(tuple(tuple(label) for label in labels))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def pool_gauges(engine):
+    """连接池状态（QueuePool 之外的连接池只输出可用的值）"""
+    pool = engine.pool
+    gauges = []
+    for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+        getter = getattr(pool, state, None)
+        if getter is None:
+            continue
+        try:
+            value = getter()
+            if state == 'overflow':
+                # QueuePool 的 overflow 从 -pool_size 开始计数，只输出超出 pool_size 的连接数
+                value = max(value, 0)
+            gauges.append(['db_pool_connections', [['state', state]], value])
+        except Exception:
+            continue
+    return gauges
+
+
+def record_request(method, route, status, elapsed, sql_count=None, sql_time=0.0):
+    """
+    记录一个请求的耗时和 SQL 统计
+
+    sql_count 为 None 时不记录 SQL 统计（例如 asgi.py 中的异步接口，SQL 在事件循环中执行，无法按请求归属）
+    """
+    labels = (('method', method), ('route', route))
+    registry.inc('http_requests_total', labels + (('status', str(status)),))
+    registry.observe('http_request_duration_seconds', elapsed, labels)
+    if sql_count is not None:
+        registry.observe('db_statements_per_request', sql_count, (('route', route),),
+                         buckets=STATEMENT_BUCKETS)
+        registry.inc('db_request_time_seconds_total', (('route', route),), sql_time)
+
+
+def init_app(app, get_engine, directory, flush_interval=1.0):
+    """
+    注册请求钩子
+
+    Args:
+        app (Flask): 应用实例
+        get_engine (callable): 返回当前数据库引擎（需在应用上下文中调用）
+        directory (str): 多 worker 快照目录
+        flush_interval (float): 写快照的最小间隔（秒）
+    """
+    def _gauges():
+        with app.app_context():
+            return pool_gauges(get_engine())
+
+    exporter = MetricsExporter(directory, flush_interval, get_gauges=_gauges)
+
+    @app.before_request
+    def _start_timer():
+        exporter.start_flusher()
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+
+    def _record(status):
+        # 每个请求只记录一次
+        started = g.pop('request_started', None)
+        if started is None:
+            return
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        record_request(request.method, route, status, time.perf_counter() - started,
+                       g.get('sql_count', 0), g.get('sql_time', 0.0))
+
+    @app.after_request
+    def _record_request(response):
+        _record(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _record_failed_request(exc):
+        # 视图抛出异常且没有经过 after_request 时（PROPAGATE_EXCEPTIONS 开启、其它响应钩子出错等）按 500 记录
+        if exc is not None:
+            _record(500)
+
+    return exporter
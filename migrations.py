@@ -0,0 +1,126 @@
+"""
+数据库结构迁移
+db.create_all() 只会创建缺失的表，不会为已有的表补建索引；
+这里按版本号顺序执行迁移，已执行的版本记录在 schema_version 表中
+
+新增迁移时在 MIGRATIONS 末尾追加 (版本号, 说明, 函数)，函数接收一个处于事务中的连接
+"""
+
+import logging
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, func, select
+from sqlalchemy.exc import IntegrityError
+
+from models import get_current_time, ShanghaiDateTime, Team, TeamMember
+
+logger = logging.getLogger('costrict.migrations')
+
+# 迁移记录表（不属于 db.metadata，不由 create_all 创建）
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', ShanghaiDateTime, nullable=False),
+)
+
+
+def _index(model, name):
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise KeyError(name)
+
+
+def _create_indexes(*names):
+    """创建 models.py 中定义的索引（已存在时跳过）"""
+    def migrate(conn):
+        for model, name in names:
+            _index(model, name).create(conn, checkfirst=True)
+    return migrate
+
+
+MIGRATIONS = [
+    (1, '团队列表游标分页及学校过滤索引', _create_indexes(
+        (Team, 'ix_teams_createdAt_id'),
+        (Team, 'ix_teams_track_createdAt_id'),
+        (TeamMember, 'ix_team_members_school_team_id'),
+    )),
+    (2, '成员外键、数据指纹及管理后台过滤索引', _create_indexes(
+        (Team, 'ix_teams_updatedAt'),
+        (TeamMember, 'ix_team_members_team_id_updatedAt'),
+        (TeamMember, 'ix_team_members_updatedAt'),
+        (TeamMember, 'ix_team_members_team_name'),
+        (TeamMember, 'ix_team_members_phone'),
+        (TeamMember, 'ix_team_members_email'),
+    )),
+]
+
+# 当前代码的数据库结构版本
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def _claim(conn, version, description):
+    try:
+        conn.execute(schema_version.insert().values(
+            version=version, description=description, applied_at=get_current_time()))
+        return True
+    except IntegrityError:
+        # 其它进程已执行该迁移
+        return False
+
+
+def migrate(engine):
+    """
+    执行所有未执行的迁移，返回执行的版本号列表
+
+    每个迁移在独立事务中执行：先写入版本记录（占用写锁），再执行迁移；
+    多个 worker 同时启动时，写入版本记录失败的一方跳过该迁移
+    """
+    with engine.begin() as conn:
+        version = current_version(conn)
+    applied = []
+    for migration_version, description, apply in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as conn:
+            if not _claim(conn, migration_version, description):
+                continue
+            apply(conn)
+        logger.info(f'已执行数据库迁移 {migration_version}: {description}')
+        applied.append(migration_version)
+    return applied
+
+
+def explain(engine, run):
+    """
+    记录 run() 在 engine 上执行的所有 SELECT 语句并返回它们的查询计划
+
+    Returns:
+        list: [(SQL 语句, [查询计划的每一行说明]), ...]，相同语句只保留一次
+    """
+    captured = {}
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            captured.setdefault(statement, parameters)
+
+    event.listen(engine, 'before_cursor_execute', _capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _capture)
+
+    # SQLite 输出 EXPLAIN QUERY PLAN 的说明列，其它数据库输出 EXPLAIN 的整行
+    sqlite = engine.dialect.name == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN' if sqlite else 'EXPLAIN'
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in captured.items():
+            rows = conn.exec_driver_sql(f'{prefix} {statement}', parameters)
+            plans.append((statement, [row[-1] if sqlite else ' | '.join(map(str, row)) for row in rows]))
+    return plans
@@ -6,8 +6,10 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import pytz
 
-# 创建数据库实例
-db = SQLAlchemy()
+from database import RoutingSession
+
+# 创建数据库实例（会话支持将读取查询路由到只读副本，见 database.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # 定义上海时区
 TZ = pytz.timezone('Asia/Shanghai')
@@ -15,12 +17,45 @@ TZ = pytz.timezone('Asia/Shanghai')
 def get_current_time():
     return datetime.now(TZ)
 
+
+class ShanghaiDateTime(db.TypeDecorator):
+    """
+    以上海时间（不含时区信息）存储的日期时间
+
+    写入时将带时区的时间转换为上海时间，不带时区的时间视为上海时间；
+    读取时统一返回带上海时区的 datetime。
+    SQLite、PostgreSQL（timestamp without time zone）、MySQL（DATETIME）的存储结果一致，
+    不受数据库服务端或连接时区设置的影响
+    """
+    impl = db.DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(TZ).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return TZ.localize(value)
+        return value.astimezone(TZ)
+
 class Team(db.Model):
     __tablename__ = 'teams'
+    __table_args__ = (
+        # /api/teams 按 (createdAt, id) 倒序进行游标分页
+        db.Index('ix_teams_createdAt_id', 'createdAt', 'id'),
+        # 按参赛赛道过滤后分页
+        db.Index('ix_teams_track_createdAt_id', 'competition_track', 'createdAt', 'id'),
+        # 列表指纹 max(updatedAt)
+        db.Index('ix_teams_updatedAt', 'updatedAt'),
+    )
     # 自增整型主键
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    createdAt = db.Column(db.DateTime, nullable=False, default=get_current_time)
-    updatedAt = db.Column(db.DateTime, nullable=False, default=get_current_time)
+    createdAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)
+    updatedAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)
     
     def __init__(self, **kwargs):
         super(Team, self).__init__(**kwargs)
@@ -47,10 +82,22 @@ class Team(db.Model):
 
 class TeamMember(db.Model):
     __tablename__ = 'team_members'
+    __table_args__ = (
+        # 按学校过滤团队：school -> team_id
+        db.Index('ix_team_members_school_team_id', 'school', 'team_id'),
+        # 按团队加载成员（外键），并覆盖单个团队指纹的 max(updatedAt)/count
+        db.Index('ix_team_members_team_id_updatedAt', 'team_id', 'updatedAt'),
+        # 列表指纹 max(updatedAt)
+        db.Index('ix_team_members_updatedAt', 'updatedAt'),
+        # 管理后台按团队名称、电话、邮箱过滤
+        db.Index('ix_team_members_team_name', 'team_name'),
+        db.Index('ix_team_members_phone', 'phone'),
+        db.Index('ix_team_members_email', 'email'),
+    )
     # 自增整型主键
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    createdAt = db.Column(db.DateTime, nullable=False, default=get_current_time)  # 提交时间
-    updatedAt = db.Column(db.DateTime, nullable=False, default=get_current_time)  # 最新提交时间
+    createdAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)  # 提交时间
+    updatedAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)  # 最新提交时间
     
     def __init__(self, **kwargs):
         super(TeamMember, self).__init__(**kwargs)
@@ -86,8 +133,8 @@ class Config(db.Model):
     
     # 自增整型主键
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    createdAt = db.Column(db.DateTime, nullable=False, default=get_current_time)
-    updatedAt = db.Column(db.DateTime, nullable=False, default=get_current_time)
+    createdAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)
+    updatedAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time)
     
     def __init__(self, **kwargs):
         super(Config, self).__init__(**kwargs)
@@ -99,5 +146,39 @@ class Config(db.Model):
     config_key = db.Column(db.String(100), nullable=False, unique=True, index=True)  # 配置键 - 唯一索引
     config_value = db.Column(db.Text, nullable=True)  # 配置值
     # 配置类型 - 支持int、datetime、str，默认为str
-    config_type = db.Column(db.Enum('str', 'int', 'datetime', name='config_type_enum'), nullable=False, default='str')
+    # 使用普通字符串列（各数据库均为 VARCHAR），可选值由管理后台的下拉框限制
+    config_type = db.Column(db.String(20), nullable=False, default='str')
     description = db.Column(db.String(255), nullable=True)  # 配置描述
+
+
+class RegistrationStat(db.Model):
+    """
+    报名统计表 - 预先聚合的计数器
+    在保存团队/成员的同一事务中增量更新（见 stats.py），可通过 flask rebuild-stats 全量重建
+    """
+    __tablename__ = 'registration_stats'
+
+    # 统计维度：total、track、school、day、member_type
+    dimension = db.Column(db.String(20), primary_key=True)
+    # 维度取值，例如赛道名称、学校名称、日期（YYYY-MM-DD）
+    key = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updatedAt = db.Column(ShanghaiDateTime, nullable=False, default=get_current_time, onupdate=get_current_time)
+
+
+class IdempotencyKey(db.Model):
+    """
+    提交接口的幂等键（见 idempotency.py）
+    保存请求体摘要和首次处理的响应，相同的键重复提交时直接返回该响应；过期的记录定期删除
+    """
+    __tablename__ = 'idempotency_keys'
+
+    # 客户端 Idempotency-Key 的 SHA-256（十六进制）
+    key_hash = db.Column(db.String(64), primary_key=True)
+    # 请求体的 SHA-256，同一个键用于内容不同的请求时拒绝
+    request_hash = db.Column(db.String(64), nullable=False)
+    # 首次处理的响应状态码和响应体，处理中为 NULL
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    # 过期时间（Unix 时间戳）：处理中为占用期限，处理完成后为保留期限
+    expires_at = db.Column(db.Float, nullable=False, index=True)
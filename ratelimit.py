@@ -0,0 +1,259 @@
+"""
+提交接口的准入控制
+- 请求体大小上限：超出时直接返回 413，不读取请求体
+- 按客户端 IP 的令牌桶限流：桶状态保存在本地 SQLite 文件中，所有 gunicorn worker 共享，超出时返回 429
+- 并发上限：每个 worker 同时处理的请求数超出上限时立即返回 503，而不是排队等待
+
+各项结果计入 admission_total 指标（见 metrics.py），用于调整参数
+"""
+
+import functools
+import ipaddress
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import jsonify, request
+
+import metrics
+
+logger = logging.getLogger('costrict.ratelimit')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_buckets_updated_at ON buckets (updated_at);
+'''
+
+
+class TokenBucket:
+    """
+    基于 SQLite 文件的令牌桶，多个进程共享同一个文件
+
+    每个键的桶容量为 burst，每秒补充 rate 个令牌；桶状态丢失只会让限流暂时放宽，
+    因此使用 synchronous=OFF 以减少写入开销
+
+    Args:
+        path (str): 桶状态数据库文件路径
+        rate (float): 每秒补充的令牌数
+        burst (int): 桶容量（允许的突发请求数）
+        cleanup_interval (float): 清理已补满的桶的间隔（秒）
+    """
+
+    def __init__(self, path, rate, burst, cleanup_interval=60.0):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._next_cleanup = 0.0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # 每个线程使用独立连接；isolation_level=None 以便手动控制事务
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def acquire(self, key, cost=1.0):
+        """
+        从 key 的桶中取出 cost 个令牌
+
+        Returns:
+            tuple: (是否允许, 需要等待的秒数)
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = self.burst if row is None else \
+                min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                (key, tokens, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            self.cleanup(now)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def cleanup(self, now=None):
+        """删除已补满的桶（与不存在等价），返回删除的数量"""
+        now = time.time() if now is None else now
+        cursor = self._connect().execute(
+            'DELETE FROM buckets WHERE updated_at < ?', (now - self.burst / self.rate,))
+        return cursor.rowcount
+
+
+class ConcurrencyLimit:
+    """
+    进程内的并发上限：acquire() 不等待，已满时立即返回 False
+
+    Args:
+        limit (int): 每个进程同时处理的请求数上限
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
+
+
+# TRUSTED_PROXIES 的默认值：仅本机。内网中的其它主机或容器可以任意设置 X-Real-IP / X-Forwarded-For，
+# 反向代理不在本机时（如 Docker 网桥网关）由部署显式配置
+LOOPBACK_NETWORKS = '127.0.0.0/8,::1'
+
+
+def parse_networks(value):
+    """解析逗号分隔的 IP 或网段列表"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in (value or '').split(',') if item.strip()]
+
+
+def client_ip(trusted_proxies, req=None):
+    """
+    客户端 IP：直接连接的地址属于受信任的反向代理时，
+    依次使用 X-Real-IP 和 X-Forwarded-For 中最后一个不属于受信任代理的地址
+    （与 competition.conf 中 nginx 设置的请求头一致；不受信任的连接忽略这些请求头，防止伪造）
+
+    req 为 werkzeug 请求对象，默认使用当前 Flask 请求
+    """
+    req = request if req is None else req
+    remote = req.remote_addr or ''
+
+    def trusted(address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in trusted_proxies)
+
+    if not trusted(remote):
+        return remote
+    real_ip = req.headers.get('X-Real-IP', '').strip()
+    if real_ip:
+        return real_ip
+    forwarded = [item.strip() for item in req.headers.get('X-Forwarded-For', '').split(',') if item.strip()]
+    for address in reversed(forwarded):
+        if not trusted(address):
+            return address
+    return forwarded[0] if forwarded else remote
+
+
+class AdmissionControl:
+    """
+    接口准入控制，以装饰器方式使用：
+
+        @admission.limit('submit')
+        def submit_team(): ...
+
+    不经过 Flask 的调用方（如 asgi.py）依次调用 check()、enter()，处理完成后调用 leave()
+
+    Args:
+        bucket (TokenBucket): 按 IP 限流的令牌桶，None 表示不限流
+        concurrency (ConcurrencyLimit): 并发上限，None 表示不限制
+        max_body (int): 请求体字节数上限，0 表示不限制
+        trusted_proxies (list): 受信任的反向代理网段（见 client_ip）
+    """
+
+    def __init__(self, bucket=None, concurrency=None, max_body=0, trusted_proxies=()):
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.max_body = max_body
+        self.trusted_proxies = list(trusted_proxies)
+
+    def _reject(self, endpoint, outcome, status, message, retry_after=None):
+        metrics.inc_admission(endpoint, outcome)
+        return status, message, retry_after
+
+    def check(self, endpoint, req=None):
+        """
+        检查请求体大小和限流（不读取请求体；限流会读写 SQLite 文件）
+
+        Returns:
+            tuple: 拒绝时返回 (状态码, 提示信息, Retry-After 秒数或None)，允许时返回None
+        """
+        req = request if req is None else req
+        if self.max_body:
+            if req.content_length is None:
+                return self._reject(endpoint, 'length_required', 411, '请求缺少 Content-Length')
+            if req.content_length > self.max_body:
+                return self._reject(endpoint, 'too_large', 413, '请求内容过大')
+
+        if self.bucket is not None:
+            key = f'{endpoint}:{client_ip(self.trusted_proxies, req)}'
+            try:
+                allowed, retry_after = self.bucket.acquire(key)
+            except sqlite3.Error as e:
+                # 限流存储不可用时放行，不影响正常报名
+                logger.warning(f'限流状态读写失败，本次请求不限流: {e}')
+                metrics.inc_admission(endpoint, 'limiter_error')
+                allowed = True
+            if not allowed:
+                return self._reject(endpoint, 'rate_limited', 429,
+                                    f'提交过于频繁，请 {max(1, math.ceil(retry_after))} 秒后重试',
+                                    retry_after)
+        return None
+
+    def enter(self, endpoint):
+        """
+        占用一个并发名额，成功后计为 admitted，处理完成后需调用 leave()
+
+        Returns:
+            tuple: 已满时返回拒绝信息（同 check），否则返回None
+        """
+        if self.concurrency is not None and not self.concurrency.acquire():
+            return self._reject(endpoint, 'overloaded', 503, '服务器繁忙，请稍后重试', 1)
+        metrics.inc_admission(endpoint, 'admitted')
+        return None
+
+    def leave(self):
+        if self.concurrency is not None:
+            self.concurrency.release()
+
+    @staticmethod
+    def headers(retry_after):
+        """拒绝响应的额外响应头"""
+        return {'Retry-After': str(max(1, math.ceil(retry_after)))} if retry_after is not None else {}
+
+    def limit(self, endpoint):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                rejected = self.check(endpoint) or self.enter(endpoint)
+                if rejected:
+                    status, message, retry_after = rejected
+                    return jsonify({
+                        'success': False,
+                        'message': message
+                    }), status, self.headers(retry_after)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.leave()
+            return wrapper
+        return decorator
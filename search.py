@@ -0,0 +1,236 @@
+"""
+团队与成员的全文检索
+SQLite 下使用 FTS5（trigram 分词，支持中文子串匹配）外部内容表，由触发器与 teams / team_members 保持同步；
+其它数据库或检索词不足 3 个字符（trigram 无法匹配）时回退为 LIKE 查询
+"""
+
+import contextlib
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Team, TeamMember
+from serializers import format_datetime
+
+logger = logging.getLogger('costrict.search')
+
+# 建立全文索引的字段（competition_track、phone、team_name 保持与管理后台原有搜索字段一致）
+TEAM_SEARCH_COLUMNS = ('team_name', 'project_name', 'competition_track',
+                       'project_intro', 'tech_solution', 'goals_and_outlook')
+MEMBER_SEARCH_COLUMNS = ('name', 'school', 'email', 'phone', 'tech_stack', 'team_name')
+
+# 模型 -> (FTS 表名, 内容表名, 索引字段)
+FTS_TABLES = {
+    Team: ('teams_fts', 'teams', TEAM_SEARCH_COLUMNS),
+    TeamMember: ('team_members_fts', 'team_members', MEMBER_SEARCH_COLUMNS),
+}
+
+# trigram 分词只能匹配不少于 3 个字符的检索词
+MIN_FTS_TERM_LENGTH = 3
+
+# 每个进程缓存全文索引是否可用（None 表示尚未检查）
+_fts_enabled = None
+
+
+def _fts_ddl(fts_table, content_table, columns):
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{col}' for col in columns)
+    old_values = ', '.join(f'old.{col}' for col in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{content_table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        # 只在索引字段变化时更新（例如仅修改 updatedAt 时不触发）
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def setup(engine):
+    """
+    创建全文索引表和同步触发器；首次创建时根据已有数据建立索引
+
+    Returns:
+        bool: 全文索引是否可用（非 SQLite 或 SQLite 未编译 FTS5 时为 False）
+    """
+    global _fts_enabled
+    if engine.dialect.name != 'sqlite':
+        _fts_enabled = False
+        return False
+    try:
+        with engine.begin() as conn:
+            existing = {name for (name,) in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"))}
+            for fts_table, content_table, columns in FTS_TABLES.values():
+                for statement in _fts_ddl(fts_table, content_table, columns):
+                    conn.execute(text(statement))
+                if fts_table not in existing:
+                    conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+                    logger.info(f'已建立全文索引 {fts_table}')
+    except OperationalError as e:
+        logger.warning(f'SQLite 不支持 FTS5 trigram，搜索回退为 LIKE 查询: {e}')
+        _fts_enabled = False
+        return False
+    _fts_enabled = True
+    return True
+
+
+def rebuild(engine):
+    """根据内容表重建全文索引"""
+    with engine.begin() as conn:
+        for fts_table, _, _ in FTS_TABLES.values():
+            conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+
+@contextlib.contextmanager
+def bulk_insert(session):
+    """
+    批量插入团队和成员时在块结束后统一建立全文索引（不提交，由调用方提交事务）
+
+    逐行触发器写入 FTS5 比插入完成后执行一次 INSERT ... SELECT 慢数倍。块内暂时删除插入触发器，
+    块结束时为 id 大于插入前最大值的行建立索引并恢复触发器。事务以 BEGIN IMMEDIATE 开始并持有写锁，
+    SQLite 的 DDL 是事务性的：其它连接看不到触发器被删除，期间也无法写入；事务回滚时触发器随之恢复
+    """
+    if not fts_enabled(session):
+        yield
+        return
+    connection = session.connection()
+    # pysqlite 只在 INSERT 等语句前隐式开始事务，DROP TRIGGER 会在事务外直接生效
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    start_ids = []
+    for fts_table, content_table, _ in FTS_TABLES.values():
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {fts_table}_ai'))
+        start_ids.append(connection.scalar(text(f'SELECT COALESCE(MAX(id), 0) FROM {content_table}')))
+    yield
+    for (fts_table, content_table, columns), start_id in zip(FTS_TABLES.values(), start_ids):
+        cols = ', '.join(columns)
+        connection.execute(text(f'INSERT INTO {fts_table}(rowid, {cols}) '
+                                f'SELECT id, {cols} FROM {content_table} WHERE id > :start_id'),
+                           {'start_id': start_id})
+        connection.execute(text(_fts_ddl(fts_table, content_table, columns)[1]))
+
+
+def fts_enabled(session):
+    global _fts_enabled
+    if _fts_enabled is None:
+        bind = session.get_bind()
+        if bind.dialect.name != 'sqlite':
+            _fts_enabled = False
+        else:
+            found = set(session.scalars(text("SELECT name FROM sqlite_master WHERE type = 'table'")))
+            _fts_enabled = all(fts_table in found for fts_table, _, _ in FTS_TABLES.values())
+    return _fts_enabled
+
+
+def split_terms(q):
+    return [term for term in (q or '').split() if term]
+
+
+def fts_query(terms):
+    """
+    将检索词转换为 FTS5 查询表达式：每个词作为短语（转义双引号），多个词之间为 AND；
+    任一检索词过短无法使用 trigram 时返回 None
+    """
+    if not terms or any(len(term) < MIN_FTS_TERM_LENGTH for term in terms):
+        return None
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _fts_match(model, expr):
+    fts_table = FTS_TABLES[model][0]
+    return (db.select(db.literal_column('rowid'))
+            .select_from(db.table(fts_table))
+            .where(db.literal_column(fts_table).op('MATCH')(expr)))
+
+
+def _like_condition(model, terms):
+    # 每个检索词至少命中一个字段，多个检索词之间为 AND
+    columns = [getattr(model, name) for name in FTS_TABLES[model][2]]
+    conditions = []
+    for term in terms:
+        pattern = '%{}%'.format(term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        conditions.append(db.or_(*(column.ilike(pattern, escape='\\') for column in columns)))
+    return db.and_(*conditions)
+
+
+def match_condition(session, model, q):
+    """
+    管理后台列表使用的过滤条件：model.id 命中全文索引
+
+    Returns:
+        条件表达式；无法使用全文索引时返回 None，由调用方回退为原有的 LIKE 搜索
+    """
+    expr = fts_query(split_terms(q))
+    if expr is None or not fts_enabled(session):
+        return None
+    return model.id.in_(_fts_match(model, expr))
+
+
+def search_teams(session, q, limit=20, offset=0):
+    """
+    检索团队（团队字段或任一成员字段命中）
+
+    使用全文索引时按 bm25 相关度排序，否则按创建时间倒序
+
+    Returns:
+        tuple: (结果列表, 下一页 offset 或None)
+    """
+    terms = split_terms(q)
+    expr = fts_query(terms)
+    if expr is not None and fts_enabled(session):
+        hits = text(
+            'SELECT team_id, MIN(score) AS score FROM ('
+            ' SELECT rowid AS team_id, bm25(teams_fts) AS score FROM teams_fts WHERE teams_fts MATCH :q'
+            ' UNION ALL'
+            ' SELECT m.team_id, bm25(team_members_fts) FROM team_members_fts'
+            ' JOIN team_members m ON m.id = team_members_fts.rowid WHERE team_members_fts MATCH :q'
+            ') GROUP BY team_id ORDER BY score, team_id DESC LIMIT :limit OFFSET :offset')
+        rows = session.execute(hits, {'q': expr, 'limit': limit + 1, 'offset': offset}).all()
+        member_condition = TeamMember.id.in_(_fts_match(TeamMember, expr))
+    else:
+        member_condition = _like_condition(TeamMember, terms)
+        query = (db.select(Team.id, db.null())
+                 .where(db.or_(_like_condition(Team, terms),
+                               Team.id.in_(db.select(TeamMember.team_id).where(member_condition))))
+                 .order_by(Team.createdAt.desc(), Team.id.desc())
+                 .limit(limit + 1).offset(offset))
+        rows = session.execute(query).all()
+
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+    team_ids = [team_id for team_id, _ in rows]
+    if not team_ids:
+        return [], next_offset
+
+    teams = {team.id: team for team in session.execute(
+        db.select(Team.id, Team.team_name, Team.competition_track, Team.project_name, Team.createdAt)
+        .where(Team.id.in_(team_ids)))}
+    matched = {}
+    for member in session.execute(
+            db.select(TeamMember.id, TeamMember.team_id, TeamMember.name, TeamMember.school)
+            .where(TeamMember.team_id.in_(team_ids), member_condition)
+            .order_by(TeamMember.id)):
+        matched.setdefault(member.team_id, []).append(
+            {'id': member.id, 'name': member.name, 'school': member.school})
+
+    results = []
+    for team_id, score in rows:
+        team = teams.get(team_id)
+        if team is None:
+            continue
+        results.append({
+            'id': team.id,
+            'team_name': team.team_name,
+            'competition_track': team.competition_track,
+            'project_name': team.project_name,
+            'createdAt': format_datetime(team.createdAt),
+            'score': round(-score, 4) if score is not None else None,
+            'matched_members': matched.get(team_id, []),
+        })
+    return results, next_offset
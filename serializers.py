@@ -0,0 +1,150 @@
+"""
+团队与成员的序列化及 JSON 编码
+- 序列化函数按列顺序预先生成，直接从实例的 __dict__ 读取已加载的列，
+  不再逐个属性经过 SQLAlchemy 的属性描述符
+- 时间格式化结果按值缓存（新提交的团队 createdAt 与 updatedAt 相同，导出时同一团队的时间重复出现）
+- JSON 编码和解析优先使用 orjson（未安装时使用标准库 json），通过 Flask 的 JSON provider 对 jsonify 生效
+
+性能对比见 benchmarks/bench_serialize.py
+"""
+
+import functools
+import operator
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 团队列表可返回的字段；project_intro 等长文本字段可通过 fields= 参数省略
+TEAM_FIELDS = ('id', 'createdAt', 'updatedAt', 'team_name', 'competition_track',
+               'project_name', 'repo_url', 'costrict_uid', 'project_intro',
+               'tech_solution', 'goals_and_outlook', 'members')
+# 值为 None 时输出空字符串的团队字段
+TEAM_OPTIONAL_FIELDS = ('repo_url', 'project_intro', 'tech_solution', 'goals_and_outlook')
+TEAM_DATETIME_FIELDS = ('createdAt', 'updatedAt')
+
+MEMBER_FIELDS = ('id', 'name', 'member_type', 'school', 'department', 'major_grade',
+                 'phone', 'email', 'student_id', 'role', 'tech_stack', 'desc')
+MEMBER_OPTIONAL_FIELDS = ('student_id', 'tech_stack', 'desc')
+
+
+@functools.lru_cache(maxsize=8192)
+def _format_datetime(value, tzinfo):
+    # tzinfo 参与缓存键：同一时刻在不同时区下相等，但输出的本地时间不同；
+    # isoformat 比 strftime('%Y-%m-%d %H:%M:%S') 快，输出相同（截掉时区偏移）
+    return value.isoformat(' ', 'seconds')[:19]
+
+
+def format_datetime(value):
+    """将时间格式化为 'YYYY-MM-DD HH:MM:SS'（本地时间，不含时区），None 返回空字符串"""
+    return _format_datetime(value, value.tzinfo) if value else ''
+
+
+def _getter(getter, fields):
+    """operator.itemgetter / attrgetter 只有一个字段时返回单个值，这里统一返回元组"""
+    if len(fields) == 1:
+        get = getter(fields[0])
+        return lambda obj: (get(obj),)
+    return getter(*fields)
+
+
+class RowSerializer:
+    """
+    将模型实例按 fields 顺序序列化为字典（关联字段排在列之后）
+
+    Args:
+        fields (tuple): 输出的字段名（与模型属性名相同）
+        optional (tuple): 值为 None 时输出空字符串的字段
+        datetimes (tuple): 按 format_datetime 格式化的字段
+        relations (dict): {字段名: 序列化函数}，字段值为关联对象列表
+    """
+
+    __slots__ = ('fields', '_columns', '_from_dict', '_from_attrs', '_optional', '_datetimes', '_relations')
+
+    def __init__(self, fields, optional=(), datetimes=(), relations=None):
+        relations = relations or {}
+        self.fields = tuple(fields)
+        self._columns = tuple(field for field in self.fields if field not in relations)
+        self._from_dict = _getter(operator.itemgetter, self._columns)
+        self._from_attrs = _getter(operator.attrgetter, self._columns)
+        self._optional = tuple(field for field in optional if field in self._columns)
+        self._datetimes = tuple(field for field in datetimes if field in self._columns)
+        self._relations = tuple((field, relations[field]) for field in self.fields if field in relations)
+
+    def __call__(self, obj):
+        try:
+            values = self._from_dict(obj.__dict__)
+        except KeyError:
+            # 有未加载（或提交后已过期）的列，通过属性访问触发加载
+            values = self._from_attrs(obj)
+        data = dict(zip(self._columns, values))
+        for field in self._optional:
+            if data[field] is None:
+                data[field] = ''
+        for field in self._datetimes:
+            data[field] = format_datetime(data[field])
+        for field, serialize in self._relations:
+            data[field] = [serialize(item) for item in getattr(obj, field)]
+        return data
+
+
+member_to_dict = RowSerializer(MEMBER_FIELDS, optional=MEMBER_OPTIONAL_FIELDS)
+
+
+@functools.lru_cache(maxsize=64)
+def team_serializer(fields=TEAM_FIELDS):
+    """返回 fields 对应的团队序列化函数（按字段组合缓存）"""
+    return RowSerializer(fields, optional=TEAM_OPTIONAL_FIELDS, datetimes=TEAM_DATETIME_FIELDS,
+                         relations={'members': member_to_dict})
+
+
+def team_to_dict(team, fields=TEAM_FIELDS):
+    """按 fields 指定的字段（保持 TEAM_FIELDS 顺序）将团队序列化为字典"""
+    return team_serializer(tuple(fields))(team)
+
+
+# ===== JSON 编码 =====
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+_COMPACT_SEPARATORS = (',', ':')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask 的 JSON provider：安装了 orjson 时用它编码和解析，否则使用标准库 json
+
+    两种方式的输出一致：紧凑格式（标准库 json 未指定 separators 和 indent 时同样使用 (',', ':')），
+    键保持插入顺序（序列化函数已按列顺序生成字典），中文不转义；
+    datetime 等 orjson 不按 Flask 方式处理的类型仍交给 DefaultJSONProvider.default。
+    调试模式的缩进输出及带其它参数的 dumps() 调用使用标准库 json
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+    use_orjson = orjson is not None
+
+    def _orjson_dumps(self, obj):
+        return orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS)
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and kwargs.keys() <= {'separators'} \
+                and kwargs.get('separators', _COMPACT_SEPARATORS) == _COMPACT_SEPARATORS:
+            return self._orjson_dumps(obj).decode('utf-8')
+        if 'indent' not in kwargs:
+            kwargs.setdefault('separators', _COMPACT_SEPARATORS)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        # 直接使用 orjson 输出的字节，省去解码再编码
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj) + b'\n', mimetype=self.mimetype)
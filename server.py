@@ -1,393 +1,961 @@
 # 简单的 Python 后端服务器（使用 Flask）
 # 安装依赖：pip install flask flask-cors flask-admin
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import base64
+import click
+import hmac
 import json
+import logging
 import os
+import sqlite3
 from datetime import datetime
 import pytz
-import re
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, selectinload
+
+import serializers
+from serializers import TEAM_FIELDS, team_to_dict
 
 app = Flask(__name__, static_folder='web')
+# jsonify 使用 orjson 编码（未安装时使用标准库 json，见 serializers.py）
+app.json = serializers.JSONProvider(app)
 CORS(app)
 
+# 日志：队列 + 后台线程输出 JSON 行，个人信息脱敏（见 logging_config.py）
+from logging_config import configure_from_env
+configure_from_env(app)
+logger = logging.getLogger('costrict')
+audit_logger = logging.getLogger('costrict.submit')
+
 # 数据存储配置（ORM）
 DATA_FILE = 'users.json'  # 仅用于历史回退；默认不再使用
 DB_URL = os.getenv('DATABASE_URL', 'sqlite:///users.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = DB_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 连接池等引擎参数（见 database.py，可通过 DB_POOL_* 环境变量调整）
+from database import REPLICA_BIND_KEY, engine_options, replica_binds, setup_engine, using_replica
+import backup
+import intake
+import jobs
+import mailer
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DB_URL)
+# 只读副本（可选）：团队查询和管理后台列表使用副本，写入和配置读取始终使用主库
+app.config['SQLALCHEMY_BINDS'] = replica_binds(os.getenv('DATABASE_REPLICA_URL'))
 # Flask-Admin 配置
 app.config['SECRET_KEY'] = 'my-secret-key'  # 用于session和CSRF保护
 
 # 导入数据模型和数据库实例
 from models import db, Team, TeamMember, Config
+from validators import DUPLICATE_TEAM_MESSAGE, validate_submission, format_errors
+from http_cache import make_etag, to_http_datetime, conditional_response
+import stats
+import search
+import importer
+import migrations
+import assets
 db.init_app(app)
 # 导入并设置Flask-Admin
-from admin import setup_admin
+from admin import AuthMixin, setup_admin
 # 设置Flask-Admin，但使用不同的URL前缀避免冲突
 admin_instance = setup_admin(app)
 
+# 各读取接口的 Cache-Control（团队数据含个人信息，仅允许私有缓存并每次校验）
+app.config['CACHE_CONTROL_TEAMS'] = os.getenv('CACHE_CONTROL_TEAMS', 'private, no-cache')
+app.config['CACHE_CONTROL_TEAM'] = os.getenv('CACHE_CONTROL_TEAM', 'private, no-cache')
+app.config['CACHE_CONTROL_CONFIG'] = os.getenv('CACHE_CONTROL_CONFIG', 'public, max-age=60')
+# 静态资源构建输出目录（python assets.py），不存在时直接发送 web/ 下的原文件
+app.config['STATIC_DIST_DIR'] = os.getenv('STATIC_DIST_DIR', assets.DIST_DIR)
+# 渲染首页时注入到 window.__PUBLIC_CONFIG__ 的配置键（逗号分隔），前端无需再请求 /api/config
+app.config['PUBLIC_CONFIG_KEYS'] = [key.strip() for key in os.getenv('PUBLIC_CONFIG_KEYS', 'DEADLINE').split(',')
+                                    if key.strip()]
+
+os.makedirs(app.instance_path, exist_ok=True)
+
+# 请求耗时与 SQL 指标，多个 worker 的快照写入同一目录，由 /metrics 合并输出
+import metrics
+metrics_exporter = metrics.init_app(
+    app, lambda: db.engine,
+    directory=os.getenv('METRICS_DIR', os.path.join(app.instance_path, 'metrics')),
+    flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+)
+
+# 配置缓存：TTL、容量、跨 worker 失效信号文件（默认位于 instance 目录）
+from config_cache import config_cache
+config_cache.configure(
+    ttl=float(os.getenv('CONFIG_CACHE_TTL', '60')),
+    maxsize=int(os.getenv('CONFIG_CACHE_MAXSIZE', '128')),
+    check_interval=float(os.getenv('CONFIG_CACHE_CHECK_INTERVAL', '1')),
+    signal_path=os.getenv('CONFIG_CACHE_SIGNAL_FILE',
+                          os.path.join(app.instance_path, 'config.version'))
+)
+
+# 提交接口准入控制：请求体大小、按客户端 IP 限流（多 worker 共享 SQLite 文件）、每个 worker 的并发上限
+import ratelimit
+_submit_rate = float(os.getenv('SUBMIT_RATE_PER_MINUTE', '10'))
+_submit_concurrency = int(os.getenv('SUBMIT_MAX_CONCURRENCY', '4'))
+submit_admission = ratelimit.AdmissionControl(
+    bucket=ratelimit.TokenBucket(
+        os.getenv('RATE_LIMIT_DB_PATH', os.path.join(app.instance_path, 'ratelimit.db')),
+        rate=_submit_rate / 60,
+        burst=int(os.getenv('SUBMIT_RATE_BURST', '5'))) if _submit_rate > 0 else None,
+    concurrency=ratelimit.ConcurrencyLimit(_submit_concurrency) if _submit_concurrency > 0 else None,
+    max_body=int(os.getenv('SUBMIT_MAX_BODY_BYTES', str(256 * 1024))),
+    trusted_proxies=ratelimit.parse_networks(os.getenv('TRUSTED_PROXIES', ratelimit.LOOPBACK_NETWORKS))
+)
+
+# 提交接口幂等键：携带 Idempotency-Key 的重复提交返回首次的响应（见 idempotency.py）
+import idempotency
+submit_idempotency = idempotency.IdempotencyStore(
+    ttl=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600))))
+
 def init_db():
     """改进的数据库初始化"""
     try:
         # 测试数据库连接
         with app.app_context():
+            # SQLite 连接参数：WAL、busy_timeout 等
+            setup_engine(db.engine)
+            if REPLICA_BIND_KEY in db.engines:
+                setup_engine(db.engines[REPLICA_BIND_KEY])
             with db.engine.connect() as connection:
                 connection.execute(text('SELECT 1'))
-            # 创建表
+            # 创建表，并为已有的表补建索引等（见 migrations.py）
             db.create_all()
-            print("数据库初始化成功")
+            migrations.migrate(db.engine)
+            # 全文索引（SQLite FTS5）及同步触发器
+            search.setup(db.engine)
+            # 升级后首次启动时根据已有数据生成统计
+            stats.ensure_initialized(db.session)
+            logger.info('数据库初始化成功')
             return True
     except Exception as e:
-        print(f'数据库初始化失败: {e}')
+        logger.exception(f'数据库初始化失败: {e}')
         return False
 
+# 分页参数：默认每页条数与单页上限
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@using_replica(db.session)
 def read_teams():
-    """读取所有团队信息（ORM）"""
+    """读取所有团队信息（ORM）
+
+    成员通过 selectinload 一次性批量加载（teams + team_members 共 2 条查询），
+    避免逐个访问 team.members 触发的 N+1 查询。
+    """
     try:
-        teams = Team.query.order_by(Team.createdAt.desc()).all()
-        result = []
-        for team in teams:
-            team_data = {
-                'id': team.id,
-                'createdAt': (team.createdAt.strftime('%Y-%m-%d %H:%M:%S') if team.createdAt else ''),
-                'updatedAt': (team.updatedAt.strftime('%Y-%m-%d %H:%M:%S') if team.updatedAt else ''),
-                'team_name': team.team_name,
-                'competition_track': team.competition_track,
-                'project_name': team.project_name,
-                'repo_url': team.repo_url or '',
-                'costrict_uid': team.costrict_uid,
-                'project_intro': team.project_intro or '',
-                'tech_solution': team.tech_solution or '',
-                'goals_and_outlook': team.goals_and_outlook or '',
-                'members': []
-            }
-            
-            # 添加团队成员信息
-            for member in team.members:
-                team_data['members'].append({
-                    'id': member.id,
-                    'name': member.name,
-                    'member_type': member.member_type,
-                    'school': member.school,
-                    'department': member.department,
-                    'major_grade': member.major_grade,
-                    'phone': member.phone,
-                    'email': member.email,
-                    'student_id': member.student_id or '',
-                    'role': member.role,
-                    'tech_stack': member.tech_stack or '',
-                    'desc': member.desc or ''
-                })
-            
-            result.append(team_data)
-        return result
+        teams = (Team.query
+                 .options(selectinload(Team.members))
+                 .order_by(Team.createdAt.desc())
+                 .all())
+        return [team_to_dict(team) for team in teams]
     except Exception as e:
-        print(f'读取团队数据失败: {e}')
+        logger.exception(f'读取团队数据失败: {e}')
         return []
 
-def save_team(team_data, members_data):
-    """保存团队和成员数据"""
+
+def encode_cursor(team):
+    """将 (createdAt, id) 编码为不透明的分页游标"""
+    raw = json.dumps([team.createdAt.isoformat(), team.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析分页游标，格式不正确时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, team_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(team_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+
+def teams_statement(limit=DEFAULT_PAGE_SIZE, cursor=None, competition_track=None,
+                    school=None, name_prefix=None, fields=TEAM_FIELDS):
+    """
+    团队列表的查询语句（取 limit + 1 条以判断是否还有下一页），同步和异步接口共用
+
+    Raises:
+        ValueError: 分页游标格式不正确
+    """
+    query = db.select(Team)
+    if competition_track:
+        query = query.where(Team.competition_track == competition_track)
+    if school:
+        query = query.where(Team.id.in_(
+            db.select(TeamMember.team_id).where(TeamMember.school == school)))
+    if name_prefix:
+        # 范围条件可以命中 team_name 上的唯一索引，LIKE 保证前缀语义
+        query = query.where(Team.team_name >= name_prefix,
+                            Team.team_name < name_prefix + '\U0010ffff',
+                            Team.team_name.startswith(name_prefix, autoescape=True))
+    if cursor:
+        created_at, team_id = decode_cursor(cursor)
+        query = query.where(db.or_(
+            Team.createdAt < created_at,
+            db.and_(Team.createdAt == created_at, Team.id < team_id)))
+
+    # 只加载需要的列；分页游标依赖 createdAt 和 id，始终加载
+    columns = [getattr(Team, field) for field in fields if field != 'members']
+    columns += [Team.id, Team.createdAt]
+    query = query.options(load_only(*columns))
+    if 'members' in fields:
+        query = query.options(selectinload(Team.members))
+    return query.order_by(Team.createdAt.desc(), Team.id.desc()).limit(limit + 1)
+
+
+def page_teams(teams, limit, fields=TEAM_FIELDS):
+    """将 teams_statement 的查询结果转换为 (团队字典列表, 下一页游标或None)"""
+    next_cursor = encode_cursor(teams[limit - 1]) if len(teams) > limit else None
+    return [team_to_dict(team, fields) for team in teams[:limit]], next_cursor
+
+
+def query_teams(limit=DEFAULT_PAGE_SIZE, cursor=None, competition_track=None,
+                school=None, name_prefix=None, fields=TEAM_FIELDS):
+    """
+    按 (createdAt, id) 倒序进行游标分页查询团队
+
+    Args:
+        limit (int): 每页条数
+        cursor (str): 上一页返回的 next_cursor，为空时从第一页开始
+        competition_track (str): 按参赛赛道过滤
+        school (str): 只返回有成员来自该学校/单位的团队
+        name_prefix (str): 按团队名称前缀过滤
+        fields (tuple): 需要返回的字段
+
+    Returns:
+        tuple: (团队字典列表, 下一页游标或None)
+    """
+    query = teams_statement(limit, cursor, competition_track, school, name_prefix, fields)
+    return page_teams(db.session.scalars(query).all(), limit, fields)
+
+
+def teams_fingerprint_statement():
+    """
+    团队集合的数据指纹：(max(teams.updatedAt), count(teams), max(team_members.updatedAt), count(team_members))
+    新增、修改、删除团队或成员都会改变指纹
+    """
+    return db.select(
+        db.select(db.func.max(Team.updatedAt)).scalar_subquery(),
+        db.select(db.func.count(Team.id)).scalar_subquery(),
+        db.select(db.func.max(TeamMember.updatedAt)).scalar_subquery(),
+        db.select(db.func.count(TeamMember.id)).scalar_subquery(),
+    )
+
+
+def teams_fingerprint():
+    return db.session.execute(teams_fingerprint_statement()).one()
+
+
+def team_fingerprint_statement(team_id):
+    """单个团队的数据指纹：(teams.updatedAt, 成员 max(updatedAt), 成员数量)"""
+    member_updated = (db.select(db.func.max(TeamMember.updatedAt))
+                      .where(TeamMember.team_id == Team.id)
+                      .scalar_subquery())
+    member_count = (db.select(db.func.count(TeamMember.id))
+                    .where(TeamMember.team_id == Team.id)
+                    .scalar_subquery())
+    return db.select(Team.updatedAt, member_updated, member_count).where(Team.id == team_id)
+
+
+def team_fingerprint(team_id):
+    """
+    Returns:
+        Row: 单个团队的数据指纹（见 team_fingerprint_statement），团队不存在时返回None
+    """
+    return db.session.execute(team_fingerprint_statement(team_id)).first()
+
+
+def teams_etag(fingerprint, query_string):
+    """团队列表的 (ETag, Last-Modified)；查询参数不同，结果不同，ETag 需包含完整的查询字符串"""
+    etag = make_etag('teams', tuple(fingerprint), query_string)
+    last_modified = to_http_datetime(max((dt for dt in (fingerprint[0], fingerprint[2]) if dt),
+                                         default=None))
+    return etag, last_modified
+
+
+def team_etag(team_id, fingerprint):
+    """团队详情的 (ETag, Last-Modified)"""
+    etag = make_etag('team', team_id, tuple(fingerprint))
+    last_modified = to_http_datetime(max((dt for dt in (fingerprint[0], fingerprint[1]) if dt),
+                                         default=None))
+    return etag, last_modified
+
+
+def _team_row(team_data, now_dt):
+    return {
+        'team_name': team_data.get('team_name', ''),
+        'competition_track': team_data.get('competition_track', ''),
+        'project_name': team_data.get('project_name', ''),
+        'repo_url': team_data.get('repo_url', ''),
+        'costrict_uid': team_data.get('costrict_uid', ''),
+        'project_intro': team_data.get('project_intro', ''),
+        'tech_solution': team_data.get('tech_solution', ''),
+        'goals_and_outlook': team_data.get('goals_and_outlook', ''),
+        'createdAt': now_dt,
+        'updatedAt': now_dt
+    }
+
+
+def _member_rows(team_id, team_name, members_data, now_dt):
+    return [{
+        'team_id': team_id,
+        'team_name': team_name,
+        'name': member_data.get('name', ''),
+        'member_type': member_data.get('member_type', '队员'),
+        'school': member_data.get('school', ''),
+        'department': member_data.get('department', ''),
+        'major_grade': member_data.get('major_grade', ''),
+        'phone': member_data.get('phone', ''),
+        'email': member_data.get('email', ''),
+        'student_id': member_data.get('student_id', ''),
+        'role': member_data.get('role', ''),
+        'tech_stack': member_data.get('tech_stack', ''),
+        'desc': member_data.get('desc', ''),
+        'createdAt': now_dt,
+        'updatedAt': now_dt
+    } for member_data in members_data]
+
+
+def insert_team(session, team_data, members_data):
+    """
+    在 session 的当前事务中插入团队和成员并更新统计计数（不提交），返回团队 ID
+
+    同步接口传入 db.session；asgi.py 的异步接口通过 AsyncSession.run_sync 调用
+    """
     # 使用上海时间
+    now_dt = datetime.now(pytz.timezone('Asia/Shanghai'))
+
+    # 创建新团队
+    team_row = _team_row(team_data, now_dt)
+    result = session.execute(db.insert(Team).values(**team_row))
+    team_id = result.inserted_primary_key[0]
+
+    # 批量添加团队成员
+    member_rows = _member_rows(team_id, team_data.get('team_name', ''), members_data, now_dt)
+    if member_rows:
+        session.execute(db.insert(TeamMember), member_rows)
+
+    # 在同一事务中更新统计计数
+    stats.apply(session, stats.submission_deltas(team_row, member_rows))
+    return team_id
+
+
+def team_name_taken(session, team_name):
+    return session.execute(db.select(Team.id).where(Team.team_name == team_name).limit(1)).first() is not None
+
+
+def save_team(team_data, members_data):
+    """
+    保存团队和成员数据
+
+    直接插入团队记录，由 team_name 的唯一约束判断名称是否重复（无需预先查询，
+    也不存在多个 worker 之间的竞争）；成员通过一次 executemany 批量插入
+
+    名称重复等违反约束的提交返回 (False, 错误信息)；数据库繁忙、连接断开等其它错误回滚后向上抛出，
+    由调用方按服务器错误（5xx）处理，客户端可以用同一个 Idempotency-Key 重试
+    """
+    return save_team_in(db.session, team_data, members_data)
+
+
+def save_team_in(session, team_data, members_data):
+    """在指定的同步 Session 中执行 save_team（asgi.py 通过 AsyncSession.run_sync 调用）"""
+    team_name = team_data.get('team_name', '')
+
+    try:
+        team_id = insert_team(session, team_data, members_data)
+        session.commit()
+        return True, team_id
+    except IntegrityError as e:
+        session.rollback()
+        # 仅在插入失败时确认是否为团队名称重复
+        if team_name_taken(session, team_name):
+            return False, DUPLICATE_TEAM_MESSAGE
+        logger.warning(f'保存团队数据失败: {e}', extra={'team_name': team_name})
+        return False, '保存团队数据失败，请检查填写内容'
+    except Exception:
+        session.rollback()
+        raise
+
+
+def save_teams_batch(submissions):
+    """
+    在一个事务中批量保存多个团队，语义与逐个调用 save_team 相同
+    （包括团队名称重复的拒绝；同一批次内重名时先提交者优先）
+
+    Args:
+        submissions (list): [(team_data, members_data), ...]
+
+    Returns:
+        list: 与输入顺序一致的 [(success, team_id 或错误信息), ...]
+
+    Raises:
+        Exception: 约束之外的数据库错误（如 database is locked）回滚后抛出，由调用方稍后重试整批
+    """
+    results = [None] * len(submissions)
+    names = [team_data.get('team_name', '') for team_data, _ in submissions]
+    taken = {name for (name,) in db.session.query(Team.team_name).filter(Team.team_name.in_(set(names)))}
+    pending = []
+    for i, name in enumerate(names):
+        if name in taken:
+            results[i] = (False, DUPLICATE_TEAM_MESSAGE)
+        else:
+            taken.add(name)
+            pending.append(i)
+
     shanghai_tz = pytz.timezone('Asia/Shanghai')
     now_dt = datetime.now(shanghai_tz)
-    
     try:
-        # 检查团队名称是否已存在（通过team_name查找）
-        existing_team = Team.query.filter_by(team_name=team_data.get('team_name', '')).first()
-        
-        if existing_team:
-            # 团队名已存在，返回错误
-            return False, "团队名称已存在，请使用其他名称"
-        
-        # 创建新团队
-        new_team = Team(
-            team_name=team_data.get('team_name', ''),
-            competition_track=team_data.get('competition_track', ''),
-            project_name=team_data.get('project_name', ''),
-            repo_url=team_data.get('repo_url', ''),
-            costrict_uid=team_data.get('costrict_uid', ''),
-            project_intro=team_data.get('project_intro', ''),
-            tech_solution=team_data.get('tech_solution', ''),
-            goals_and_outlook=team_data.get('goals_and_outlook', ''),
-            createdAt=now_dt,
-            updatedAt=now_dt
-        )
-        db.session.add(new_team)
-        db.session.flush()  # 获取新团队ID
-        
-        # 添加团队成员
-        for member_data in members_data:
-            member = TeamMember(
-                team_id=new_team.id,
-                team_name=team_data.get('team_name', ''),
-                name=member_data.get('name', ''),
-                member_type=member_data.get('member_type', '队员'),
-                school=member_data.get('school', ''),
-                department=member_data.get('department', ''),
-                major_grade=member_data.get('major_grade', ''),
-                phone=member_data.get('phone', ''),
-                email=member_data.get('email', ''),
-                student_id=member_data.get('student_id', ''),
-                role=member_data.get('role', ''),
-                tech_stack=member_data.get('tech_stack', ''),
-                desc=member_data.get('desc', ''),
-                createdAt=now_dt,
-                updatedAt=now_dt
-            )
-            db.session.add(member)
-        
+        member_rows = []
+        deltas = []
+        for i in pending:
+            team_data, members_data = submissions[i]
+            team_row = _team_row(team_data, now_dt)
+            result = db.session.execute(db.insert(Team).values(**team_row))
+            team_id = result.inserted_primary_key[0]
+            rows = _member_rows(team_id, names[i], members_data, now_dt)
+            member_rows.extend(rows)
+            deltas.extend(stats.submission_deltas(team_row, rows))
+            results[i] = (True, team_id)
+        if member_rows:
+            db.session.execute(db.insert(TeamMember), member_rows)
+        stats.apply(db.session, deltas)
         db.session.commit()
-        return True, new_team.id
-    except Exception as e:
+    except IntegrityError:
+        # 与同步提交并发写入了同名团队：回退为逐个保存，由 save_team 判断冲突
+        db.session.rollback()
+        for i in pending:
+            results[i] = save_team(*submissions[i])
+    except Exception:
         db.session.rollback()
-        print(f'保存团队数据失败: {e}')
-        return False, f'保存团队数据失败: {str(e)}'
+        raise
+    return results
+
+
+def _write_intake_batch(claimed):
+    """后台写入线程的批量保存回调，返回队列需要记录的处理结果"""
+    with app.app_context():
+        saved = save_teams_batch([(team_data, members_data)
+                                  for _, team_data, members_data, _ in claimed])
+        results = []
+        for (ticket, team_data, members_data, attempts), (success, result) in zip(claimed, saved):
+            if success:
+                results.append((ticket, intake.DONE, result, None))
+                enqueue_confirmation(result, team_data, members_data)
+                continue
+            if attempts > 1 and result == DUPLICATE_TEAM_MESSAGE:
+                # 重新领取的提交可能已在上次处理中保存成功（结果未及记录），
+                # 同名且同 CoStrict UID 的团队视为本次提交
+                team_id = db.session.query(Team.id).filter_by(
+                    team_name=team_data.get('team_name', ''),
+                    costrict_uid=team_data.get('costrict_uid', '')).scalar()
+                if team_id:
+                    results.append((ticket, intake.DONE, team_id, None))
+                    continue
+            results.append((ticket, intake.REJECTED, None, result))
+        return results
+
+
+# 异步受理模式：SUBMIT_INTAKE_MODE=queue 时提交先写入本地队列，由后台线程批量保存
+SUBMIT_INTAKE_MODE = os.getenv('SUBMIT_INTAKE_MODE', 'sync')
+intake_queue = None
+_intake_writer = None
+if SUBMIT_INTAKE_MODE == 'queue':
+    intake_queue = intake.IntakeQueue(
+        os.getenv('INTAKE_DB_PATH', os.path.join(app.instance_path, 'intake.db')),
+        synchronous=os.getenv('INTAKE_SYNCHRONOUS', 'FULL'))
+
+
+def _ensure_intake_writer():
+    """在当前进程中启动后台写入线程（gunicorn fork 之后每个 worker 各自启动）"""
+    global _intake_writer
+    if _intake_writer is None or not _intake_writer.is_alive():
+        _intake_writer = intake.BatchWriter(
+            intake_queue, _write_intake_batch,
+            batch_size=int(os.getenv('INTAKE_BATCH_SIZE', '100')),
+            linger=float(os.getenv('INTAKE_LINGER_MS', '50')) / 1000,
+            poll_interval=float(os.getenv('INTAKE_POLL_INTERVAL', '0.5')),
+            claim_timeout=float(os.getenv('INTAKE_CLAIM_TIMEOUT', '60')),
+            max_attempts=int(os.getenv('INTAKE_MAX_ATTEMPTS', '5')),
+            backoff=float(os.getenv('INTAKE_RETRY_BACKOFF', '2')))
+        _intake_writer.start()
+    return _intake_writer
+
+
+@app.before_request
+def start_intake_writer():
+    if intake_queue is not None:
+        _ensure_intake_writer()
+
+
+# 报名成功后的后台任务（确认邮件等）：写入本地任务队列，由后台线程执行（见 jobs.py、mailer.py）
+# JOBS_RUNNER=off 时 Web 进程只写入任务，由单独的进程执行：flask --app wsgi run-jobs
+JOBS_RUNNER = os.getenv('JOBS_RUNNER', 'thread')
+MAIL_FROM = os.getenv('MAIL_FROM', 'noreply@localhost')
+mail_backend = mailer.backend_from_env(app.instance_path)
+job_queue = jobs.JobQueue(
+    os.getenv('JOBS_DB_PATH', os.path.join(app.instance_path, 'jobs.db')),
+    synchronous=os.getenv('JOBS_SYNCHRONOUS', 'NORMAL'))
+_job_runner = None
+
+
+def send_confirmation_email(payload):
+    if mail_backend is None:
+        # 任务写入后关闭了邮件发送
+        return
+    mail_backend.send(mailer.confirmation_message(payload, MAIL_FROM))
+
+
+JOB_HANDLERS = {
+    mailer.CONFIRMATION_JOB: send_confirmation_email,
+}
+
+
+def create_job_runner():
+    return jobs.JobRunner(
+        job_queue, JOB_HANDLERS,
+        concurrency=int(os.getenv('JOBS_CONCURRENCY', '2')),
+        poll_interval=float(os.getenv('JOBS_POLL_INTERVAL', '1')),
+        max_attempts=int(os.getenv('JOBS_MAX_ATTEMPTS', '5')),
+        backoff=float(os.getenv('JOBS_RETRY_BACKOFF', '30')))
+
+
+def _ensure_job_runner():
+    """在当前进程中启动任务执行线程（gunicorn fork 之后每个 worker 各自启动）"""
+    global _job_runner
+    if _job_runner is None or not _job_runner.is_alive():
+        _job_runner = create_job_runner()
+        _job_runner.start()
+    return _job_runner
+
+
+@app.before_request
+def start_job_runner():
+    if JOBS_RUNNER == 'thread':
+        _ensure_job_runner()
+
+
+def enqueue_confirmation(team_id, team_data, members_data):
+    """报名保存成功（已提交）后写入确认邮件任务；写入失败只记录日志，不影响报名结果"""
+    if mail_backend is None:
+        return
+    try:
+        job_queue.enqueue_many(mailer.confirmation_jobs(team_id, team_data, members_data))
+    except sqlite3.Error as e:
+        logger.error(f'写入确认邮件任务失败: {e}', extra={'team_id': team_id})
+        return
+    if JOBS_RUNNER == 'thread':
+        _ensure_job_runner().notify()
+
+
+# 数据库在线备份（仅 SQLite 文件数据库，见 backup.py）：BACKUP_INTERVAL_MINUTES=0 时不定时备份，
+# 仍可通过管理后台或 flask backup 手动备份
+def _after_restore():
+    """恢复后执行迁移、补建全文索引，并通知各 worker 清空配置缓存"""
+    init_db()
+    config_cache.invalidate()
+
+
+backup.backups.configure(
+    backup.database_path(DB_URL, app.instance_path),
+    os.getenv('BACKUP_DIR', os.path.join(app.instance_path, 'backups')),
+    keep=int(os.getenv('BACKUP_KEEP', '48')),
+    interval=float(os.getenv('BACKUP_INTERVAL_MINUTES', '60')) * 60,
+    pages=int(os.getenv('BACKUP_PAGES_PER_STEP', '256')),
+    sleep=float(os.getenv('BACKUP_STEP_SLEEP_MS', '20')) / 1000,
+    schema_version=migrations.LATEST_VERSION,
+    on_restore=_after_restore)
+_backup_scheduler = None
+
+
+@app.before_request
+def start_backup_scheduler():
+    """在当前进程中启动定时备份线程（gunicorn fork 之后每个 worker 各自启动，由文件锁保证只有一个进程备份）"""
+    global _backup_scheduler
+    if not backup.backups.enabled or backup.backups.interval <= 0:
+        return
+    if _backup_scheduler is None or not _backup_scheduler.is_alive():
+        _backup_scheduler = backup.BackupScheduler(
+            backup.backups, check_interval=min(60.0, backup.backups.interval))
+        _backup_scheduler.start()
+
+# 注入公开配置后的首页
+index_page = assets.PageCache('index.html')
 
 @app.route('/')
 def index():
-    """返回主页面"""
-    return send_from_directory('web', 'index.html')
+    """返回主页面（注入公开配置，配置变化时才重新生成页面）"""
+    return index_page.get(get_public_config(), dist_dir=app.config['STATIC_DIST_DIR'])
 
 @app.route('/<path:path>')
 def static_files(path):
     """静态文件服务"""
-    return send_from_directory('web', path)
+    if path == 'index.html':
+        return index()
+    return assets.send_static(path, dist_dir=app.config['STATIC_DIST_DIR'])
+
+# 提交成功时的提示
+SUBMIT_SUCCESS_MESSAGE = f'您已成功报名参加"{mailer.CONTEST_NAME}"。我们已向您的邮箱发送确认邮件，请查收。'
+
+
+def deadline_message(deadline_dt):
+    """报名截止时间（上海时区的 datetime）已过时返回提示信息，否则返回None"""
+    if isinstance(deadline_dt, datetime) and datetime.now(pytz.timezone('Asia/Shanghai')) > deadline_dt:
+        return f'报名已截止，截止时间为：{deadline_dt.strftime("%Y-%m-%d %H:%M:%S")}'
+    return None
+
+def check_submission(req, deadline_dt):
+    """
+    提交接口的截止时间检查和校验（submit_team 与 asgi.py 共用）
+
+    Args:
+        req: werkzeug 请求对象（请求体已读取）
+        deadline_dt: 报名截止时间（上海时区的 datetime），未设置时为None
+
+    Returns:
+        tuple: (early, team_data, members_data)；early 不为 None 时直接返回该 (状态码, 响应数据, 响应头)
+    """
+    closed_message = deadline_message(deadline_dt)
+    if closed_message:
+        metrics.inc_submission('closed')
+        return (403, {
+            'success': False,
+            'message': closed_message
+        }, {}), None, None
+
+    data = req.get_json(silent=True) or {}
+
+    # 校验团队与成员信息（一次性返回所有错误及其字段路径）
+    team_data, members_data, errors = validate_submission(data)
+    if errors:
+        metrics.inc_submission('invalid')
+        audit_logger.info('团队提交校验失败', extra={'errors': errors})
+        return (400, {
+            'success': False,
+            'message': format_errors(errors),
+            'errors': errors
+        }, {}), None, None
+    return None, team_data, members_data
+
+
+def accept_submission(team_data, members_data):
+    """异步受理模式：写入队列并返回受理编号，返回 (状态码, 响应数据, 响应头)"""
+    ticket = intake_queue.enqueue(team_data, members_data)
+    _ensure_intake_writer().notify()
+    metrics.inc_submission('queued')
+    audit_logger.info('团队提交已受理', extra={'ticket': ticket, 'team_name': team_data['team_name']})
+    return 202, {
+        'success': True,
+        'message': '提交已受理，正在保存',
+        'ticket': ticket,
+        'status_url': f'/api/team/submit/status/{ticket}'
+    }, {}
+
+
+def submission_result(team_data, members_data, success, result):
+    """根据 save_team 的结果返回 (状态码, 响应数据, 响应头)，保存成功时写入确认邮件任务"""
+    if success:
+        metrics.inc_submission('accepted')
+        audit_logger.info('团队提交成功', extra={'team_id': result, 'team_name': team_data['team_name']})
+        enqueue_confirmation(result, team_data, members_data)
+        return 200, {
+            'success': True,
+            'message': SUBMIT_SUCCESS_MESSAGE,
+            'team_id': result
+        }, {}
+    metrics.inc_submission('duplicate' if result == DUPLICATE_TEAM_MESSAGE else 'error')
+    audit_logger.info('团队提交被拒绝', extra={'team_name': team_data['team_name'], 'reason': result})
+    return 400, {
+        'success': False,
+        'message': result
+    }, {}
+
+
+def submission_error(e):
+    """处理提交时发生意外错误，返回 500 的 (状态码, 响应数据, 响应头)"""
+    metrics.inc_submission('error')
+    logger.exception(f'处理团队提交错误: {e}')
+    return 500, {
+        'success': False,
+        'message': '服务器错误'
+    }, {}
+
+
+def json_result(result):
+    """将 (状态码, 响应数据, 响应头) 转换为视图返回值"""
+    status, data, headers = result
+    return jsonify(data), status, headers
 
 @app.route('/api/team/submit', methods=['POST'])
+@submit_admission.limit('submit')
+@submit_idempotency.idempotent('submit')
 def submit_team():
     """处理团队信息和成员提交"""
     try:
-        # 首先检查报名截止时间
-        deadline_config = get_config_by_key('DEADLINE')
-        if deadline_config and deadline_config['type'] == 'datetime':
-            # 获取当前时间（上海时区）
-            shanghai_tz = pytz.timezone('Asia/Shanghai')
-            current_time = datetime.now(shanghai_tz)
-            
-            # 解析截止时间（get_config_by_key已经对时间类型做了转换）
-            try:
-                deadline_str = deadline_config['value']
-                deadline_dt = datetime.strptime(deadline_str, '%Y-%m-%d %H:%M:%S')
-                # 设置为上海时区
-                deadline_dt = shanghai_tz.localize(deadline_dt)
-                
-                # 比较时间
-                if current_time > deadline_dt:
-                    return jsonify({
-                        'success': False,
-                        'message': f'报名已截止，截止时间为：{deadline_str}'
-                    }), 403
-            except ValueError as e:
-                print(f'解析截止时间失败: {e}')
-                # 如果解析失败，允许继续提交（避免因配置错误导致系统无法使用）
-        
-        data = request.get_json() or {}
-        print(f'收到团队提交: {data}')
+        # 首先检查报名截止时间（缓存中已是上海时区的 datetime）
+        early, team_data, members_data = check_submission(request, get_config_value('DEADLINE'))
+        if early is not None:
+            return json_result(early)
+
+        if intake_queue is not None:
+            return json_result(accept_submission(team_data, members_data))
 
-        # 验证团队信息
-        team_info = data.get('team_info', {})
-        members_info = data.get('members', [])
-        
-        # ===== 团队必填字段验证 =====
-        team_name = str(team_info.get('team_name', '')).strip()
-        competition_track = str(team_info.get('competition_track', '')).strip()
-        project_name = str(team_info.get('project_name', '')).strip()
-        costrict_uid = str(team_info.get('costrict_uid', '')).strip()
-        
-        if not all([team_name, competition_track, project_name, costrict_uid]):
-            return jsonify({
-                'success': False,
-                'message': '请填写所有团队必填字段（团队名称、参赛赛道、作品名称、CoStrict UID）'
-            }), 400
-        
-        # 验证参赛赛道
-        valid_tracks = ['技术挑战赛', '创新应用赛']
-        if competition_track not in valid_tracks:
-            return jsonify({
-                'success': False,
-                'message': '参赛赛道必须为"技术挑战赛"或"创新应用赛"'
-            }), 400
-        
-        # 验证项目简介、技术方案、目标与展望的长度（200-500字）
-        project_intro = str(team_info.get('project_intro', '')).strip()
-        tech_solution = str(team_info.get('tech_solution', '')).strip()
-        goals_and_outlook = str(team_info.get('goals_and_outlook', '')).strip()
-        
-        for field_name, field_value in [('项目简介', project_intro), ('技术方案', tech_solution), ('目标与展望', goals_and_outlook)]:
-            if field_value and (len(field_value) < 200 or len(field_value) > 500):
-                return jsonify({
-                    'success': False,
-                    'message': f'{field_name}长度必须在200-500字之间'
-                }), 400
-        
-        # ===== 验证团队成员信息 =====
-        if not members_info or len(members_info) == 0:
-            return jsonify({
-                'success': False,
-                'message': '至少需要添加一名团队成员'
-            }), 400
-        
-        # 检查队长和指导老师数量
-        captain_count = sum(1 for member in members_info if member.get('member_type') == '队长')
-        teacher_count = sum(1 for member in members_info if member.get('member_type') == '指导老师')
-        
-        # 必须有一名队长
-        if captain_count == 0:
-            return jsonify({
-                'success': False,
-                'message': '团队必须指定一名队长'
-            }), 400
-        
-        # 队长最多只能有一个
-        if captain_count > 1:
-            return jsonify({
-                'success': False,
-                'message': '一个团队只能有一名队长'
-            }), 400
-        
-        # 指导老师最多只能有一个（可选）
-        if teacher_count > 1:
-            return jsonify({
-                'success': False,
-                'message': '一个团队只能有一名指导老师'
-            }), 400
-        
-        # 验证每个成员的必填字段
-        for i, member in enumerate(members_info):
-            name = str(member.get('name', '')).strip()
-            school = str(member.get('school', '')).strip()
-            department = str(member.get('department', '')).strip()
-            major_grade = str(member.get('major_grade', '')).strip()
-            phone = str(member.get('phone', '')).strip()
-            email = str(member.get('email', '')).strip()
-            role = str(member.get('role', '')).strip()
-            
-            # if not all([name, school, department, major_grade, phone, email, role]):
-            if not all([name, school, phone, email]):
-                return jsonify({
-                    'success': False,
-                    'message': f'请填写成员{i+1}的所有必填字段（姓名、学校/单位、联系电话、电子邮箱）'
-                }), 400
-            
-            # 验证邮箱格式
-            email_regex = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-            if not re.match(email_regex, email):
-                return jsonify({
-                    'success': False,
-                    'message': f'成员{i+1}的邮箱格式不正确'
-                }), 400
-            
-            # 验证手机号格式
-            cn_phone_regex = r'^1[3-9]\d{9}$'
-            if not re.match(cn_phone_regex, phone):
-                return jsonify({
-                    'success': False,
-                    'message': f'成员{i+1}的手机号格式不正确（需为大陆11位且以1开头）'
-                }), 400
-        
         # ===== 保存团队和成员信息 =====
-        team_data = {
-            'team_name': team_name,
-            'competition_track': competition_track,
-            'project_name': project_name,
-            'repo_url': str(team_info.get('repo_url', '')).strip(),
-            'costrict_uid': costrict_uid,
-            'project_intro': project_intro,
-            'tech_solution': tech_solution,
-            'goals_and_outlook': goals_and_outlook
-        }
-        
-        success, result = save_team(team_data, members_info)
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': '您已成功报名参加"码上AI·2025深信服CoStrict校园挑战赛"。我们已向您的邮箱发送确认邮件，请查收。',
-                'team_id': result
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': result
-            }), 400
+        success, result = save_team(team_data, members_data)
+        return json_result(submission_result(team_data, members_data, success, result))
 
     except Exception as e:
-        print(f'处理团队提交错误: {e}')
+        return json_result(submission_error(e))
+
+@app.route('/api/team/submit/status/<ticket>', methods=['GET'])
+def get_submit_status(ticket):
+    """查询异步受理的提交是否已保存（status: pending/processing/done/rejected）"""
+    result = intake_queue.status(ticket) if intake_queue is not None else None
+    if not result:
         return jsonify({
             'success': False,
-            'message': '服务器错误'
-        }), 500
-
-@app.route('/api/teams', methods=['GET'])
-def get_teams():
-    """获取所有团队信息（管理接口）"""
-    teams = read_teams()
+            'message': '受理编号不存在'
+        }), 404
     return jsonify({
         'success': True,
-        'data': teams,
-        'count': len(teams)
+        'data': result
     })
 
+def parse_teams_args(args):
+    """
+    解析团队列表的 limit 和 fields 参数
+
+    Returns:
+        tuple: (limit, fields)
+
+    Raises:
+        ValueError: 参数不合法，异常信息可直接返回给客户端
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f'limit 必须为 1-{MAX_PAGE_SIZE} 之间的整数')
+
+    fields = TEAM_FIELDS
+    fields_param = args.get('fields')
+    if fields_param:
+        requested = {field.strip() for field in fields_param.split(',') if field.strip()}
+        unknown = requested - set(TEAM_FIELDS)
+        if unknown:
+            raise ValueError(f'未知的字段: {", ".join(sorted(unknown))}')
+        fields = tuple(field for field in TEAM_FIELDS if field in requested)
+    return limit, fields
+
+@app.route('/api/teams', methods=['GET'])
+@using_replica(db.session)
+def get_teams():
+    """
+    分页获取团队信息（管理接口）
+
+    查询参数：
+        limit: 每页条数（默认50，最大500）
+        cursor: 上一页返回的 next_cursor
+        competition_track / school / name_prefix: 过滤条件
+        fields: 逗号分隔的返回字段，例如 fields=id,team_name,members
+    """
+    try:
+        limit, fields = parse_teams_args(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    def build():
+        teams, next_cursor = query_teams(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            competition_track=request.args.get('competition_track'),
+            school=request.args.get('school'),
+            name_prefix=request.args.get('name_prefix'),
+            fields=fields)
+        return jsonify({
+            'success': True,
+            'data': teams,
+            'count': len(teams),
+            'next_cursor': next_cursor
+        })
+
+    try:
+        etag, last_modified = teams_etag(teams_fingerprint(), request.query_string)
+        return conditional_response(etag, last_modified, app.config['CACHE_CONTROL_TEAMS'], build)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.exception(f'查询团队列表错误: {e}')
+        return jsonify({
+            'success': False,
+            'message': '服务器错误'
+        }), 500
+
 @app.route('/api/team/<int:team_id>', methods=['GET'])
+@using_replica(db.session)
 def get_team(team_id):
-    """获取特定团队信息"""
+    """获取特定团队信息（支持 If-None-Match / If-Modified-Since 条件请求）"""
     try:
-        team = Team.query.get(team_id)
-        if not team:
+        fingerprint = team_fingerprint(team_id)
+        if not fingerprint:
             return jsonify({
                 'success': False,
                 'message': '团队不存在'
             }), 404
-        
-        team_data = {
-            'id': team.id,
-            'createdAt': (team.createdAt.strftime('%Y-%m-%d %H:%M:%S') if team.createdAt else ''),
-            'updatedAt': (team.updatedAt.strftime('%Y-%m-%d %H:%M:%S') if team.updatedAt else ''),
-            'team_name': team.team_name,
-            'competition_track': team.competition_track,
-            'project_name': team.project_name,
-            'repo_url': team.repo_url or '',
-            'costrict_uid': team.costrict_uid,
-            'project_intro': team.project_intro or '',
-            'tech_solution': team.tech_solution or '',
-            'goals_and_outlook': team.goals_and_outlook or '',
-            'members': []
-        }
-        
-        # 添加团队成员信息
-        for member in team.members:
-            team_data['members'].append({
-                'id': member.id,
-                'name': member.name,
-                'member_type': member.member_type,
-                'school': member.school,
-                'department': member.department,
-                'major_grade': member.major_grade,
-                'phone': member.phone,
-                'email': member.email,
-                'student_id': member.student_id or '',
-                'role': member.role,
-                'tech_stack': member.tech_stack or '',
-                'desc': member.desc or ''
+
+        def build():
+            team = db.session.get(Team, team_id, options=[selectinload(Team.members)])
+            if not team:
+                return jsonify({
+                    'success': False,
+                    'message': '团队不存在'
+                }), 404
+            return jsonify({
+                'success': True,
+                'data': team_to_dict(team)
             })
-        
+
+        etag, last_modified = team_etag(team_id, fingerprint)
+        return conditional_response(etag, last_modified, app.config['CACHE_CONTROL_TEAM'], build)
+    except Exception as e:
+        logger.exception(f'获取团队信息错误: {e}', extra={'team_id': team_id})
+        return jsonify({
+            'success': False,
+            'message': '服务器错误'
+        }), 500
+
+# 搜索分页参数
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+@app.route('/api/search', methods=['GET'])
+def search_teams():
+    """
+    按关键词检索团队（团队名称、作品、项目介绍及成员姓名、学校、邮箱、技术栈等）
+
+    查询参数：
+        q: 检索词，多个词以空格分隔（需同时命中）
+        limit: 每页条数（默认20，最大100）
+        offset: 上一页返回的 next_offset
+    """
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({
+            'success': False,
+            'message': '请提供检索词(q)参数'
+        }), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        limit, offset = 0, -1
+    if limit < 1 or limit > MAX_SEARCH_LIMIT or offset < 0:
+        return jsonify({
+            'success': False,
+            'message': f'limit 必须为 1-{MAX_SEARCH_LIMIT} 之间的整数，offset 不能为负数'
+        }), 400
+
+    try:
+        results, next_offset = search.search_teams(db.session, q, limit=limit, offset=offset)
         return jsonify({
             'success': True,
-            'data': team_data
+            'data': results,
+            'count': len(results),
+            'next_offset': next_offset
         })
     except Exception as e:
-        print(f'获取团队信息错误: {e}')
+        logger.exception(f'检索团队错误: {e}')
         return jsonify({
             'success': False,
             'message': '服务器错误'
         }), 500
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """报名统计（只读取预先聚合的统计表）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': stats.summary(db.session)
+        })
+    except Exception as e:
+        logger.exception(f'查询统计数据错误: {e}')
+        return jsonify({
+            'success': False,
+            'message': '服务器错误'
+        }), 500
+
+def _load_config(config_key):
+    """
+    从主库查询配置的最新记录并完成类型转换
+
+    不使用只读副本：管理后台修改配置后其它 worker 的缓存随即失效，
+    从落后的副本重新加载会把旧值再缓存 CONFIG_CACHE_TTL 秒（单行查询且有缓存，主库开销可以忽略）
+
+    Returns:
+        tuple: (配置信息字典, 转换后的原生值, 更新时间)，不存在时返回None
+    """
+    return config_entry(db.session.scalars(config_statement(config_key)).first())
+
+
+def config_statement(config_key):
+    """配置键的最新记录"""
+    return db.select(Config).where(Config.config_key == config_key).order_by(Config.updatedAt.desc()).limit(1)
+
+
+def config_entry(config):
+    """
+    将配置记录转换为缓存项
+
+    Returns:
+        tuple: (配置信息字典, 转换后的原生值, 更新时间)，config 为 None 时返回None
+    """
+    if not config:
+        return None
+    config_key = config.config_key
+
+    # 根据配置类型转换值
+    value = config.config_value
+    native_value = value
+    if config.config_type == 'int':
+        try:
+            value = native_value = int(value)
+        except (ValueError, TypeError):
+            logger.warning(f'配置键 {config_key} 的值无法转换为整数，保持原字符串')
+    elif config.config_type == 'datetime':
+        try:
+            # 尝试解析日期时间字符串并转换为标准格式，原生值按上海时间处理
+            dt = datetime.fromisoformat(value) if value else None
+            if dt:
+                value = dt.strftime('%Y-%m-%d %H:%M:%S')
+                native_value = pytz.timezone('Asia/Shanghai').localize(dt.replace(tzinfo=None))
+        except (ValueError, TypeError):
+            logger.warning(f'配置键 {config_key} 的值无法转换为日期时间，保持原字符串')
+
+    info = {
+        'key': config.config_key,
+        'value': value,
+        'type': config.config_type,
+        'description': config.description
+    }
+    return info, native_value, config.updatedAt
+
+
 def get_config_by_key(config_key):
     """
     根据配置键查询配置的最新记录，并根据类型返回对应格式的值
+    结果缓存在进程内（见 config_cache），管理后台修改配置后失效
     
     Args:
         config_key (str): 配置键
@@ -396,35 +964,43 @@ def get_config_by_key(config_key):
         dict: 包含配置信息的字典，如果不存在则返回None
     """
     try:
-        config = Config.query.filter_by(config_key=config_key).order_by(Config.updatedAt.desc()).first()
-        if config:
-            # 根据配置类型转换值
-            value = config.config_value
-            if config.config_type == 'int':
-                try:
-                    value = int(value)
-                except (ValueError, TypeError):
-                    print(f'配置键 {config_key} 的值无法转换为整数，保持原字符串')
-            elif config.config_type == 'datetime':
-                try:
-                    # 尝试解析日期时间字符串并转换为标准格式
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(value) if value else None
-                    value = dt.strftime('%Y-%m-%d %H:%M:%S') if dt else value
-                except (ValueError, TypeError):
-                    print(f'配置键 {config_key} 的值无法转换为日期时间，保持原字符串')
-            
-            return {
-                'key': config.config_key,
-                'value': value,
-                'type': config.config_type,
-                'description': config.description
-            }
-        return None
+        entry = config_cache.get(config_key, _load_config)
+        return entry[0] if entry else None
     except Exception as e:
-        print(f'查询配置错误: {e}')
+        logger.exception(f'查询配置错误: {e}')
         return None
 
+
+def get_config_value(config_key, default=None):
+    """
+    返回配置的原生值：int 类型为整数，datetime 类型为上海时区的 datetime，
+    转换失败时为原字符串；配置不存在或查询出错时返回 default
+    """
+    try:
+        entry = config_cache.get(config_key, _load_config)
+        return entry[1] if entry else default
+    except Exception as e:
+        logger.exception(f'查询配置错误: {e}')
+        return default
+
+def config_etag(entry):
+    """配置的 (ETag, Last-Modified)"""
+    result, _, updated_at = entry
+    return make_etag('config', sorted(result.items()), updated_at), to_http_datetime(updated_at)
+
+
+def get_public_config():
+    """
+    PUBLIC_CONFIG_KEYS 中各配置的信息（与 /api/config 返回的 data 相同），不存在的配置不包含在内
+    读取配置缓存，命中时无需查询数据库
+    """
+    public_config = {}
+    for config_key in app.config['PUBLIC_CONFIG_KEYS']:
+        info = get_config_by_key(config_key)
+        if info:
+            public_config[config_key] = info
+    return public_config
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """根据config_key查询配置项 - 供前端使用"""
@@ -437,27 +1013,204 @@ def get_config():
             'message': '请提供配置键(key)参数'
         }), 400
     
-    # 使用封装的查询函数
-    result = get_config_by_key(config_key)
+    # 直接读取配置缓存，命中时无需查询数据库
+    try:
+        entry = config_cache.get(config_key, _load_config)
+    except Exception as e:
+        logger.exception(f'查询配置错误: {e}')
+        entry = None
     
-    if not result:
+    if not entry:
         return jsonify({
             'success': False,
             'message': '配置项不存在'
         }), 404
     
-    return jsonify({
-        'success': True,
-        'data': result
-    })
+    result, _, updated_at = entry
+    etag, last_modified = config_etag(entry)
+    return conditional_response(
+        etag, last_modified, app.config['CACHE_CONTROL_CONFIG'],
+        lambda: jsonify({
+            'success': True,
+            'data': result
+        }))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 指标（需 METRICS_TOKEN 的 Bearer 令牌或管理员账号）"""
+    token = os.getenv('METRICS_TOKEN')
+    auth = request.authorization
+    # 常数时间比较，避免按响应时间逐字节猜出令牌
+    authorized = (token and hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                                f'Bearer {token}'.encode('utf-8'))) or \
+        (auth and auth.type == 'basic' and AuthMixin().check_auth(auth.username, auth.password))
+    if not authorized:
+        return Response('请提供有效的凭据', 401, {'WWW-Authenticate': 'Basic realm="Metrics"'})
+    
+    metrics_exporter.flush(metrics.pool_gauges(db.engine), force=True)
+    counters, histograms, gauges = metrics_exporter.collect()
+    try:
+        gauges.extend(metrics.job_gauges(job_queue.depth()))
+    except sqlite3.Error as e:
+        logger.warning(f'读取任务队列深度失败: {e}')
+    gauges.extend(metrics.backup_gauges(backup.backups.list()))
+    body = metrics.render_prometheus(counters, histograms, gauges)
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """根据团队和成员表全量重建报名统计"""
+    db.create_all()
+    count = stats.rebuild(db.session)
+    click.echo(f'统计数据重建完成，共 {count} 项')
+
+@app.cli.command('migrate')
+def migrate_command():
+    """执行未执行的数据库迁移"""
+    db.create_all()
+    applied = migrations.migrate(db.engine)
+    with db.engine.connect() as connection:
+        version = migrations.current_version(connection)
+    click.echo(f'已执行迁移: {applied or "无"}，当前版本: {version}')
+
+@app.cli.command('explain-queries')
+def explain_queries_command():
+    """输出应用各读取路径所执行 SQL 的 EXPLAIN QUERY PLAN"""
+    def run():
+        team_id = db.session.scalar(db.select(Team.id).limit(1)) or 0
+        member = db.session.execute(db.select(TeamMember).limit(1)).scalar() or TeamMember()
+        teams, next_cursor = query_teams(limit=2)
+        query_teams(limit=2, cursor=next_cursor)
+        query_teams(competition_track=member.team and member.team.competition_track or '')
+        query_teams(school=member.school or '')
+        query_teams(name_prefix=(member.team_name or '')[:2])
+        teams_fingerprint()
+        team_fingerprint(team_id)
+        db.session.get(Team, team_id, options=[selectinload(Team.members)])
+        _load_config('DEADLINE')
+        db.session.query(Team.id).filter_by(team_name=member.team_name or '').first()
+        stats.summary(db.session)
+        search.search_teams(db.session, member.name or '')
+        search.search_teams(db.session, 'ab')
+        # 管理后台按团队名称、电话、邮箱过滤
+        for column in (TeamMember.team_name, TeamMember.phone, TeamMember.email):
+            db.session.execute(db.select(TeamMember).where(column == getattr(member, column.key)).limit(20)).all()
+        db.session.rollback()
+
+    for statement, plan in migrations.explain(db.engine, run):
+        click.echo(' '.join(statement.split()))
+        for line in plan:
+            click.echo(f'    {line}')
+        click.echo('')
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """根据团队和成员表重建全文索引"""
+    db.create_all()
+    if not search.setup(db.engine):
+        click.echo('当前数据库不支持全文索引，搜索使用 LIKE 查询')
+        return
+    search.rebuild(db.engine)
+    click.echo('全文索引重建完成')
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """在前台执行后台任务（Web 进程设置 JOBS_RUNNER=off 时使用）"""
+    metrics_exporter.start_flusher()
+    runner = create_job_runner()
+    runner.start()
+    click.echo(f'任务执行进程已启动（并发 {runner.concurrency}），按 Ctrl+C 退出')
+    runner.join()
+
+@app.cli.command('retry-failed-jobs')
+def retry_failed_jobs_command():
+    """将失败的后台任务重新放回队列"""
+    count = job_queue.requeue_failed()
+    click.echo(f'已重新排队 {count} 个任务')
+
+@app.cli.command('backup')
+@click.option('--scheduled', is_flag=True,
+              help='作为定时备份创建并删除超出 BACKUP_KEEP 的定时备份（由 cron 等外部调度时使用）')
+def backup_command(scheduled):
+    """在线备份数据库（服务无需停止）"""
+    try:
+        snapshot = backup.backups.snapshot(backup.SCHEDULED if scheduled else backup.MANUAL)
+    except backup.SnapshotError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'备份完成: {snapshot.path}（{snapshot.size / 1024 / 1024:.1f} MiB）')
+
+@app.cli.command('list-backups')
+def list_backups_command():
+    """列出备份目录中的备份"""
+    snapshots = backup.backups.list()
+    if not snapshots:
+        click.echo(f'没有备份（备份目录: {backup.backups.directory}）')
+    for snapshot in snapshots:
+        try:
+            info = backup.inspect(snapshot.path, check=False)
+            detail = f'结构版本 {info["version"]}，{info["teams"]} 个团队'
+        except backup.SnapshotError as e:
+            detail = str(e)
+        click.echo(f'{snapshot.name}  {snapshot.created_at:%Y-%m-%d %H:%M:%S}  '
+                   f'{snapshot.size / 1024 / 1024:.1f} MiB  {detail}')
+
+@app.cli.command('restore-backup')
+@click.argument('snapshot')
+@click.option('--yes', is_flag=True, help='不确认，直接恢复')
+def restore_backup_command(snapshot, yes):
+    """用备份替换当前数据库（SNAPSHOT 为备份目录中的文件名或备份文件路径）"""
+    try:
+        path = snapshot if os.path.isfile(snapshot) else backup.backups.get(snapshot).path
+        info = backup.inspect(path)
+    except backup.SnapshotError as e:
+        raise click.ClickException(str(e))
+    if not yes:
+        click.confirm(f'将用 {path}（结构版本 {info["version"]}，{info["teams"]} 个团队）替换当前数据库，'
+                      f'当前数据会先备份，是否继续？', abort=True)
+    try:
+        previous = backup.backups.restore(path)
+    except backup.SnapshotError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'恢复完成，恢复前的数据已备份到 {previous.path}')
+
+@app.cli.command('import-teams')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(importer.IMPORT_FORMATS),
+              help='文件格式，默认按扩展名判断')
+@click.option('--batch-size', type=int, default=importer.IMPORT_BATCH_SIZE, show_default=True,
+              help='每个事务插入的成员数上限')
+@click.option('--dry-run', is_flag=True, help='只校验，不写入')
+@click.option('--report', type=click.Path(dir_okay=False), help='将错误明细写入 CSV 文件')
+def import_teams_command(path, file_format, batch_size, dry_run, report):
+    """从 CSV / XLSX / NDJSON 文件批量导入团队和成员"""
+    file_format = file_format or importer.detect_format(path)
+    if file_format is None:
+        raise click.UsageError(f'无法根据扩展名判断文件格式，请使用 --format 指定（{", ".join(importer.IMPORT_FORMATS)}）')
+    # 与启动时相同：建表、执行迁移、建立全文索引，并确保已有数据的统计已生成（统计按增量更新）
+    if not init_db():
+        raise click.ClickException('数据库初始化失败，请查看日志')
+    with open(path, 'rb') as f:
+        try:
+            result = importer.import_file(db.session, f, file_format, batch_size=batch_size, dry_run=dry_run)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    for error in result.errors[:20]:
+        click.echo(f'第 {error["row"]} 行 {error["team_name"]} {error["field"]}: {error["message"]}')
+    if len(result.errors) > 20:
+        click.echo(f'... 另有 {len(result.errors) - 20} 条错误')
+    if report:
+        with open(report, 'w', encoding='utf-8', newline='') as f:
+            importer.write_report(result, f)
+        click.echo(f'错误明细已写入 {report}')
+    click.echo(('[试运行] ' if dry_run else '') + result.summary())
 
 if __name__ == '__main__':
-    print('服务器启动中...')
-    print('访问 http://localhost:5000 查看表单页面')
+    logger.info('服务器启动中...')
+    logger.info('访问 http://localhost:5000 查看表单页面')
     
     # 初始化数据库，失败时退出
     if not init_db():
-        print("数据库初始化失败，服务器无法启动")
+        logger.error('数据库初始化失败，服务器无法启动')
         exit(1)
     
     # 根据环境变量决定是否启用调试模式
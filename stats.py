@@ -0,0 +1,210 @@
+"""
+报名统计
+在 registration_stats 表中维护预先聚合的计数器（赛道、学校、日期、成员类型），
+保存团队及管理后台修改/删除记录时在同一事务中增量更新，读取统计时无需扫描团队和成员表
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import inspect
+
+from models import db, get_current_time, Team, TeamMember, RegistrationStat
+from serializers import format_datetime
+
+logger = logging.getLogger('costrict.stats')
+
+# 统计维度
+TOTAL = 'total'              # key: teams / members
+TRACK = 'track'              # 每个参赛赛道的团队数
+SCHOOL = 'school'            # 每个学校/单位的成员数
+DAY = 'day'                  # 每天新增的团队数
+MEMBER_TYPE = 'member_type'  # 每种成员类型的人数
+
+# 计算增量所需的字段
+TEAM_STAT_FIELDS = ('competition_track', 'createdAt')
+MEMBER_STAT_FIELDS = ('school', 'member_type')
+
+
+def _day_key(value):
+    # 管理后台新建的团队在 flush 之前还没有 createdAt，按当前时间计
+    value = value or get_current_time()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime('%Y-%m-%d')
+
+
+def team_deltas(team, sign=1):
+    """单个团队对各计数器的增量，team 为包含 TEAM_STAT_FIELDS 的字典"""
+    return [
+        (TOTAL, 'teams', sign),
+        (TRACK, team.get('competition_track') or '', sign),
+        (DAY, _day_key(team.get('createdAt')), sign),
+    ]
+
+
+def member_deltas(member, sign=1):
+    """单个成员对各计数器的增量，member 为包含 MEMBER_STAT_FIELDS 的字典"""
+    return [
+        (TOTAL, 'members', sign),
+        (SCHOOL, member.get('school') or '', sign),
+        (MEMBER_TYPE, member.get('member_type') or '', sign),
+    ]
+
+
+def submission_deltas(team_row, member_rows):
+    """一次报名（团队 + 成员）的增量"""
+    deltas = team_deltas(team_row)
+    for member_row in member_rows:
+        deltas.extend(member_deltas(member_row))
+    return deltas
+
+
+def model_deltas(model, is_created):
+    """
+    管理后台新建或修改 Team/TeamMember 时的增量
+
+    修改时根据属性历史取出修改前的值，先减去旧值再加上新值
+    （需在 flush 之前调用，即 on_model_change 中）
+    """
+    if isinstance(model, Team):
+        fields, deltas_for = TEAM_STAT_FIELDS, team_deltas
+    else:
+        fields, deltas_for = MEMBER_STAT_FIELDS, member_deltas
+    new = {field: getattr(model, field) for field in fields}
+    if is_created:
+        return deltas_for(new)
+    state = inspect(model)
+    old = {}
+    for field in fields:
+        history = state.attrs[field].history
+        old[field] = history.deleted[0] if history.deleted else new[field]
+    return deltas_for(old, -1) + deltas_for(new)
+
+
+def delete_deltas(model):
+    """删除 Team（连同其成员）或 TeamMember 时的增量"""
+    if isinstance(model, Team):
+        deltas = team_deltas({field: getattr(model, field) for field in TEAM_STAT_FIELDS}, -1)
+        for member in model.members:
+            deltas.extend(delete_deltas(member))
+        return deltas
+    return member_deltas({field: getattr(model, field) for field in MEMBER_STAT_FIELDS}, -1)
+
+
+def _upsert(session):
+    table = RegistrationStat.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted['count'],
+                                            updatedAt=stmt.inserted['updatedAt'])
+    else:
+        raise NotImplementedError(f'不支持的数据库: {dialect}')
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.dimension, table.c.key],
+        set_={'count': table.c.count + stmt.excluded['count'],
+              'updatedAt': stmt.excluded['updatedAt']})
+
+
+def apply(session, deltas):
+    """
+    将增量写入统计表（不提交，由调用方与业务数据在同一事务中提交）
+
+    Args:
+        session: 数据库会话
+        deltas (list): [(dimension, key, delta), ...]
+    """
+    totals = Counter()
+    for dimension, key, delta in deltas:
+        totals[(dimension, key)] += delta
+    now_dt = get_current_time()
+    rows = [{'dimension': dimension, 'key': key, 'count': delta, 'updatedAt': now_dt}
+            for (dimension, key), delta in totals.items() if delta]
+    if rows:
+        session.execute(_upsert(session), rows)
+
+
+def rebuild(session):
+    """根据团队和成员表全量重新计算统计数据并提交，返回写入的计数器数量"""
+    day = db.func.substr(db.cast(Team.createdAt, db.String), 1, 10)
+    queries = [
+        (TRACK, db.select(Team.competition_track, db.func.count()).group_by(Team.competition_track)),
+        (DAY, db.select(day, db.func.count()).group_by(day)),
+        (SCHOOL, db.select(TeamMember.school, db.func.count()).group_by(TeamMember.school)),
+        (MEMBER_TYPE, db.select(TeamMember.member_type, db.func.count()).group_by(TeamMember.member_type)),
+    ]
+    now_dt = get_current_time()
+    rows = [
+        {'dimension': TOTAL, 'key': 'teams', 'count': session.scalar(db.select(db.func.count(Team.id)))},
+        {'dimension': TOTAL, 'key': 'members', 'count': session.scalar(db.select(db.func.count(TeamMember.id)))},
+    ]
+    for dimension, query in queries:
+        rows.extend({'dimension': dimension, 'key': key or '', 'count': count}
+                    for key, count in session.execute(query))
+    for row in rows:
+        row['updatedAt'] = now_dt
+    try:
+        session.execute(db.delete(RegistrationStat))
+        session.execute(db.insert(RegistrationStat), rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return len(rows)
+
+
+def ensure_initialized(session):
+    """统计表为空但已有团队数据时（例如升级后首次启动）执行一次全量重建"""
+    if session.scalar(db.select(RegistrationStat.dimension).limit(1)) is not None:
+        return
+    if session.scalar(db.select(Team.id).limit(1)) is None:
+        return
+    count = rebuild(session)
+    logger.info(f'统计数据已根据现有团队重建，共 {count} 项')
+
+
+def summary(session):
+    """
+    读取统计数据（只查询统计表）
+
+    Returns:
+        dict: 团队/成员总数、按赛道/学校/日期/成员类型的计数，以及队长和指导老师的比例
+    """
+    data = {TOTAL: {}, TRACK: {}, SCHOOL: {}, DAY: {}, MEMBER_TYPE: {}}
+    updated_at = None
+    for stat in session.execute(db.select(RegistrationStat).where(RegistrationStat.count != 0)).scalars():
+        data.setdefault(stat.dimension, {})[stat.key] = stat.count
+        if updated_at is None or stat.updatedAt > updated_at:
+            updated_at = stat.updatedAt
+
+    teams = data[TOTAL].get('teams', 0)
+    members = data[TOTAL].get('members', 0)
+    captains = data[MEMBER_TYPE].get('队长', 0)
+    teachers = data[MEMBER_TYPE].get('指导老师', 0)
+
+    def ratio(numerator, denominator):
+        return round(numerator / denominator, 4) if denominator else 0
+
+    return {
+        'teams': teams,
+        'members': members,
+        'by_track': data[TRACK],
+        'by_school': dict(sorted(data[SCHOOL].items(), key=lambda item: (-item[1], item[0]))),
+        'by_day': dict(sorted(data[DAY].items())),
+        'by_member_type': data[MEMBER_TYPE],
+        'ratios': {
+            'members_per_team': ratio(members, teams),
+            'captains_per_team': ratio(captains, teams),
+            'teachers_per_team': ratio(teachers, teams),
+            'teachers_per_captain': ratio(teachers, captains),
+        },
+        'updatedAt': format_datetime(updated_at),
+    }
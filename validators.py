@@ -0,0 +1,181 @@
+"""
+团队报名数据校验
+以声明式的字段规则描述团队与成员信息，正则在导入时预编译；
+一次遍历成员列表即可完成全部检查，并收集所有错误（附带字段路径）
+供 submit_team 与管理后台表单共用
+"""
+
+import re
+
+# 预编译的格式校验正则
+EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+CN_PHONE_RE = re.compile(r'^1[3-9]\d{9}$')
+
+# 可选的参赛赛道与成员类型
+VALID_TRACKS = ('技术挑战赛', '创新应用赛')
+MEMBER_TYPES = ('队员', '队长', '指导老师')
+CAPTAIN = '队长'
+TEACHER = '指导老师'
+
+# 团队名称重复时的提示（提交接口与批量导入共用）
+DUPLICATE_TEAM_MESSAGE = '团队名称已存在，请使用其他名称'
+
+
+class FieldRule:
+    """
+    单个字段的校验规则
+
+    Args:
+        name (str): 字段名
+        label (str): 错误提示中使用的中文名称
+        required (bool): 是否必填
+        choices (tuple): 可选值，为空时不限制
+        pattern (re.Pattern): 格式正则，仅在字段非空时检查
+        pattern_message (str): 格式不正确时的提示
+        length (tuple): (最小长度, 最大长度)，仅在字段非空时检查
+        default (str): 字段为空时使用的默认值
+    """
+    __slots__ = ('name', 'label', 'required', 'choices', 'pattern',
+                 'pattern_message', 'length', 'default')
+
+    def __init__(self, name, label, required=False, choices=None, pattern=None,
+                 pattern_message=None, length=None, default=''):
+        self.name = name
+        self.label = label
+        self.required = required
+        self.choices = choices
+        self.pattern = pattern
+        self.pattern_message = pattern_message
+        self.length = length
+        self.default = default
+
+
+TEAM_RULES = (
+    FieldRule('team_name', '团队名称', required=True),
+    FieldRule('competition_track', '参赛赛道', required=True, choices=VALID_TRACKS),
+    FieldRule('project_name', '作品名称', required=True),
+    FieldRule('repo_url', '代码仓库链接'),
+    FieldRule('costrict_uid', 'CoStrict UID', required=True),
+    FieldRule('project_intro', '项目简介', length=(200, 500)),
+    FieldRule('tech_solution', '技术方案', length=(200, 500)),
+    FieldRule('goals_and_outlook', '目标与展望', length=(200, 500)),
+)
+
+MEMBER_RULES = (
+    FieldRule('name', '姓名', required=True),
+    FieldRule('member_type', '成员类型', choices=MEMBER_TYPES, default='队员'),
+    FieldRule('school', '学校/单位', required=True),
+    FieldRule('department', '学院/系别'),
+    FieldRule('major_grade', '专业与年级'),
+    FieldRule('phone', '联系电话', required=True, pattern=CN_PHONE_RE,
+              pattern_message='手机号格式不正确（需为大陆11位且以1开头）'),
+    FieldRule('email', '电子邮箱', required=True, pattern=EMAIL_RE,
+              pattern_message='邮箱格式不正确'),
+    FieldRule('student_id', '学号'),
+    FieldRule('role', '项目角色'),
+    FieldRule('tech_stack', '技术栈/擅长领域'),
+    FieldRule('desc', '个人简介/备注'),
+)
+
+
+def _apply_rules(data, rules, path, prefix, errors):
+    """按规则清洗并校验一条记录，错误追加到 errors，返回清洗后的字典"""
+    cleaned = {}
+    for rule in rules:
+        raw = data.get(rule.name)
+        value = str(raw).strip() if raw is not None else ''
+        field_path = f'{path}.{rule.name}'
+        if not value:
+            if rule.required:
+                errors.append({'field': field_path, 'message': f'{prefix}{rule.label}不能为空'})
+            cleaned[rule.name] = rule.default
+            continue
+        if rule.choices and value not in rule.choices:
+            options = '"或"'.join(rule.choices)
+            errors.append({'field': field_path, 'message': f'{prefix}{rule.label}必须为"{options}"'})
+        elif rule.pattern is not None and not rule.pattern.match(value):
+            errors.append({'field': field_path, 'message': f'{prefix}{rule.pattern_message}'})
+        elif rule.length and not rule.length[0] <= len(value) <= rule.length[1]:
+            errors.append({'field': field_path,
+                           'message': f'{prefix}{rule.label}长度必须在{rule.length[0]}-{rule.length[1]}字之间'})
+        cleaned[rule.name] = value
+    return cleaned
+
+
+def validate_team_info(team_info, path='team_info'):
+    """
+    校验团队信息
+
+    Returns:
+        tuple: (清洗后的团队字典, 错误列表)
+    """
+    errors = []
+    if not isinstance(team_info, dict):
+        team_info = {}
+    return _apply_rules(team_info, TEAM_RULES, path, '', errors), errors
+
+
+def validate_member(member, index=None, path=None):
+    """
+    校验单个成员信息
+
+    Args:
+        member (dict): 成员信息
+        index (int): 成员在列表中的下标，用于生成“成员N的...”提示
+        path (str): 错误字段路径前缀，默认为 members[index]
+
+    Returns:
+        tuple: (清洗后的成员字典, 错误列表)
+    """
+    errors = []
+    if not isinstance(member, dict):
+        member = {}
+    if path is None:
+        path = f'members[{index}]' if index is not None else 'member'
+    prefix = f'成员{index + 1}的' if index is not None else ''
+    return _apply_rules(member, MEMBER_RULES, path, prefix, errors), errors
+
+
+def validate_submission(data):
+    """
+    校验完整的报名提交数据：团队信息 + 成员列表
+
+    成员列表只遍历一次，同时完成字段校验和队长/指导老师人数统计
+
+    Returns:
+        tuple: (团队字典, 成员字典列表, 错误列表)；错误列表为空表示校验通过
+    """
+    if not isinstance(data, dict):
+        data = {}
+    team_data, errors = validate_team_info(data.get('team_info'))
+
+    members_info = data.get('members')
+    if not isinstance(members_info, list) or not members_info:
+        errors.append({'field': 'members', 'message': '至少需要添加一名团队成员'})
+        return team_data, [], errors
+
+    members = []
+    captain_count = 0
+    teacher_count = 0
+    for i, member in enumerate(members_info):
+        cleaned, member_errors = validate_member(member, i)
+        errors.extend(member_errors)
+        members.append(cleaned)
+        if cleaned['member_type'] == CAPTAIN:
+            captain_count += 1
+        elif cleaned['member_type'] == TEACHER:
+            teacher_count += 1
+
+    if captain_count == 0:
+        errors.append({'field': 'members', 'message': '团队必须指定一名队长'})
+    elif captain_count > 1:
+        errors.append({'field': 'members', 'message': '一个团队只能有一名队长'})
+    if teacher_count > 1:
+        errors.append({'field': 'members', 'message': '一个团队只能有一名指导老师'})
+
+    return team_data, members, errors
+
+
+def format_errors(errors):
+    """将错误列表合并为一条提示信息"""
+    return '；'.join(error['message'] for error in errors)
@@ -773,6 +773,89 @@ function showSuccess() {
     successMessage.scrollIntoView({ behavior: 'smooth', block: 'center' });
 }
 
+// 轮询异步受理的提交状态，保存成功时返回，被拒绝或超时时抛出错误
+async function waitForSubmission(statusUrl, { interval = 500, timeout = 60000 } = {}) {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        const response = await fetch(statusUrl, { cache: 'no-store' });
+        if (!response.ok) {
+            continue;
+        }
+        const { data } = await response.json();
+        if (data.status === 'done') {
+            return data;
+        }
+        if (data.status === 'rejected') {
+            throw new Error(data.message || '提交失败，请稍后重试');
+        }
+    }
+    throw new Error('提交已受理，但保存结果确认超时，请稍后查看邮箱或联系工作人员');
+}
+
+// 提交请求的超时时间和最多尝试次数（超时、网络错误、409/503 时自动重试）
+const SUBMIT_TIMEOUT = 20000;
+const SUBMIT_ATTEMPTS = 3;
+
+// 幂等键：同一份报名内容（重试或重复点击）使用同一个键，服务器直接返回首次提交的结果
+let pendingSubmission = null;
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    // randomUUID 仅在 HTTPS 下可用
+    const bytes = new Uint8Array(16);
+    if (window.crypto && crypto.getRandomValues) {
+        crypto.getRandomValues(bytes);
+    } else {
+        bytes.forEach((_, i) => { bytes[i] = Math.floor(Math.random() * 256); });
+    }
+    return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function idempotencyKeyFor(body) {
+    if (!pendingSubmission || pendingSubmission.body !== body) {
+        pendingSubmission = { body, key: newIdempotencyKey() };
+    }
+    return pendingSubmission.key;
+}
+
+// 发送报名数据，超时或服务器暂时不可用时使用同一个幂等键重试
+async function postSubmission(body) {
+    const key = idempotencyKeyFor(body);
+    for (let attempt = 1; ; attempt++) {
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), SUBMIT_TIMEOUT);
+        let response;
+        try {
+            response = await fetch('/api/team/submit', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': key,
+                },
+                body,
+                signal: controller.signal
+            });
+        } catch (error) {
+            if (attempt >= SUBMIT_ATTEMPTS || !navigator.onLine) {
+                throw error.name === 'AbortError' ? new Error('请求超时，请稍后重试') : error;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+            continue;
+        } finally {
+            clearTimeout(timer);
+        }
+        if ((response.status === 409 || response.status === 503) && attempt < SUBMIT_ATTEMPTS) {
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || attempt;
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            continue;
+        }
+        return response;
+    }
+}
+
 // 提交表单
 async function submitForm(event) {
     event.preventDefault();
@@ -816,13 +899,7 @@ async function submitForm(event) {
     
     try {
         // 发送到后端 API
-        const response = await fetch('/api/team/submit', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(formData)
-        });
+        const response = await postSubmission(JSON.stringify(formData));
         
         if (!response.ok) {
             const errorData = await response.json();
@@ -831,6 +908,11 @@ async function submitForm(event) {
         
         const result = await response.json();
         
+        // 异步受理模式：等待后台保存完成
+        if (result.ticket) {
+            await waitForSubmission(result.status_url);
+        }
+        
         // 模拟延迟（实际开发中可以移除）
         await new Promise(resolve => setTimeout(resolve, 500));
         
@@ -916,21 +998,34 @@ if (initialCaptainCheckbox) {
     }
 }
 
+// 显示报名截止时间
+function displayDeadline(config) {
+    const deadlineElement = document.getElementById('deadline-time');
+    const deadlineNotice = document.getElementById('deadline-notice');
+    
+    if (deadlineElement && deadlineNotice) {
+        deadlineElement.textContent = config.value;
+        deadlineNotice.style.display = 'block';
+    }
+}
+
 // 获取并显示报名截止时间
 async function fetchAndDisplayDeadline() {
+    // 服务器渲染页面时已注入公开配置，无需再请求接口
+    if (window.__PUBLIC_CONFIG__) {
+        if (window.__PUBLIC_CONFIG__.DEADLINE) {
+            displayDeadline(window.__PUBLIC_CONFIG__.DEADLINE);
+        }
+        return;
+    }
+    
     try {
         const response = await fetch('/api/config?config_key=DEADLINE');
         
         if (response.ok) {
             const result = await response.json();
             if (result.success && result.data) {
-                const deadlineElement = document.getElementById('deadline-time');
-                const deadlineNotice = document.getElementById('deadline-notice');
-                
-                if (deadlineElement && deadlineNotice) {
-                    deadlineElement.textContent = result.data.value;
-                    deadlineNotice.style.display = 'block';
-                }
+                displayDeadline(result.data);
             }
         } else {
             console.log('未设置截止时间或获取失败');
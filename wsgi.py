@@ -4,13 +4,14 @@ WSGI入口文件，用于生产环境部署
 
 from server import app, init_db
 from models import db
+import logging
 import os
 
 def create_app():
     """创建并配置应用实例"""
     # 初始化数据库
     if not init_db():
-        print("数据库初始化失败，应用无法启动")
+        logging.getLogger('costrict').error('数据库初始化失败，应用无法启动')
         exit(1)
     
     # 初始化数据库